@@ -5,6 +5,8 @@ from tkinter import ttk, messagebox
 from models import Ruta, Bus
 from services import DataManager, Simulador
 from gui import Styles
+from gui.entrada_parada import EntradaParada, confirmar_parada
+from gui.lista_virtual import FilasTreeview
 
 class CreadorRecorridosBuses:
     def __init__(self, root):
@@ -20,6 +22,13 @@ class CreadorRecorridosBuses:
         # Cargar datos existentes
         self.cargar_datos()
         
+        # Nombres de parada conocidos para autocompletar y detectar duplicados: los del
+        # nomenclátor de la aplicación más las paradas de las rutas de este archivo
+        self.nomenclator = DataManager().nomenclator()
+        for paradas in self.rutas.values():
+            for parada in paradas:
+                self.nomenclator.agregar(parada)
+        
         self.crear_interfaz()
     
     def cargar_datos(self):
@@ -80,8 +89,9 @@ class CreadorRecorridosBuses:
         self.entry_nombre_ruta.grid(row=0, column=1, pady=5, padx=5)
         
         ttk.Label(form_frame, text="Agregar Parada:").grid(row=1, column=0, sticky='w', pady=5)
-        self.entry_parada = ttk.Entry(form_frame, width=30)
+        self.entry_parada = EntradaParada(form_frame, self.nomenclator, width=30)
         self.entry_parada.grid(row=1, column=1, pady=5, padx=5)
+        self.entry_parada.entry.bind("<Return>", lambda e: self.agregar_parada_lista())
         
         # Botones para paradas
         btn_frame_paradas = ttk.Frame(form_frame)
@@ -125,6 +135,7 @@ class CreadorRecorridosBuses:
         self.tree_rutas.column('Nombre', width=200)
         self.tree_rutas.column('Paradas', width=100)
         self.tree_rutas.pack(fill='both', expand=True)
+        self.filas_rutas = FilasTreeview(self.tree_rutas)
         
         # Botones para rutas existentes
         btn_frame_rutas = ttk.Frame(list_frame)
@@ -171,6 +182,7 @@ class CreadorRecorridosBuses:
         self.tree_buses.heading('Ruta', text='Ruta Asignada')
         self.tree_buses.heading('Estado', text='Estado')
         self.tree_buses.pack(fill='both', expand=True)
+        self.filas_buses = FilasTreeview(self.tree_buses)
         
         self.actualizar_combo_rutas()
         self.actualizar_lista_buses()
@@ -232,10 +244,13 @@ class CreadorRecorridosBuses:
     
     # Métodos para gestión de rutas
     def agregar_parada_lista(self):
-        parada = self.entry_parada.get().strip()
+        parada = self.entry_parada.get()
         if parada:
+            parada = confirmar_parada(self.root, self.nomenclator, parada)
+            if parada is None:
+                return
             self.lista_paradas.insert(tk.END, parada)
-            self.entry_parada.delete(0, tk.END)
+            self.entry_parada.limpiar()
         else:
             messagebox.showwarning("Advertencia", "Escribe el nombre de la parada")
     
@@ -299,6 +314,8 @@ class CreadorRecorridosBuses:
             return
         
         self.rutas[nombre_ruta] = paradas
+        for parada in paradas:
+            self.nomenclator.agregar(parada)
         self.guardar_datos()
         self.actualizar_lista_rutas()
         self.actualizar_combo_rutas()
@@ -309,16 +326,13 @@ class CreadorRecorridosBuses:
         self.limpiar_paradas()
     
     def actualizar_lista_rutas(self):
-        for item in self.tree_rutas.get_children():
-            self.tree_rutas.delete(item)
-        
-        for nombre, paradas in self.rutas.items():
-            self.tree_rutas.insert('', tk.END, values=(nombre, len(paradas)))
+        self.filas_rutas.sincronizar(
+            (nombre, (nombre, len(paradas))) for nombre, paradas in self.rutas.items())
     
     def ver_detalles_ruta(self):
         try:
             item = self.tree_rutas.selection()[0]
-            nombre_ruta = self.tree_rutas.item(item)['values'][0]
+            nombre_ruta = self.filas_rutas.clave(item)
             paradas = self.rutas[nombre_ruta]
             
             detalles = f"Ruta: {nombre_ruta}\n\nParadas:\n"
@@ -332,7 +346,7 @@ class CreadorRecorridosBuses:
     def eliminar_ruta(self):
         try:
             item = self.tree_rutas.selection()[0]
-            nombre_ruta = self.tree_rutas.item(item)['values'][0]
+            nombre_ruta = self.filas_rutas.clave(item)
             
             confirmar = messagebox.askyesno(
                 "Confirmar Eliminación", 
@@ -401,16 +415,9 @@ class CreadorRecorridosBuses:
         self.entry_capacidad.insert(0, "40")
     
     def actualizar_lista_buses(self):
-        for item in self.tree_buses.get_children():
-            self.tree_buses.delete(item)
-        
-        for numero, info in self.buses.items():
-            self.tree_buses.insert('', tk.END, values=(
-                numero, 
-                info['ruta'], 
-                info['capacidad'],
-                info['estado']
-            ))
+        self.filas_buses.sincronizar(
+            (numero, (numero, info['ruta'], info['capacidad'], info['estado']))
+            for numero, info in self.buses.items())
     
     # Métodos para visualización
     def mostrar_recorrido(self, event=None):
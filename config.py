@@ -1,3 +1,8 @@
+import importlib.util
+import os
+import tempfile
+from pathlib import Path
+
 # Configuración de la base de datos
 DB_NAME = "buscango.db"
 
@@ -12,7 +17,18 @@ LOG_CONFIG = {
 DB_CONFIG = {
     'name': DB_NAME,
     'backup_interval': 24,  # horas
-    'max_connections': 5
+    'max_connections': 5,
+    'timeout': 30.0,  # segundos de espera por una conexión o un bloqueo
+    'cached_statements': 256,
+    'batch_size': 1000  # posiciones por transacción en bulk_update_positions
+}
+
+# Configuración del almacenamiento de datos
+DATA_CONFIG = {
+    'backend': 'json',  # 'json' (data.json) o 'sqlite' (tablas de DatabaseManager)
+    'archivo': 'data.json',
+    'compactar_cada': 1000,  # entradas del diario antes de reescribir el archivo
+    'fsync_diario': False    # fsync tras cada entrada (más seguro, más lento)
 }
 
 # Configuración del servidor
@@ -22,16 +38,49 @@ PORT = 8000
 # Configuración del mapa
 MAP_CENTER = [-33.4489, -70.6693]  # Santiago, Chile
 MAP_ZOOM = 13
+MAP_CACHE_DIR = Path(tempfile.gettempdir()) / "buscango_mapas"  # HTML generados, por contenido
+MAP_CACHE_MAX = 50  # mapas guardados antes de borrar los menos usados
+MAP_POLL_INTERVAL = 1000  # milisegundos entre consultas de la capa en vivo del mapa
+MAP_PAYLOAD_MAX = 1_500_000  # bytes de paradas y recorridos embebidos en la página del mapa
+
+# Caché local de teselas del mapa (servida por el servidor local en /teselas)
+TILE_CONFIG = {
+    'archivo': 'teselas.mbtiles',
+    'max_bytes': 512 * 1024 * 1024,  # al superarlo se borran las teselas menos usadas
+    'url': 'https://tile.openstreetmap.org/{z}/{x}/{y}.png',
+    'timeout': 10.0,  # segundos por descarga
+    'reintento': 60,  # segundos sin intentar descargas tras un fallo de conexión
+    'bbox': (-30.05, -71.40, -29.85, -71.20),  # Coquimbo y La Serena (lat_min, lon_min, lat_max, lon_max)
+    'zoom': (10, 16)  # niveles que descarga la precarga por defecto
+}
+
+# Nomenclátor local de paradas (nombre -> coordenadas) para autocompletar y detectar duplicados
+GAZETTEER_FILE = Path(__file__).parent / "nomenclator.csv"
 
 # Configuración de la interfaz
 WINDOW_SIZE = "800x600"
 WINDOW_TITLE = "BuScanGo"
+REFRESH_INTERVAL = 100  # milisegundos entre actualizaciones de la simulación en pantalla
+TASK_WORKERS = 2  # hilos para cargas y guardados en segundo plano
+TASK_POLL_INTERVAL = 50  # milisegundos entre revisiones de tareas terminadas
+SEARCH_DELAY = 150  # milisegundos sin escribir antes de filtrar una lista
 
 # Configuración del simulador
 SIMULATOR_CONFIG = {
-    'update_interval': 1.0,  # segundos
-    'speed_multiplier': 1.0
+    'update_interval': 1.0,  # segundos simulados por paso
+    'speed_multiplier': 1.0,  # None = lo más rápido posible
+    'max_catch_up': 100  # pasos máximos por ciclo al recuperar atraso
 }
 
 # Configuración de notificaciones
-NOTIFICATION_TIMEOUT = 5000  # milisegundos
\ No newline at end of file
+NOTIFICATION_TIMEOUT = 5000  # milisegundos
+
+# Entorno de desarrollo: BUSCANGO_ENV=development aplica config/development.py
+if os.getenv('BUSCANGO_ENV') == 'development':
+    _spec = importlib.util.spec_from_file_location(
+        'config_development', Path(__file__).parent / 'config' / 'development.py')
+    _development = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_development)
+    DB_CONFIG.update(_development.DB_CONFIG)
+    LOG_CONFIG.update(_development.LOG_CONFIG)
+    SIMULATOR_CONFIG.update(_development.SIMULATOR_CONFIG)
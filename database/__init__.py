@@ -1,3 +1,4 @@
 from .db_manager import DatabaseManager, DatabaseError
+from .almacen_sqlite import AlmacenSQLite
 
-__all__ = ['DatabaseManager', 'DatabaseError']
\ No newline at end of file
+__all__ = ['DatabaseManager', 'DatabaseError', 'AlmacenSQLite']
\ No newline at end of file
@@ -0,0 +1,259 @@
+import json
+import sys
+
+from .db_manager import DatabaseManager, DatabaseError
+
+# Campos de un bus que se pueden actualizar individualmente y su columna
+COLUMNAS_BUS = {
+    'capacidad': 'capacidad',
+    'estado': 'estado',
+    'ruta': 'ruta',
+    'pasajeros': 'pasajeros',
+    'posicion': 'ultima_ubicacion'
+}
+
+class AlmacenSQLite:
+    """Almacenamiento de DataManager sobre las tablas de DatabaseManager.
+
+    Expone la misma interfaz que ``services.almacenamiento.AlmacenJSON``
+    (firma, cargar, registrar, guardar, compactar, cerrar), pero cada
+    mutación se traduce a un UPSERT/DELETE indexado sobre la fila afectada.
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.archivo = db_manager.db_path
+
+    def firma(self):
+        """(mtime, tamaño) de la base y de su archivo WAL"""
+        firma = []
+        for ruta in (self.archivo, self.archivo.with_name(self.archivo.name + '-wal')):
+            try:
+                stat = ruta.stat()
+                firma.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                firma.append(None)
+        return tuple(firma)
+
+    def cargar(self):
+        with self.db.get_connection() as conn:
+            buses = {}
+            for numero, capacidad, estado, ruta, ubicacion, pasajeros in conn.execute(
+                    "SELECT numero, capacidad, estado, ruta, ultima_ubicacion, pasajeros "
+                    "FROM buses ORDER BY id"):
+                buses[numero] = {
+                    'numero': numero,
+                    'capacidad': capacidad,
+                    'estado': estado,
+                    'ruta': ruta,
+                    'posicion': json.loads(ubicacion) if ubicacion else None,
+                    'pasajeros': pasajeros
+                }
+
+            paradas = {}
+            for parada_id, nombre, ubicacion in conn.execute(
+                    "SELECT id, nombre, ubicacion FROM paradas ORDER BY id"):
+                paradas[str(parada_id)] = {
+                    'nombre': nombre,
+                    'posicion': json.loads(ubicacion) if ubicacion else None
+                }
+
+            rutas = {nombre: {'nombre': nombre, 'paradas': list(paradas)}
+                     for nombre, paradas in self._filas_rutas(conn).items()}
+
+            flota = {}
+            for nombre, cantidad, capacidad, ruta in conn.execute(
+                    "SELECT nombre, cantidad, capacidad, ruta FROM flota ORDER BY rowid"):
+                flota[nombre] = {'cantidad': cantidad, 'capacidad': capacidad, 'ruta': ruta or ''}
+
+        return {'buses': buses, 'paradas': paradas, 'rutas': rutas, 'flota': flota}
+
+    def registrar(self, entradas, datos):
+        with self.db.get_connection() as conn:
+            for entrada in entradas:
+                self._aplicar(conn, entrada)
+            conn.commit()
+
+    def guardar(self, datos):
+        """Sincroniza las tablas con el documento completo escribiendo solo las filas que cambiaron"""
+        with self.db.get_connection() as conn:
+            rutas = datos.get('rutas', {})
+            actuales = self._filas_rutas(conn)
+            # Las rutas se eliminan primero (ON DELETE CASCADE limpia ruta_paradas) y las
+            # paradas al final, cuando ninguna ruta las referencia
+            for nombre in actuales.keys() - rutas.keys():
+                conn.execute("DELETE FROM rutas WHERE nombre = ?", (nombre,))
+            paradas = self._sincronizar(
+                conn, "SELECT id, nombre, ubicacion FROM paradas",
+                datos.get('paradas', {}), self._fila_parada, self._guardar_parada)
+            buses = self._sincronizar(
+                conn, "SELECT numero, capacidad, estado, ruta, ultima_ubicacion, pasajeros FROM buses",
+                datos.get('buses', {}), self._fila_bus, self._guardar_bus)
+            flota = self._sincronizar(
+                conn, "SELECT nombre, cantidad, capacidad, ruta FROM flota",
+                datos.get('flota', {}), self._fila_flota, self._guardar_flota_item)
+            for nombre, ruta in rutas.items():
+                if actuales.get(nombre) != tuple(ruta.get('paradas', [])):
+                    self._guardar_ruta(conn, nombre, ruta)
+            conn.executemany("DELETE FROM paradas WHERE id = ?", [(int(clave),) for clave in paradas])
+            conn.executemany("DELETE FROM buses WHERE numero = ?", [(clave,) for clave in buses])
+            conn.executemany("DELETE FROM flota WHERE nombre = ?", [(clave,) for clave in flota])
+            conn.commit()
+
+    def _sincronizar(self, conn, consulta, registros, fila, guardar):
+        """Escribe los registros cuya fila difiere de la guardada; devuelve las claves a eliminar"""
+        actuales = {str(clave): tuple(valores) for clave, *valores in conn.execute(consulta)}
+        for clave, registro in registros.items():
+            if actuales.get(clave) != fila(registro):
+                guardar(conn, clave, registro)
+        return actuales.keys() - registros.keys()
+
+    def _filas_rutas(self, conn):
+        """IDs de parada de cada ruta guardada, en orden"""
+        rutas = {nombre: [] for (nombre,) in conn.execute("SELECT nombre FROM rutas ORDER BY id")}
+        for nombre, parada_id in conn.execute("""
+                SELECT r.nombre, rp.parada_id
+                FROM ruta_paradas rp
+                JOIN rutas r ON r.id = rp.ruta_id
+                ORDER BY rp.ruta_id, rp.orden
+                """):
+            rutas[nombre].append(parada_id)
+        return {nombre: tuple(paradas) for nombre, paradas in rutas.items()}
+
+    def compactar(self, datos):
+        # Cada mutación ya se escribió en su fila: no hay diario que volcar
+        pass
+
+    def cerrar(self, datos):
+        pass
+
+    def buscar_bus(self, numero):
+        """Busca un bus por su número usando el índice idx_buses_numero"""
+        with self.db.get_connection() as conn:
+            fila = conn.execute(
+                "SELECT numero, capacidad, estado, ruta, ultima_ubicacion, pasajeros "
+                "FROM buses WHERE numero = ?", (numero,)).fetchone()
+        if fila is None:
+            return None
+        return {
+            'numero': fila[0],
+            'capacidad': fila[1],
+            'estado': fila[2],
+            'ruta': fila[3],
+            'posicion': json.loads(fila[4]) if fila[4] else None,
+            'pasajeros': fila[5]
+        }
+
+    def importar_json(self, archivo):
+        """Importa data.json (incluido su diario de cambios) reemplazando el contenido actual"""
+        from services.almacenamiento import AlmacenJSON
+        from models.parada import RegistroParadas, migrar_rutas
+        datos = AlmacenJSON(archivo).cargar()
+        # Los data.json anteriores guardan las paradas de cada ruta como nombres
+        registro = RegistroParadas.from_dict(datos.get('paradas', {}))
+        migrar_rutas(datos, registro)
+        datos['paradas'] = registro.to_dict()
+        self.guardar(datos)
+        return {coleccion: len(datos.get(coleccion, {}))
+                for coleccion in ('buses', 'paradas', 'rutas', 'flota')}
+
+    def _aplicar(self, conn, entrada):
+        coleccion, op, clave = entrada['col'], entrada['op'], entrada['clave']
+        if coleccion == 'buses':
+            if op == 'set':
+                self._guardar_bus(conn, clave, entrada['valor'])
+            elif op == 'del':
+                conn.execute("DELETE FROM buses WHERE numero = ?", (clave,))
+            elif op == 'campo' and entrada['campo'] in COLUMNAS_BUS:
+                valor = entrada['valor']
+                if entrada['campo'] == 'posicion':
+                    valor = json.dumps(valor) if valor is not None else None
+                conn.execute(f"UPDATE buses SET {COLUMNAS_BUS[entrada['campo']]} = ? WHERE numero = ?",
+                             (valor, clave))
+        elif coleccion == 'paradas':
+            if op == 'set':
+                self._guardar_parada(conn, clave, entrada['valor'])
+            elif op == 'del':
+                conn.execute("DELETE FROM paradas WHERE id = ?", (int(clave),))
+            elif op == 'campo' and entrada['campo'] == 'nombre':
+                conn.execute("UPDATE paradas SET nombre = ? WHERE id = ?", (entrada['valor'], int(clave)))
+            elif op == 'campo' and entrada['campo'] == 'posicion':
+                valor = entrada['valor']
+                conn.execute("UPDATE paradas SET ubicacion = ? WHERE id = ?",
+                             (json.dumps(valor) if valor is not None else '', int(clave)))
+        elif coleccion == 'rutas':
+            if op == 'set':
+                self._guardar_ruta(conn, clave, entrada['valor'])
+            elif op == 'del':
+                # ON DELETE CASCADE elimina sus filas de ruta_paradas
+                conn.execute("DELETE FROM rutas WHERE nombre = ?", (clave,))
+        elif coleccion == 'flota':
+            if op == 'set':
+                self._guardar_flota_item(conn, clave, entrada['valor'])
+            elif op == 'del':
+                conn.execute("DELETE FROM flota WHERE nombre = ?", (clave,))
+        else:
+            raise DatabaseError(f"Colección desconocida: {coleccion}")
+
+    @staticmethod
+    def _fila_bus(bus):
+        posicion = bus.get('posicion')
+        return (bus.get('capacidad', 40), bus.get('estado', 'AVAILABLE'), bus.get('ruta'),
+                json.dumps(posicion) if posicion is not None else None, bus.get('pasajeros', 0))
+
+    @staticmethod
+    def _fila_parada(parada):
+        posicion = parada.get('posicion')
+        return (parada['nombre'], json.dumps(posicion) if posicion is not None else '')
+
+    @staticmethod
+    def _fila_flota(info):
+        return (info.get('cantidad', 0), info.get('capacidad', 40), info.get('ruta', ''))
+
+    def _guardar_bus(self, conn, numero, bus):
+        conn.execute("""
+            INSERT INTO buses (numero, capacidad, estado, ruta, ultima_ubicacion, pasajeros)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(numero) DO UPDATE SET
+                capacidad = excluded.capacidad,
+                estado = excluded.estado,
+                ruta = excluded.ruta,
+                ultima_ubicacion = excluded.ultima_ubicacion,
+                pasajeros = excluded.pasajeros
+        """, (numero, *self._fila_bus(bus)))
+
+    def _guardar_ruta(self, conn, nombre, ruta):
+        conn.execute("INSERT INTO rutas (nombre) VALUES (?) ON CONFLICT(nombre) DO NOTHING", (nombre,))
+        (ruta_id,) = conn.execute("SELECT id FROM rutas WHERE nombre = ?", (nombre,)).fetchone()
+        conn.execute("DELETE FROM ruta_paradas WHERE ruta_id = ?", (ruta_id,))
+        conn.executemany("INSERT INTO ruta_paradas (ruta_id, orden, parada_id) VALUES (?, ?, ?)",
+                         [(ruta_id, orden, parada_id)
+                          for orden, parada_id in enumerate(ruta.get('paradas', []))])
+
+    def _guardar_parada(self, conn, parada_id, parada):
+        conn.execute("""
+            INSERT INTO paradas (id, nombre, ubicacion) VALUES (?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                nombre = excluded.nombre,
+                ubicacion = excluded.ubicacion
+        """, (int(parada_id), *self._fila_parada(parada)))
+
+    def _guardar_flota_item(self, conn, nombre, info):
+        conn.execute("""
+            INSERT INTO flota (nombre, cantidad, capacidad, ruta) VALUES (?, ?, ?, ?)
+            ON CONFLICT(nombre) DO UPDATE SET
+                cantidad = excluded.cantidad,
+                capacidad = excluded.capacidad,
+                ruta = excluded.ruta
+        """, (nombre, *self._fila_flota(info)))
+
+def main():
+    """Importa un data.json a la base SQLite: python -m database.almacen_sqlite [data.json]"""
+    archivo = sys.argv[1] if len(sys.argv) > 1 else "data.json"
+    almacen = AlmacenSQLite(DatabaseManager())
+    totales = almacen.importar_json(archivo)
+    print(f"Importados {totales['buses']} buses, {totales['paradas']} paradas, {totales['rutas']} rutas y "
+          f"{totales['flota']} elementos de flota en {almacen.archivo}")
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,105 @@
+import json
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 
+from config import DB_CONFIG
+
 class DatabaseError(Exception):
     pass
 
+class ConnectionPool:
+    """Pool acotado de conexiones SQLite reutilizables.
+
+    Un hilo que ya tiene una conexión tomada la reutiliza en los
+    get_connection anidados. Como mucho hay ``max_connections`` conexiones
+    abiertas; si todas están en uso, se espera hasta ``timeout`` segundos.
+    """
+
+    def __init__(self, db_path, max_connections=5, timeout=30.0, cached_statements=256):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(max_connections)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conexiones = []
+
+    def _conectar(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        # WAL permite lectores concurrentes con un escritor (hilo del simulador + GUI)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        # SQLite no aplica las claves foráneas (ni ON DELETE CASCADE) si no se activan por conexión
+        conn.execute("PRAGMA foreign_keys=ON")
+        with self._lock:
+            self._conexiones.append(conn)
+        return conn
+
+    def adquirir(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.profundidad += 1
+            return conn
+        if not self._cupos.acquire(timeout=self.timeout):
+            raise DatabaseError("No hay conexiones disponibles en el pool")
+        try:
+            conn = self._libres.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._conectar()
+            except Exception:
+                self._cupos.release()
+                raise
+        self._local.conn = conn
+        self._local.profundidad = 1
+        return conn
+
+    def liberar(self, conn):
+        self._local.profundidad -= 1
+        if self._local.profundidad:
+            return
+        self._local.conn = None
+        # Descartar lo que el usuario no confirmó, como hacía conn.close()
+        if conn.in_transaction:
+            conn.rollback()
+        self._libres.put(conn)
+        self._cupos.release()
+
+    def cerrar(self):
+        """Cierra todas las conexiones abiertas por el pool"""
+        with self._lock:
+            conexiones, self._conexiones = self._conexiones, []
+        for conn in conexiones:
+            conn.close()
+        self._libres = queue.LifoQueue()
+
 class DatabaseManager:
-    def __init__(self):
-        self.db_path = Path(__file__).parent / "buscango.db"
+    def __init__(self, db_path=None, max_connections=None):
+        self.db_path = Path(db_path) if db_path else Path(__file__).parent / DB_CONFIG['name']
+        self.pool = ConnectionPool(
+            self.db_path,
+            max_connections=max_connections or DB_CONFIG['max_connections'],
+            timeout=DB_CONFIG.get('timeout', 30.0),
+            cached_statements=DB_CONFIG.get('cached_statements', 256)
+        )
         self._create_tables()
     
     @contextmanager
     def get_connection(self):
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.pool.adquirir()
             yield conn
         except sqlite3.Error as e:
             if conn:
@@ -22,10 +107,62 @@ class DatabaseManager:
             raise DatabaseError(f"Error en la base de datos: {str(e)}")
         finally:
             if conn:
-                conn.close()
+                self.pool.liberar(conn)
+
+    def cerrar(self):
+        """Cierra las conexiones del pool"""
+        self.pool.cerrar()
+
+    def bulk_update_positions(self, posiciones, batch_size=None):
+        """Registra un flujo de posiciones ``(bus, lat, lon, timestamp)`` en lotes.
+
+        Cada lote se inserta en ``posiciones`` con executemany dentro de una
+        única transacción, y ``buses.ultima_ubicacion`` se actualiza con la
+        posición más reciente de cada bus del lote. ``timestamp`` son segundos
+        desde epoch. Devuelve la cantidad de posiciones escritas.
+        """
+        batch_size = batch_size or DB_CONFIG.get('batch_size', 1000)
+        total = 0
+        lote = []
+        with self.get_connection() as conn:
+            for posicion in posiciones:
+                lote.append(posicion)
+                if len(lote) >= batch_size:
+                    self._escribir_lote_posiciones(conn, lote)
+                    total += len(lote)
+                    lote = []
+            if lote:
+                self._escribir_lote_posiciones(conn, lote)
+                total += len(lote)
+        return total
+
+    def _escribir_lote_posiciones(self, conn, lote):
+        conn.executemany(
+            "INSERT INTO posiciones (bus, lat, lon, timestamp) VALUES (?, ?, ?, ?)", lote)
+        ultimas = {}
+        for bus, lat, lon, timestamp in lote:
+            if bus not in ultimas or timestamp >= ultimas[bus][2]:
+                ultimas[bus] = (lat, lon, timestamp)
+        conn.executemany(
+            "UPDATE buses SET ultima_ubicacion = ? WHERE numero = ?",
+            [(json.dumps([lat, lon]), bus) for bus, (lat, lon, _) in ultimas.items()])
+        conn.commit()
+
+    def historial_posiciones(self, bus, desde=None, hasta=None):
+        """Devuelve las posiciones ``(lat, lon, timestamp)`` de un bus en orden temporal"""
+        consulta = "SELECT lat, lon, timestamp FROM posiciones WHERE bus = ?"
+        parametros = [bus]
+        if desde is not None:
+            consulta += " AND timestamp >= ?"
+            parametros.append(desde)
+        if hasta is not None:
+            consulta += " AND timestamp <= ?"
+            parametros.append(hasta)
+        with self.get_connection() as conn:
+            return conn.execute(consulta + " ORDER BY timestamp", parametros).fetchall()
 
     def _create_tables(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             
             # Tabla Usuarios
@@ -58,4 +195,66 @@ class DatabaseManager:
                 )
             """)
             
+            # Tabla Rutas
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS rutas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nombre TEXT UNIQUE NOT NULL
+                )
+            """)
+            
+            # Orden de las paradas dentro de cada ruta
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ruta_paradas (
+                    ruta_id INTEGER NOT NULL REFERENCES rutas(id) ON DELETE CASCADE,
+                    orden INTEGER NOT NULL,
+                    parada_id INTEGER NOT NULL REFERENCES paradas(id),
+                    PRIMARY KEY (ruta_id, orden)
+                )
+            """)
+            
+            # Tabla Flota
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS flota (
+                    nombre TEXT PRIMARY KEY,
+                    cantidad INTEGER DEFAULT 0,
+                    capacidad INTEGER DEFAULT 40,
+                    ruta TEXT
+                )
+            """)
+            
+            # Historial de posiciones (telemetría)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS posiciones (
+                    id INTEGER PRIMARY KEY,
+                    bus TEXT NOT NULL,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    timestamp REAL NOT NULL
+                )
+            """)
+            
+            # Columnas agregadas a buses después de la versión inicial
+            columnas = {fila[1] for fila in cursor.execute("PRAGMA table_info(buses)")}
+            for columna, tipo in (("capacidad", "INTEGER DEFAULT 40"),
+                                  ("ruta", "TEXT"),
+                                  ("pasajeros", "INTEGER DEFAULT 0")):
+                if columna not in columnas:
+                    cursor.execute(f"ALTER TABLE buses ADD COLUMN {columna} {tipo}")
+            
+            # Las bases anteriores admitían números de bus repetidos: queda la fila más reciente
+            cursor.execute("DELETE FROM buses WHERE id NOT IN (SELECT MAX(id) FROM buses GROUP BY numero)")
+            # idx_paradas_nombre fue único en una versión anterior y no se podía crear en bases
+            # con nombres de parada repetidos
+            for _, nombre, unico, *_ in cursor.execute("PRAGMA index_list(paradas)").fetchall():
+                if nombre == 'idx_paradas_nombre' and unico:
+                    cursor.execute("DROP INDEX idx_paradas_nombre")
+            
+            # Índices para búsquedas por clave
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_buses_numero ON buses(numero)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_buses_ruta ON buses(ruta)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_paradas_nombre ON paradas(nombre)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_ruta_paradas_parada ON ruta_paradas(parada_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_posiciones_bus_timestamp ON posiciones(bus, timestamp)")
+            
             conn.commit()
\ No newline at end of file
@@ -0,0 +1,88 @@
+import tkinter as tk
+from tkinter import ttk
+
+from config import SEARCH_DELAY
+from .tareas import en_segundo_plano
+
+class CajaBusqueda(ttk.Frame):
+    """Campo de búsqueda que filtra mientras se escribe.
+
+    Espera ``espera`` milisegundos sin cambios antes de buscar; la búsqueda
+    (``buscar(texto)`` -> lista de claves) corre fuera del hilo de Tk y solo
+    se aplica el resultado de la última consulta. ``al_filtrar()`` se llama
+    en el hilo de Tk cada vez que cambia ``resultado`` (None = sin filtro).
+    """
+
+    def __init__(self, parent, buscar, al_filtrar, espera=SEARCH_DELAY, width=30):
+        super().__init__(parent)
+        self.buscar = buscar
+        self.al_filtrar = al_filtrar
+        self.espera = espera
+        self.resultado = None
+        self._programada = None
+        self._consulta = 0
+
+        ttk.Label(self, text="Buscar:").pack(side="left")
+        self.var = tk.StringVar()
+        self.entry = ttk.Entry(self, textvariable=self.var, width=width)
+        self.entry.pack(side="left", padx=(4, 8), fill="x", expand=True)
+        self.estado_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.estado_var).pack(side="left")
+
+        self.var.trace_add('write', lambda *args: self._programar())
+        self.entry.bind("<Escape>", lambda e: self.var.set(""))
+
+    def actualizar(self):
+        """Repite la búsqueda actual (p. ej. después de editar los datos)"""
+        self._programar(0)
+
+    def _programar(self, espera=None):
+        if self._programada is not None:
+            self.after_cancel(self._programada)
+        self._programada = self.after(self.espera if espera is None else espera, self._buscar)
+
+    def _buscar(self):
+        self._programada = None
+        self._consulta += 1
+        consulta = self._consulta
+        texto = self.var.get().strip()
+        if not texto:
+            self._aplicar(consulta, None)
+            return
+        en_segundo_plano(self, self.buscar, texto,
+                         al_terminar=lambda claves: self._aplicar(consulta, claves))
+
+    def _aplicar(self, consulta, claves):
+        if consulta != self._consulta:
+            # Llegó tarde: ya se escribió otra cosa
+            return
+        self.resultado = claves
+        self.estado_var.set("" if claves is None else f"{len(claves)} resultados")
+        self.al_filtrar()
+
+class VistaFiltrada:
+    """``contar``/``obtener`` para ListaVirtual sobre una colección, limitados a ciertas claves.
+
+    ``claves()`` devuelve las claves a mostrar en orden, o None para mostrar
+    la colección completa; se consulta en cada ``contar`` (al refrescar).
+    """
+
+    def __init__(self, data_manager, coleccion, claves):
+        self.data_manager = data_manager
+        self.coleccion = coleccion
+        self.claves = claves
+        self._filtradas = None
+
+    def contar(self):
+        claves = self.claves()
+        if claves is None:
+            self._filtradas = None
+            return self.data_manager.contar(self.coleccion)
+        # Se omiten las claves que se eliminaron desde la búsqueda
+        self._filtradas = [clave for clave, _ in self.data_manager.registros(self.coleccion, claves)]
+        return len(self._filtradas)
+
+    def obtener(self, inicio, cantidad):
+        if self._filtradas is None:
+            return self.data_manager.pagina(self.coleccion, inicio, cantidad)
+        return self.data_manager.registros(self.coleccion, self._filtradas[inicio:inicio + cantidad])
@@ -0,0 +1,123 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+class EntradaParada(ttk.Frame):
+    """Campo de texto para nombres de parada con sugerencias del nomenclátor mientras se escribe.
+
+    ``nomenclator`` puede ser None y asignarse después, al terminar de cargarlo.
+    """
+
+    def __init__(self, parent, nomenclator, width=30, sugerencias=6):
+        super().__init__(parent)
+        self.nomenclator = nomenclator
+        self.var = tk.StringVar()
+        self.entry = ttk.Entry(self, textvariable=self.var, width=width)
+        self.entry.pack(fill="x")
+        self.lista = tk.Listbox(self, height=sugerencias, width=width, exportselection=False)
+
+        self.entry.bind("<KeyRelease>", self._al_escribir)
+        self.entry.bind("<Down>", self._ir_a_lista)
+        self.entry.bind("<Escape>", lambda e: self._ocultar())
+        self.lista.bind("<Return>", self._elegir)
+        self.lista.bind("<Double-Button-1>", self._elegir)
+        self.lista.bind("<Escape>", lambda e: (self._ocultar(), self.entry.focus_set()))
+
+    def get(self):
+        return self.var.get().strip()
+
+    def limpiar(self):
+        self.var.set("")
+        self._ocultar()
+
+    def focus_set(self):
+        self.entry.focus_set()
+
+    def _al_escribir(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab") or self.nomenclator is None:
+            return
+        sugerencias = self.nomenclator.sugerir(self.var.get())
+        self.lista.delete(0, tk.END)
+        if not sugerencias:
+            self._ocultar()
+            return
+        for nombre in sugerencias:
+            self.lista.insert(tk.END, nombre)
+        if not self.lista.winfo_ismapped():
+            self.lista.pack(fill="x")
+
+    def _ir_a_lista(self, event):
+        if self.lista.winfo_ismapped() and self.lista.size():
+            self.lista.focus_set()
+            self.lista.selection_clear(0, tk.END)
+            self.lista.selection_set(0)
+            self.lista.activate(0)
+        return "break"
+
+    def _elegir(self, event):
+        seleccion = self.lista.curselection()
+        if seleccion:
+            self.var.set(self.lista.get(seleccion[0]))
+            self.entry.icursor(tk.END)
+        self._ocultar()
+        self.entry.focus_set()
+        return "break"
+
+    def _ocultar(self):
+        self.lista.pack_forget()
+
+def confirmar_parada(parent, nomenclator, nombre):
+    """Nombre a usar para una parada escrita a mano, o None si se canceló.
+
+    Si se escribe igual que una parada conocida salvo tildes o puntuación,
+    se usa esa; si se parece a otra, se pregunta si se quiso decir esa.
+    """
+    nombre = " ".join(nombre.split())
+    existente = nomenclator.buscar(nombre)
+    if existente is not None:
+        return existente
+    parecidos = nomenclator.duplicados(nombre)
+    if not parecidos:
+        return nombre
+    _, parecido = parecidos[0]
+    respuesta = messagebox.askyesnocancel(
+        "Parada parecida",
+        f"Ya existe la parada '{parecido}'.\n\n¿Usar esa parada en lugar de '{nombre}'?",
+        parent=parent)
+    if respuesta is None:
+        return None
+    return parecido if respuesta else nombre
+
+def pedir_parada(parent, nomenclator, titulo="Nueva Parada", mensaje="Ingrese el nombre de la parada:"):
+    """Diálogo modal con autocompletado; devuelve el nombre confirmado o None"""
+    dialog = tk.Toplevel(parent)
+    dialog.title(titulo)
+    dialog.transient(parent)
+    dialog.resizable(False, False)
+    dialog.geometry("+%d+%d" % (parent.winfo_rootx() + 80, parent.winfo_rooty() + 80))
+
+    frame = ttk.Frame(dialog, padding="10")
+    frame.pack(fill="both", expand=True)
+    ttk.Label(frame, text=mensaje).pack(anchor="w", pady=(0, 5))
+    entrada = EntradaParada(frame, nomenclator, width=40)
+    entrada.pack(fill="x")
+
+    resultado = []
+
+    def aceptar(event=None):
+        if not entrada.get():
+            return
+        nombre = confirmar_parada(dialog, nomenclator, entrada.get())
+        if nombre is not None:
+            resultado.append(nombre)
+            dialog.destroy()
+
+    botones = ttk.Frame(frame)
+    botones.pack(pady=(10, 0))
+    ttk.Button(botones, text="Aceptar", command=aceptar).pack(side="left", padx=5)
+    ttk.Button(botones, text="Cancelar", command=dialog.destroy).pack(side="left", padx=5)
+    entrada.entry.bind("<Return>", aceptar)
+
+    dialog.grab_set()
+    entrada.focus_set()
+    dialog.wait_window()
+    return resultado[0] if resultado else None
@@ -0,0 +1,253 @@
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+
+class ListaVirtual(ttk.Frame):
+    """Treeview que solo crea las filas visibles y pide los datos por páginas.
+
+    ``contar()`` devuelve la cantidad total de registros, ``obtener(inicio,
+    cantidad)`` una página como lista de (clave, registro) y
+    ``formatear(clave, registro)`` los valores de las columnas. Al desplazarse
+    se reutilizan las mismas filas del Treeview con otros valores; las últimas
+    páginas leídas se guardan para no pedirlas de nuevo.
+    """
+
+    def __init__(self, parent, columnas, contar, obtener, formatear, height=15, anchos=None,
+                 encabezados=None, paginas_guardadas=4):
+        super().__init__(parent)
+        self.contar = contar
+        self.obtener = obtener
+        self.formatear = formatear
+        self.filas = height
+        self.paginas_guardadas = paginas_guardadas
+        self.total = 0
+        self.inicio = 0
+        self._paginas = OrderedDict()
+        # claves de los registros mostrados, por fila
+        self._claves = []
+        # valores que muestra cada fila, para no reescribir las que no cambian
+        self._valores = []
+        self._seleccionada = None
+
+        self.tree = ttk.Treeview(self, columns=columnas, show="headings", height=height, selectmode="browse")
+        for col in columnas:
+            self.tree.heading(col, text=(encabezados or {}).get(col, col))
+            self.tree.column(col, width=(anchos or {}).get(col, 100))
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._yview)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<<TreeviewSelect>>", self._al_seleccionar)
+        self.tree.bind("<MouseWheel>", lambda e: self._desplazar(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self._desplazar(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self._desplazar(1, "units"))
+        self.tree.bind("<Up>", lambda e: self._mover_seleccion(-1))
+        self.tree.bind("<Down>", lambda e: self._mover_seleccion(1))
+        self.tree.bind("<Prior>", lambda e: self._desplazar(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self._desplazar(1, "pages"))
+        self.tree.bind("<Configure>", self._al_redimensionar)
+
+        self.refrescar()
+
+    def refrescar(self):
+        """Vuelve a contar y a leer los registros (p. ej. después de editar)"""
+        self._paginas.clear()
+        self.total = self.contar()
+        self._mostrar(self.inicio)
+
+    def seleccion(self):
+        """Clave del registro seleccionado, o None"""
+        return self._seleccionada
+
+    def clave_en(self, y):
+        """Clave del registro en la coordenada y del Treeview, o None"""
+        fila = self.tree.identify_row(y)
+        if not fila:
+            return None
+        indice = self.tree.index(fila)
+        return self._claves[indice] if indice < len(self._claves) else None
+
+    def seleccionar_en(self, y):
+        """Selecciona la fila en la coordenada y y devuelve su clave"""
+        clave = self.clave_en(y)
+        if clave is not None:
+            self.tree.selection_set(self.tree.identify_row(y))
+        return clave
+
+    def bind_fila(self, evento, funcion):
+        """Llama funcion(clave) cuando ocurre ``evento`` sobre una fila"""
+        def manejador(event):
+            clave = self.seleccionar_en(event.y)
+            if clave is not None:
+                funcion(clave)
+        self.tree.bind(evento, manejador, add="+")
+
+    def _pagina(self, numero):
+        pagina = self._paginas.get(numero)
+        if pagina is None:
+            pagina = self.obtener(numero * self.filas, self.filas)
+            self._paginas[numero] = pagina
+            if len(self._paginas) > self.paginas_guardadas:
+                self._paginas.popitem(last=False)
+        else:
+            self._paginas.move_to_end(numero)
+        return pagina
+
+    def _registros(self, inicio):
+        """Hasta self.filas registros desde ``inicio`` (a lo más dos páginas)"""
+        primera = inicio // self.filas
+        registros = self._pagina(primera)[inicio - primera * self.filas:]
+        if len(registros) < self.filas and (primera + 1) * self.filas < self.total:
+            registros = registros + self._pagina(primera + 1)[:self.filas - len(registros)]
+        return registros
+
+    def _mostrar(self, inicio):
+        self.inicio = max(0, min(inicio, self.total - self.filas))
+        registros = self._registros(self.inicio) if self.total else []
+        items = self.tree.get_children()
+        # Se reutilizan las filas existentes; solo se crean o borran las que sobran o faltan
+        # y solo se actualizan las que muestran valores distintos
+        mostrados = []
+        for i, (clave, registro) in enumerate(registros):
+            valores = tuple(self.formatear(clave, registro))
+            mostrados.append(valores)
+            if i < len(items):
+                if i >= len(self._valores) or self._valores[i] != valores:
+                    self.tree.item(items[i], values=valores)
+            else:
+                self.tree.insert("", "end", values=valores)
+        if len(items) > len(registros):
+            self.tree.delete(*items[len(registros):])
+        self._claves = [clave for clave, _ in registros]
+        self._valores = mostrados
+
+        items = self.tree.get_children()
+        if self._seleccionada in self._claves:
+            item = items[self._claves.index(self._seleccionada)]
+            if self.tree.selection() != (item,):
+                self.tree.selection_set(item)
+        elif self.tree.selection():
+            # La fila seleccionada quedó fuera de la vista; la selección se conserva
+            self.tree.selection_remove(*self.tree.selection())
+
+        if self.total:
+            self.scrollbar.set(self.inicio / self.total, min(1.0, (self.inicio + self.filas) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _al_seleccionar(self, event):
+        seleccion = self.tree.selection()
+        if seleccion:
+            indice = self.tree.index(seleccion[0])
+            if indice < len(self._claves):
+                self._seleccionada = self._claves[indice]
+
+    def _yview(self, *args):
+        if args[0] == "moveto":
+            self._mostrar(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            self._desplazar(int(args[1]), args[2])
+
+    def _desplazar(self, cantidad, unidad):
+        paso = self.filas - 1 if unidad == "pages" else 1
+        self._mostrar(self.inicio + cantidad * max(paso, 1))
+        return "break"
+
+    def _mover_seleccion(self, direccion):
+        if self._seleccionada in self._claves:
+            indice = self._claves.index(self._seleccionada) + direccion
+        else:
+            indice = 0 if direccion > 0 else len(self._claves) - 1
+        if indice < 0 or indice >= len(self._claves):
+            self._mostrar(self.inicio + direccion)
+            indice = max(0, min(indice, len(self._claves) - 1))
+        if self._claves:
+            self._seleccionada = self._claves[indice]
+            self._mostrar(self.inicio)
+            self.tree.see(self.tree.get_children()[indice])
+        return "break"
+
+    def _al_redimensionar(self, event):
+        items = self.tree.get_children()
+        caja = self.tree.bbox(items[0]) if items else None
+        if not caja:
+            return
+        # bbox de la primera fila: y es el alto del encabezado y h el de cada fila
+        filas = max(1, (event.height - caja[1]) // caja[3])
+        if filas != self.filas:
+            self.filas = filas
+            self._paginas.clear()
+            self._mostrar(self.inicio)
+
+class FilasTreeview:
+    """Mapa clave -> item de un Treeview común para refrescarlo aplicando solo diferencias.
+
+    Las filas que no cambiaron no se tocan, así la selección y la posición
+    de desplazamiento se conservan y el costo en Tk es proporcional a lo
+    que cambió.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._items = {}
+        self._valores = {}
+        self._orden = []
+        self._claves_por_item = {}
+
+    def clave(self, item):
+        return self._claves_por_item.get(item)
+
+    def seleccion(self):
+        """Clave de la fila seleccionada, o None"""
+        seleccion = self.tree.selection()
+        return self._claves_por_item.get(seleccion[0]) if seleccion else None
+
+    def sincronizar(self, filas):
+        """Deja en el Treeview las ``filas`` [(clave, valores)] en ese orden"""
+        filas = [(clave, tuple(valores)) for clave, valores in filas]
+        nuevas = dict(filas)
+        eliminadas = [clave for clave in self._orden if clave not in nuevas]
+        if eliminadas:
+            self._eliminar(eliminadas)
+
+        for clave, valores in filas:
+            item = self._items.get(clave)
+            if item is not None and self._valores[clave] != valores:
+                self.tree.item(item, values=valores)
+                self._valores[clave] = valores
+
+        orden = [clave for clave, _ in filas]
+        if [clave for clave in orden if clave in self._items] == self._orden:
+            # Mismo orden relativo: solo se insertan las filas nuevas en su lugar
+            for posicion, clave in enumerate(orden):
+                if clave not in self._items:
+                    self._insertar(clave, nuevas[clave], posicion)
+        else:
+            # Orden actual de las filas en el Treeview, seguido aquí para no
+            # preguntarle a Tk la posición de cada una
+            actual = list(self._orden)
+            for posicion, clave in enumerate(orden):
+                if posicion < len(actual) and actual[posicion] == clave:
+                    continue
+                if clave not in self._items:
+                    self._insertar(clave, nuevas[clave], posicion)
+                else:
+                    actual.remove(clave)
+                    self.tree.move(self._items[clave], "", posicion)
+                actual.insert(posicion, clave)
+        self._orden = orden
+
+    def _insertar(self, clave, valores, posicion):
+        item = self.tree.insert("", posicion, values=valores)
+        self._items[clave] = item
+        self._valores[clave] = valores
+        self._claves_por_item[item] = clave
+
+    def _eliminar(self, claves):
+        items = [self._items.pop(clave) for clave in claves]
+        for clave, item in zip(claves, items):
+            del self._valores[clave]
+            del self._claves_por_item[item]
+        self.tree.delete(*items)
+        eliminadas = set(claves)
+        self._orden = [clave for clave in self._orden if clave not in eliminadas]
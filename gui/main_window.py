@@ -1,8 +1,20 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-from .map_view import MapView
+from tkinter import ttk, messagebox
+from .map_view import MapView, usar_teselas_locales
+from .entrada_parada import EntradaParada, confirmar_parada, pedir_parada
+from .lista_virtual import ListaVirtual
+from .tareas import en_segundo_plano
+from .caja_busqueda import CajaBusqueda, VistaFiltrada
 from .styles import Styles
 from models.bus import Bus
+from services.simulador import Simulador, ColaActualizaciones
+from services.mapa_vivo import ServidorMapa, capa_compartida
+from services.teselas import AlmacenTeselas
+from utils.constants import BUS_STATES
+from config import REFRESH_INTERVAL, MAP_POLL_INTERVAL
+
+# Opción de los filtros que no filtra
+TODOS = "Todos"
 
 class MainWindow(tk.Frame):
     def __init__(self, parent, data_manager):
@@ -10,6 +22,22 @@ class MainWindow(tk.Frame):
         self.data_manager = data_manager
         self.parent = parent
         
+        # Simulación: el hilo del simulador publica en la cola y Tk la drena
+        self.simulador = Simulador()
+        self.cola_simulacion = ColaActualizaciones()
+        self.estado_simulacion = {}
+        self._drenado_id = None
+        
+        # Capa en vivo del mapa (buses simulados y recorridos en edición) y teselas locales
+        self.capa_mapa = capa_compartida()
+        self.servidor_mapa = ServidorMapa(self.capa_mapa, data_manager, AlmacenTeselas())
+        # Sin servidor (p. ej. puerto ocupado) el mapa usa las teselas remotas
+        usar_teselas_locales(self.servidor_mapa.iniciar())
+
+        # El mapa principal se regenera al guardar rutas o paradas
+        self._mapa_desactualizado = False
+        data_manager.suscribir(self._al_cambiar_datos)
+        
         # Mostrar mensaje de bienvenida
         self._mostrar_bienvenida()
         
@@ -79,8 +107,9 @@ class MainWindow(tk.Frame):
         
         # Pestaña de mapa
         self.map_frame = ttk.Frame(self.notebook)
-        self.map_view = MapView(self.map_frame)
+        self.map_view = MapView(self.map_frame, self._rutas_mapa())
         self.map_view.pack(expand=True, fill="both")
+        self._vigilar_mapa()
         
         # Pestaña de gestión
         self.management_frame = self._create_management_frame()
@@ -89,6 +118,24 @@ class MainWindow(tk.Frame):
         self.notebook.add(self.management_frame, text="Gestión")
         self.notebook.pack(expand=True, fill="both", padx=5, pady=5)
     
+    def _al_cambiar_datos(self, entrada):
+        # Puede llamarse desde otro hilo: solo se marca y _vigilar_mapa regenera en el de Tk
+        if entrada is None or entrada['col'] in ('rutas', 'paradas'):
+            self._mapa_desactualizado = True
+
+    def _vigilar_mapa(self):
+        """Regenera el mapa principal cuando cambian las rutas o las paradas"""
+        if self._mapa_desactualizado:
+            self._mapa_desactualizado = False
+            self.map_view.actualizar(self._rutas_mapa())
+        self.after(MAP_POLL_INTERVAL, self._vigilar_mapa)
+
+    def _rutas_mapa(self):
+        """Rutas a dibujar en el mapa principal"""
+        # Copia de las claves tomada con el lock: un guardado en segundo plano puede cambiar el modelo
+        rutas = (self.data_manager.obtener_ruta(nombre) for nombre in self.data_manager.claves('rutas'))
+        return [ruta for ruta in rutas if ruta is not None]
+
     def _create_management_frame(self):
         """Crea el frame de gestión con botones para manejar rutas.
 
@@ -113,7 +160,99 @@ class MainWindow(tk.Frame):
         ttk.Button(route_panel, text="Editar Ruta", command=self._editar_ruta_seleccionar).pack(side="left", padx=6)
         ttk.Button(route_panel, text="Eliminar Ruta", command=self._eliminar_ruta_seleccionar).pack(side="left", padx=6)
 
+        # Panel de simulación
+        sim_panel = ttk.LabelFrame(gestion_frame, text="Simulación")
+        sim_panel.pack(fill="x", padx=6, pady=(4, 6))
+        ttk.Button(sim_panel, text="Iniciar", command=self._iniciar_simulacion).pack(side="left", padx=6)
+        ttk.Button(sim_panel, text="Pausar/Reanudar", command=self._pausar_simulacion).pack(side="left", padx=6)
+        ttk.Button(sim_panel, text="Detener", command=self._detener_simulacion).pack(side="left", padx=6)
+        self.sim_status_var = tk.StringVar(value="Simulación detenida")
+        ttk.Label(sim_panel, textvariable=self.sim_status_var).pack(side="left", padx=6)
+
         return frame
+
+    def _iniciar_simulacion(self):
+        """Inicia la simulación con los buses que tienen ruta asignada"""
+        try:
+            # Copias tomadas con el lock del modelo: los guardados corren en otros hilos
+            nombres_rutas = set(self.data_manager.claves('rutas'))
+            registros = self.data_manager.registros('buses', self.data_manager.claves('buses'))
+            rutas = {}
+            buses = []
+            for numero, bus_data in registros:
+                nombre_ruta = bus_data.get('ruta')
+                if nombre_ruta not in nombres_rutas:
+                    continue
+                if nombre_ruta not in rutas:
+                    rutas[nombre_ruta] = self.data_manager.obtener_ruta(nombre_ruta)
+                if rutas[nombre_ruta] is None:
+                    continue
+                bus = Bus(str(numero), int(bus_data.get('capacidad', 40)))
+                bus.ruta_actual = rutas[nombre_ruta]
+                bus.pasajeros = bus_data.get('pasajeros', 0)
+                buses.append(bus)
+
+            if not buses:
+                messagebox.showinfo("Simulación", "No hay buses con ruta asignada")
+                return
+            iniciada = self.simulador.iniciar(buses, cola=self.cola_simulacion)
+        except Exception as e:
+            print(f"Error al iniciar la simulación: {e}")
+            if not self._drenado_id:
+                # No dejar un hilo a medio iniciar; una simulación ya en curso sigue
+                self.simulador.detener()
+            messagebox.showerror("Error", f"Error al iniciar la simulación: {str(e)}")
+            return
+        if iniciada:
+            self.estado_simulacion.clear()
+            self.sim_status_var.set(f"Simulando {len(buses)} buses")
+            self._drenar_simulacion()
+
+    def _pausar_simulacion(self):
+        """Pausa o reanuda la simulación en curso"""
+        reloj = self.simulador.reloj
+        if not reloj or not self._drenado_id:
+            return
+        if reloj.pausado:
+            self.simulador.reanudar()
+        else:
+            self.simulador.pausar()
+            self.sim_status_var.set("Simulación en pausa")
+
+    def _detener_simulacion(self):
+        """Detiene la simulación y el refresco periódico"""
+        if self._drenado_id:
+            self.after_cancel(self._drenado_id)
+            self._drenado_id = None
+        self.simulador.detener()
+        self.cola_simulacion.drenar()
+        self.capa_mapa.eliminar_buses(list(self.estado_simulacion))
+        self.sim_status_var.set("Simulación detenida")
+
+    def _drenar_simulacion(self):
+        """Aplica en el hilo de Tk las actualizaciones pendientes del simulador"""
+        error = self.simulador.error
+        if error is None:
+            try:
+                estados = self.cola_simulacion.drenar()
+                if estados:
+                    self.estado_simulacion.update(estados)
+                    self.capa_mapa.actualizar_buses(estados)
+                    tiempo = max(estado['tiempo'] for estado in estados.values())
+                    pasajeros = sum(estado['pasajeros'] for estado in self.estado_simulacion.values())
+                    self.sim_status_var.set(
+                        f"t = {int(tiempo) // 60} min · {len(self.estado_simulacion)} buses en servicio · "
+                        f"{pasajeros} pasajeros"
+                    )
+            except Exception as e:
+                print(f"Error al actualizar la simulación: {e}")
+                error = e
+        if error is not None:
+            self._drenado_id = None
+            self._detener_simulacion()
+            messagebox.showerror("Error", f"Error en la simulación: {str(error)}")
+            return
+        self._drenado_id = self.after(REFRESH_INTERVAL, self._drenar_simulacion)
     
     def _nuevo_bus(self):
         """Abre diálogo para crear nuevo bus"""
@@ -128,10 +267,7 @@ class MainWindow(tk.Frame):
     def _listar_buses(self):
         """Muestra lista de buses"""
         try:
-            datos = self.data_manager.cargar_datos()
-            buses = datos.get('buses', {})
-            
-            if not buses:
+            if not self.data_manager.contar('buses'):
                 messagebox.showinfo("Lista de Buses", "No hay buses registrados")
                 return
             
@@ -148,35 +284,50 @@ class MainWindow(tk.Frame):
             button_frame = ttk.Frame(main_frame)
             button_frame.pack(fill="x", pady=(0, 8))
 
-            # Los botones dependen del Treeview, se enlazan por referencia más abajo
-            ttk.Button(button_frame, text="Editar Bus", command=lambda: self._editar_bus_on_selection(tree, buses)).pack(side="left", padx=5)
-            ttk.Button(button_frame, text="Eliminar Bus", command=lambda: self._eliminar_bus_on_selection(tree)).pack(side="left", padx=5)
-            ttk.Button(button_frame, text="Actualizar", command=lambda: self._actualizar_lista_buses(tree, buses)).pack(side="left", padx=5)
-
-            # Treeview para mostrar buses
+            # Los botones dependen de la lista, se enlazan por referencia más abajo
+            ttk.Button(button_frame, text="Editar Bus", command=lambda: self._editar_bus_on_selection(lista)).pack(side="left", padx=5)
+            eliminar_btn = ttk.Button(button_frame, text="Eliminar Bus", command=lambda: self._eliminar_bus_on_selection(lista, eliminar_btn))
+            eliminar_btn.pack(side="left", padx=5)
+            ttk.Button(button_frame, text="Actualizar", command=lambda: caja.actualizar()).pack(side="left", padx=5)
+
+            # Búsqueda por número, ruta o estado mientras se escribe
+            caja = CajaBusqueda(main_frame, lambda texto: self.data_manager.buscar('buses', texto),
+                                al_filtrar=lambda: lista.refrescar())
+            caja.pack(fill="x", pady=(0, 8))
+
+            # Filtros por ruta y estado, resueltos con los índices del DataManager
+            filtro_frame = ttk.Frame(main_frame)
+            filtro_frame.pack(fill="x", pady=(0, 8))
+            ruta_var = tk.StringVar(value=TODOS)
+            estado_var = tk.StringVar(value=TODOS)
+            ttk.Label(filtro_frame, text="Ruta:").pack(side="left")
+            ttk.Combobox(filtro_frame, textvariable=ruta_var, state='readonly', width=18,
+                         values=[TODOS] + self.data_manager.claves('rutas')).pack(side="left", padx=(4, 10))
+            ttk.Label(filtro_frame, text="Estado:").pack(side="left")
+            ttk.Combobox(filtro_frame, textvariable=estado_var, state='readonly', width=14,
+                         values=[TODOS] + list(BUS_STATES)).pack(side="left", padx=4)
+
+            def numeros():
+                numeros = self._buses_filtrados(ruta_var.get(), estado_var.get())
+                if caja.resultado is None:
+                    return numeros
+                if numeros is None:
+                    return caja.resultado
+                elegidos = set(numeros)
+                return [numero for numero in caja.resultado if numero in elegidos]
+
+            # Lista virtual: solo se crean las filas visibles y los buses se leen por páginas
+            vista = VistaFiltrada(self.data_manager, 'buses', numeros)
             columns = ("Número", "Capacidad", "Estado", "Pasajeros")
-            tree = ttk.Treeview(main_frame, columns=columns, show="headings", height=15)
-            
-            # Configurar columnas
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=100)
-            
-            # Agregar datos
-            for numero, bus_data in buses.items():
-                tree.insert("", "end", values=(
-                    numero,
-                    bus_data.get('capacidad', 'N/A'),
-                    bus_data.get('estado', 'N/A'),
-                    bus_data.get('pasajeros', 0)
-                ))
-            
-            # Scrollbar
-            scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=tree.yview)
-            tree.configure(yscrollcommand=scrollbar.set)
-            
-            tree.pack(side="left", fill="both", expand=True)
-            scrollbar.pack(side="right", fill="y")
+            lista = ListaVirtual(
+                main_frame, columns,
+                contar=vista.contar,
+                obtener=vista.obtener,
+                formatear=self._fila_bus,
+                height=15)
+            lista.pack(fill="both", expand=True)
+            ruta_var.trace_add('write', lambda *args: lista.refrescar())
+            estado_var.trace_add('write', lambda *args: lista.refrescar())
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al cargar la lista de buses: {str(e)}")
@@ -192,53 +343,63 @@ class MainWindow(tk.Frame):
         dialog = FleetManagerDialog(self.parent, self.data_manager)
         self.parent.wait_window(dialog.dialog)
 
-    def _editar_bus_on_selection(self, tree, buses):
-        """Edita el bus seleccionado en el Treeview"""
-        selection = tree.selection()
-        if not selection:
+    def _editar_bus_on_selection(self, lista):
+        """Edita el bus seleccionado en la lista"""
+        numero = lista.seleccion()
+        if numero is None:
             messagebox.showinfo("Editar Bus", "Seleccione un bus de la lista")
             return
-        item = selection[0]
-        numero = tree.item(item)['values'][0]
-        bus_data = buses.get(numero)
+        bus_data = self.data_manager.cargar_datos().get('buses', {}).get(numero)
         if not bus_data:
             messagebox.showerror("Error", "Datos del bus no encontrados")
             return
         dialog = EditBusDialog(self.parent, self.data_manager, numero, bus_data)
         self.parent.wait_window(dialog.dialog)
         # Refrescar
-        datos = self.data_manager.cargar_datos()
-        self._actualizar_lista_buses(tree, datos.get('buses', {}))
+        lista.refrescar()
 
-    def _eliminar_bus_on_selection(self, tree):
+    def _eliminar_bus_on_selection(self, lista, boton):
         """Elimina el bus seleccionado con confirmación"""
-        selection = tree.selection()
-        if not selection:
+        numero = lista.seleccion()
+        if numero is None:
             messagebox.showinfo("Eliminar Bus", "Seleccione un bus de la lista")
             return
-        item = selection[0]
-        numero = tree.item(item)['values'][0]
-        if messagebox.askyesno("Confirmar Eliminación", f"¿Está seguro de que desea eliminar el bus '{numero}'?"):
-            try:
-                datos = self.data_manager.cargar_datos()
-                datos.get('buses', {}).pop(numero, None)
-                self.data_manager.guardar_datos(datos)
-                messagebox.showinfo("Éxito", f"Bus '{numero}' eliminado exitosamente")
-                self._actualizar_lista_buses(tree, datos.get('buses', {}))
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al eliminar el bus: {str(e)}")
-
-    def _actualizar_lista_buses(self, tree, buses):
-        # Limpiar
-        for it in tree.get_children():
-            tree.delete(it)
-        for numero, bus_data in buses.items():
-            tree.insert("", "end", values=(
-                numero,
-                bus_data.get('capacidad', 'N/A'),
-                bus_data.get('estado', 'N/A'),
-                bus_data.get('pasajeros', 0)
-            ))
+        if not messagebox.askyesno("Confirmar Eliminación", f"¿Está seguro de que desea eliminar el bus '{numero}'?"):
+            return
+
+        def eliminado(_):
+            boton.state(['!disabled'])
+            messagebox.showinfo("Éxito", f"Bus '{numero}' eliminado exitosamente")
+            lista.refrescar()
+
+        def fallo(e):
+            boton.state(['!disabled'])
+            messagebox.showerror("Error", f"Error al eliminar el bus: {str(e)}")
+
+        # El borrado corre en segundo plano; el botón evita enviarlo dos veces
+        boton.state(['disabled'])
+        en_segundo_plano(lista, self.data_manager.eliminar_bus, numero, al_terminar=eliminado, al_fallar=fallo)
+
+    def _buses_filtrados(self, ruta, estado):
+        """Números de los buses de esa ruta y estado (TODOS no filtra), o None si no hay filtro"""
+        if ruta == TODOS and estado == TODOS:
+            return None
+        if ruta == TODOS:
+            return self.data_manager.buses_con_estado(estado)
+        numeros = self.data_manager.buses_de_ruta(ruta)
+        if estado == TODOS:
+            return numeros
+        con_estado = set(self.data_manager.buses_con_estado(estado))
+        return [numero for numero in numeros if numero in con_estado]
+
+    @staticmethod
+    def _fila_bus(numero, bus_data):
+        return (
+            numero,
+            bus_data.get('capacidad', 'N/A'),
+            bus_data.get('estado', 'N/A'),
+            bus_data.get('pasajeros', 0)
+        )
 
     def _editar_ruta(self, nombre_ruta, ruta_data):
         """Abre diálogo para editar información de una ruta"""
@@ -249,10 +410,7 @@ class MainWindow(tk.Frame):
     def _listar_rutas(self):
         """Muestra lista de rutas"""
         try:
-            datos = self.data_manager.cargar_datos()
-            rutas = datos.get('rutas', {})
-            
-            if not rutas:
+            if not self.data_manager.contar('rutas'):
                 messagebox.showinfo("Lista de Rutas", "No hay rutas registradas")
                 return
             
@@ -269,47 +427,37 @@ class MainWindow(tk.Frame):
             # Frame para botones de acción (arriba del Treeview)
             button_frame = ttk.Frame(main_frame)
             button_frame.pack(fill="x", pady=(0, 8))
-            ttk.Button(button_frame, text="Editar Recorrido", command=lambda: self._editar_recorrido_on_selection(tree, rutas)).pack(side="left", padx=5)
-            ttk.Button(button_frame, text="Editar Información", command=lambda: self._editar_ruta_on_selection(tree, rutas)).pack(side="left", padx=5)
-            ttk.Button(button_frame, text="Eliminar", command=lambda: self._confirmar_eliminar_ruta_on_selection(tree)).pack(side="left", padx=5)
-            ttk.Button(button_frame, text="Actualizar", command=lambda: self._actualizar_lista_rutas(tree, rutas)).pack(side="left", padx=5)
-
-            # Treeview para mostrar rutas
+            ttk.Button(button_frame, text="Editar Recorrido", command=lambda: self._editar_recorrido_on_selection(lista)).pack(side="left", padx=5)
+            ttk.Button(button_frame, text="Editar Información", command=lambda: self._editar_ruta_on_selection(lista)).pack(side="left", padx=5)
+            eliminar_btn = ttk.Button(button_frame, text="Eliminar", command=lambda: self._confirmar_eliminar_ruta_on_selection(lista, eliminar_btn))
+            eliminar_btn.pack(side="left", padx=5)
+            ttk.Button(button_frame, text="Actualizar", command=lambda: caja.actualizar()).pack(side="left", padx=5)
+
+            # Búsqueda por nombre de ruta o de sus paradas
+            caja = CajaBusqueda(main_frame, lambda texto: self.data_manager.buscar('rutas', texto),
+                                al_filtrar=lambda: lista.refrescar())
+            caja.pack(fill="x", pady=(0, 8))
+
+            # Lista virtual de rutas, leídas por páginas
+            vista = VistaFiltrada(self.data_manager, 'rutas', lambda: caja.resultado)
             columns = ("Nombre", "Paradas", "Acciones")
-            tree = ttk.Treeview(main_frame, columns=columns, show="headings", height=15)
-            
-            # Configurar columnas
-            tree.heading("Nombre", text="Nombre de la Ruta")
-            tree.heading("Paradas", text="Número de Paradas")
-            tree.heading("Acciones", text="Acciones")
-            tree.column("Nombre", width=200)
-            tree.column("Paradas", width=100)
-            tree.column("Acciones", width=150)
+            lista = ListaVirtual(
+                main_frame, columns,
+                contar=vista.contar,
+                obtener=vista.obtener,
+                formatear=lambda nombre, ruta_data: (nombre, len(ruta_data.get('paradas', [])), "Editar | Recorrido"),
+                height=15,
+                encabezados={"Nombre": "Nombre de la Ruta", "Paradas": "Número de Paradas"},
+                anchos={"Nombre": 200, "Paradas": 100, "Acciones": 150})
             
-            # Frame para botones de acción
-            button_frame = ttk.Frame(main_frame)
-            # Empaquetar normalmente (no usar before=tree porque tree aún no está empaquetado)
-            button_frame.pack(fill="x", pady=(0, 5))
-            
-            # Agregar datos y botones de acción
-            for nombre, ruta_data in rutas.items():
-                paradas = ruta_data.get('paradas', [])
-                item = tree.insert("", "end", values=(
-                    nombre,
-                    len(paradas),
-                    "Editar | Recorrido"
-                ))
-                
-                # Agregar binding para los botones de acción
-                tree.tag_bind(item, '<Double-Button-1>', lambda e, n=nombre, r=ruta_data: self._editar_ruta(n, r))
+            # Doble clic en cualquier fila: un solo binding para toda la lista
+            lista.bind_fila('<Double-Button-1>', lambda nombre: self._editar_ruta(nombre, self._datos_ruta(nombre)))
                 
             # Agregar menú contextual
             def popup(event):
-                item = tree.identify_row(event.y)
-                if item:
-                    tree.selection_set(item)
-                    nombre = tree.item(item)['values'][0]
-                    ruta_data = rutas[nombre]
+                nombre = lista.seleccionar_en(event.y)
+                if nombre is not None:
+                    ruta_data = self._datos_ruta(nombre)
                     menu = tk.Menu(main_frame, tearoff=0)
                     menu.add_command(label="Editar Información", 
                                    command=lambda: self._editar_ruta(nombre, ruta_data))
@@ -317,83 +465,67 @@ class MainWindow(tk.Frame):
                                    command=lambda: self._editar_recorrido(nombre, ruta_data))
                     menu.post(event.x_root, event.y_root)
             
-            tree.bind('<Button-3>', popup)  # Clic derecho
+            lista.tree.bind('<Button-3>', popup)  # Clic derecho
             
-            # Scrollbar
-            scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=tree.yview)
-            tree.configure(yscrollcommand=scrollbar.set)
-            
-            tree.pack(side="left", fill="both", expand=True)
-            scrollbar.pack(side="right", fill="y")
+            lista.pack(fill="both", expand=True)
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al cargar la lista de rutas: {str(e)}")
             
-    def _actualizar_lista_rutas(self, tree, rutas):
-        """Actualiza la lista de rutas en el Treeview"""
-        # Limpiar lista actual
-        for item in tree.get_children():
-            tree.delete(item)
-            
-        # Agregar datos actualizados
-        for nombre, ruta_data in rutas.items():
-            paradas = ruta_data.get('paradas', [])
-            tree.insert("", "end", values=(
-                nombre,
-                len(paradas),
-                "Editar | Recorrido"
-            ))
-            
-    def _editar_ruta_desde_tree(self, event, tree, rutas):
-        """Maneja el doble clic en una ruta del Treeview"""
-        item = tree.selection()[0]
-        nombre = tree.item(item)['values'][0]
-        ruta_data = rutas[nombre]
-        self._editar_ruta(nombre, ruta_data)
-        
-    def _confirmar_eliminar_ruta(self, nombre_ruta):
-        """Confirma y elimina una ruta"""
-        if messagebox.askyesno("Confirmar Eliminación", 
-                             f"¿Está seguro de que desea eliminar la ruta '{nombre_ruta}'?"):
-            try:
-                datos = self.data_manager.cargar_datos()
-                datos['rutas'].pop(nombre_ruta, None)
-                self.data_manager.guardar_datos(datos)
-                messagebox.showinfo("Éxito", f"Ruta '{nombre_ruta}' eliminada exitosamente")
-                self._listar_rutas()
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al eliminar la ruta: {str(e)}")
+    def _datos_ruta(self, nombre):
+        return self.data_manager.cargar_datos().get('rutas', {}).get(nombre)
+        
+    def _confirmar_eliminar_ruta(self, nombre_ruta, boton=None):
+        """Confirma y elimina una ruta; ``boton`` se desactiva mientras se borra"""
+        mensaje = f"¿Está seguro de que desea eliminar la ruta '{nombre_ruta}'?"
+        asignados = self.data_manager.buses_de_ruta(nombre_ruta)
+        if asignados:
+            mensaje += f"\n\nTiene {len(asignados)} buses asignados: {', '.join(map(str, asignados[:10]))}"
+            if len(asignados) > 10:
+                mensaje += ", ..."
+        if not messagebox.askyesno("Confirmar Eliminación", mensaje):
+            return
 
-    def _editar_recorrido_on_selection(self, tree, rutas):
-        selection = tree.selection()
-        if not selection:
+        def eliminada(_):
+            if boton is not None:
+                boton.state(['!disabled'])
+            messagebox.showinfo("Éxito", f"Ruta '{nombre_ruta}' eliminada exitosamente")
+            self._listar_rutas()
+
+        def fallo(e):
+            if boton is not None:
+                boton.state(['!disabled'])
+            messagebox.showerror("Error", f"Error al eliminar la ruta: {str(e)}")
+
+        if boton is not None:
+            boton.state(['disabled'])
+        en_segundo_plano(boton or self, self.data_manager.eliminar_ruta, nombre_ruta,
+                         al_terminar=eliminada, al_fallar=fallo)
+
+    def _editar_recorrido_on_selection(self, lista):
+        nombre = lista.seleccion()
+        if nombre is None:
             messagebox.showinfo("Editar Recorrido", "Seleccione una ruta de la lista")
             return
-        item = selection[0]
-        nombre = tree.item(item)['values'][0]
-        ruta_data = rutas.get(nombre)
+        ruta_data = self._datos_ruta(nombre)
         if not ruta_data:
             messagebox.showerror("Error", "Datos de la ruta no encontrados")
             return
         self._editar_recorrido(nombre, ruta_data)
 
-    def _confirmar_eliminar_ruta_on_selection(self, tree):
-        selection = tree.selection()
-        if not selection:
+    def _confirmar_eliminar_ruta_on_selection(self, lista, boton):
+        nombre = lista.seleccion()
+        if nombre is None:
             messagebox.showinfo("Eliminar Ruta", "Seleccione una ruta de la lista")
             return
-        item = selection[0]
-        nombre = tree.item(item)['values'][0]
-        self._confirmar_eliminar_ruta(nombre)
+        self._confirmar_eliminar_ruta(nombre, boton)
 
-    def _editar_ruta_on_selection(self, tree, rutas):
-        selection = tree.selection()
-        if not selection:
+    def _editar_ruta_on_selection(self, lista):
+        nombre = lista.seleccion()
+        if nombre is None:
             messagebox.showinfo("Editar Ruta", "Seleccione una ruta de la lista")
             return
-        item = selection[0]
-        nombre = tree.item(item)['values'][0]
-        ruta_data = rutas.get(nombre)
+        ruta_data = self._datos_ruta(nombre)
         if not ruta_data:
             messagebox.showerror("Error", "Datos de la ruta no encontrados")
             return
@@ -401,8 +533,7 @@ class MainWindow(tk.Frame):
         dialog = EditarRutaDialog(self.parent, self.data_manager, nombre, ruta_data)
         self.parent.wait_window(dialog.dialog)
         # Refrescar
-        datos = self.data_manager.cargar_datos()
-        self._actualizar_lista_rutas(tree, datos.get('rutas', {}))
+        lista.refrescar()
 
     def _select_route_dialog(self, title="Seleccionar Ruta"):
         """Muestra un cuadro de diálogo simple para seleccionar una ruta y devuelve su nombre o None."""
@@ -421,14 +552,11 @@ class MainWindow(tk.Frame):
         listbox.pack(side="left", fill="both", expand=True)
         vsb.pack(side="right", fill="y")
 
-        try:
-            datos = self.data_manager.cargar_datos()
-            rutas = list(datos.get('rutas', {}).keys())
-        except Exception:
-            rutas = []
+        def mostrar_rutas(rutas):
+            for r in rutas:
+                listbox.insert(tk.END, r)
 
-        for r in rutas:
-            listbox.insert(tk.END, r)
+        en_segundo_plano(top, self.data_manager.claves, 'rutas', al_terminar=mostrar_rutas)
 
         result = {'selected': None}
 
@@ -502,14 +630,7 @@ class BusDialog:
         # Selección de ruta
         ttk.Label(main_frame, text="Asignar Ruta:").grid(row=2, column=0, sticky="w", pady=5)
         self.ruta_var = tk.StringVar()
-        # obtener rutas actuales
-        rutas = []
-        try:
-            datos = self.data_manager.cargar_datos()
-            rutas = list(datos.get('rutas', {}).keys())
-        except Exception:
-            rutas = []
-        self.ruta_combo = ttk.Combobox(main_frame, textvariable=self.ruta_var, values=rutas, state='readonly', width=28)
+        self.ruta_combo = ttk.Combobox(main_frame, textvariable=self.ruta_var, state='readonly', width=28)
         self.ruta_combo.grid(row=2, column=1, pady=5, padx=(10, 0))
 
         # Botones para crear/editar ruta desde el diálogo del bus
@@ -523,8 +644,20 @@ class BusDialog:
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=4, column=0, columnspan=2, pady=20)
 
-        ttk.Button(button_frame, text="Crear", command=self._crear_bus).pack(side="left", padx=5)
+        self.crear_btn = ttk.Button(button_frame, text="Crear", command=self._crear_bus)
+        self.crear_btn.pack(side="left", padx=5)
         ttk.Button(button_frame, text="Cancelar", command=self.dialog.destroy).pack(side="left", padx=5)
+
+        # obtener rutas actuales
+        self._cargar_rutas()
+
+    def _cargar_rutas(self, seleccionar_ultima=False):
+        """Lee los nombres de ruta en segundo plano y actualiza el combobox"""
+        def mostrar(rutas):
+            self.ruta_combo['values'] = rutas
+            if seleccionar_ultima and rutas:
+                self.ruta_var.set(rutas[-1])
+        en_segundo_plano(self.dialog, self.data_manager.claves, 'rutas', al_terminar=mostrar)
     
     def _crear_bus(self):
         try:
@@ -542,47 +675,33 @@ class BusDialog:
             # Crear el bus y asignar ruta si corresponde
             bus = Bus(numero, capacidad)
             ruta_seleccionada = self.ruta_var.get().strip()
-            datos = self.data_manager.cargar_datos()
-            if 'buses' not in datos:
-                datos['buses'] = {}
 
             # Guardar como diccionario; almacenar el nombre de la ruta si está seleccionada
             bus_dict = bus.to_dict()
             if ruta_seleccionada:
                 bus_dict['ruta'] = ruta_seleccionada
-                # intentar asignar objeto ruta en memoria (opcional)
-                try:
-                    from models.ruta import Ruta
-                    rutas = datos.get('rutas', {})
-                    if ruta_seleccionada in rutas:
-                        ruta_obj = Ruta(ruta_seleccionada, rutas[ruta_seleccionada].get('paradas', []))
-                        bus.ruta_actual = ruta_obj
-                except Exception:
-                    pass
-
-            datos['buses'][numero] = bus_dict
-            self.data_manager.guardar_datos(datos)
-            
-            messagebox.showinfo("Éxito", f"Bus {numero} creado exitosamente")
-            self.dialog.destroy()
-            
         except ValueError as e:
             messagebox.showerror("Error", f"Error en los datos: {str(e)}")
-        except Exception as e:
+            return
+
+        def creado(_):
+            messagebox.showinfo("Éxito", f"Bus {numero} creado exitosamente")
+            self.dialog.destroy()
+
+        def fallo(e):
+            self.crear_btn.state(['!disabled'])
             messagebox.showerror("Error", f"Error al crear el bus: {str(e)}")
 
+        # El guardado corre en segundo plano; el botón evita enviarlo dos veces
+        self.crear_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, self.data_manager.guardar_bus, numero, bus_dict,
+                         al_terminar=creado, al_fallar=fallo)
+
     def _crear_nueva_ruta(self):
         # Abrir el diálogo de nueva ruta y refrescar el combobox
         dialog = RutaDialog(self.dialog, self.data_manager)
         self.dialog.wait_window(dialog.dialog)
-        try:
-            datos = self.data_manager.cargar_datos()
-            rutas = list(datos.get('rutas', {}).keys())
-            self.ruta_combo['values'] = rutas
-            if rutas:
-                self.ruta_var.set(rutas[-1])
-        except Exception:
-            pass
+        self._cargar_rutas(seleccionar_ultima=True)
 
     def _editar_ruta_seleccionada(self):
         nombre = self.ruta_var.get().strip()
@@ -597,12 +716,7 @@ class BusDialog:
         dialog = EditarRutaDialog(self.dialog, self.data_manager, nombre, ruta_data)
         self.dialog.wait_window(dialog.dialog)
         # refrescar combobox
-        try:
-            datos = self.data_manager.cargar_datos()
-            rutas = list(datos.get('rutas', {}).keys())
-            self.ruta_combo['values'] = rutas
-        except Exception:
-            pass
+        self._cargar_rutas()
 
 
 class EditBusDialog:
@@ -637,7 +751,6 @@ class EditBusDialog:
         self.capacidad_var = tk.StringVar(value=str(self.bus_data.get('capacidad', '40')))
         ttk.Entry(main_frame, textvariable=self.capacidad_var, width=12).grid(row=1, column=1, sticky="w", pady=6)
 
-        from utils.constants import BUS_STATES
         ttk.Label(main_frame, text="Estado:").grid(row=2, column=0, sticky="w", pady=6)
         self.estado_var = tk.StringVar(value=self.bus_data.get('estado', 'AVAILABLE'))
         estado_values = list(BUS_STATES.keys())
@@ -665,7 +778,8 @@ class EditBusDialog:
         # Botones de acción
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=6, column=0, columnspan=2, pady=12)
-        ttk.Button(button_frame, text="Guardar", command=self._guardar).pack(side="left", padx=6)
+        self.guardar_btn = ttk.Button(button_frame, text="Guardar", command=self._guardar)
+        self.guardar_btn.pack(side="left", padx=6)
         ttk.Button(button_frame, text="Cancelar", command=self.dialog.destroy).pack(side="left", padx=6)
 
         # Cargar rutas en el combobox
@@ -679,55 +793,57 @@ class EditBusDialog:
                 return
 
             estado = self.estado_var.get()
-
-            datos = self.data_manager.cargar_datos()
-            buses = datos.get('buses', {})
-            if self.numero not in buses:
-                messagebox.showerror("Error", "El bus ya no existe")
-                self.dialog.destroy()
-                return
-
-            buses[self.numero]['capacidad'] = capacidad
-            buses[self.numero]['estado'] = estado
-            # asignar ruta si se seleccionó
-            ruta_sel = self.ruta_var.get().strip() if hasattr(self, 'ruta_var') else ''
-            if ruta_sel:
-                buses[self.numero]['ruta'] = ruta_sel
-            # No tocar pasajeros ni ruta aquí
-            datos['buses'] = buses
-            self.data_manager.guardar_datos(datos)
-
-            messagebox.showinfo("Éxito", f"Bus '{self.numero}' actualizado correctamente")
-            self.dialog.destroy()
         except ValueError:
             messagebox.showerror("Error", "La capacidad debe ser un número entero")
-        except Exception as e:
+            return
+        # asignar ruta si se seleccionó
+        ruta_sel = self.ruta_var.get().strip() if hasattr(self, 'ruta_var') else ''
+
+        def guardar():
+            """Se ejecuta fuera del hilo de Tk; devuelve False si el bus ya no existe"""
+            bus_actual = self.data_manager.cargar_datos().get('buses', {}).get(self.numero)
+            if bus_actual is None:
+                return False
+            bus_dict = dict(bus_actual)
+            bus_dict['capacidad'] = capacidad
+            bus_dict['estado'] = estado
+            if ruta_sel:
+                bus_dict['ruta'] = ruta_sel
+            # No tocar pasajeros aquí
+            self.data_manager.guardar_bus(self.numero, bus_dict)
+            return True
+
+        def guardado(existia):
+            if existia:
+                messagebox.showinfo("Éxito", f"Bus '{self.numero}' actualizado correctamente")
+            else:
+                messagebox.showerror("Error", "El bus ya no existe")
+            self.dialog.destroy()
+
+        def fallo(e):
+            self.guardar_btn.state(['!disabled'])
             messagebox.showerror("Error", f"Error al guardar el bus: {str(e)}")
 
-    def _refresh_routes(self):
-        try:
-            datos = self.data_manager.cargar_datos()
-            rutas = list(datos.get('rutas', {}).keys())
-        except Exception:
-            rutas = []
-        self.ruta_combo['values'] = rutas
-        # establecer valor actual si existe
-        ruta_actual = self.bus_data.get('ruta')
-        if ruta_actual and ruta_actual in rutas:
-            self.ruta_var.set(ruta_actual)
+        self.guardar_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, guardar, al_terminar=guardado, al_fallar=fallo)
+
+    def _refresh_routes(self, seleccionar_ultima=False):
+        """Lee los nombres de ruta en segundo plano y actualiza el combobox"""
+        def mostrar(rutas):
+            self.ruta_combo['values'] = rutas
+            # establecer valor actual si existe
+            ruta_actual = self.bus_data.get('ruta')
+            if seleccionar_ultima and rutas:
+                self.ruta_var.set(rutas[-1])
+            elif ruta_actual and ruta_actual in rutas and not self.ruta_var.get():
+                self.ruta_var.set(ruta_actual)
+        en_segundo_plano(self.dialog, self.data_manager.claves, 'rutas', al_terminar=mostrar)
 
     def _crear_nueva_ruta(self):
         dialog = RutaDialog(self.dialog, self.data_manager)
         self.dialog.wait_window(dialog.dialog)
-        self._refresh_routes()
         # seleccionar la última ruta si existe
-        try:
-            datos = self.data_manager.cargar_datos()
-            rutas = list(datos.get('rutas', {}).keys())
-            if rutas:
-                self.ruta_var.set(rutas[-1])
-        except Exception:
-            pass
+        self._refresh_routes(seleccionar_ultima=True)
 
     def _editar_ruta_seleccionada(self):
         nombre = self.ruta_var.get().strip()
@@ -780,29 +896,29 @@ class FleetManagerDialog:
         btn_frame.pack(fill="x", pady=(0,8))
         ttk.Button(btn_frame, text="Agregar", command=self._add).pack(side="left", padx=4)
         ttk.Button(btn_frame, text="Editar", command=self._edit).pack(side="left", padx=4)
-        ttk.Button(btn_frame, text="Eliminar", command=self._delete).pack(side="left", padx=4)
+        self.eliminar_btn = ttk.Button(btn_frame, text="Eliminar", command=self._delete)
+        self.eliminar_btn.pack(side="left", padx=4)
         ttk.Button(btn_frame, text="Cerrar", command=self.dialog.destroy).pack(side="right", padx=4)
 
-        # Treeview
+        # Búsqueda por nombre o ruta
+        self.caja = CajaBusqueda(main_frame, lambda texto: self.data_manager.buscar('flota', texto),
+                                 al_filtrar=lambda: self.lista.refrescar())
+        self.caja.pack(fill="x", pady=(0, 8))
+
+        # Lista virtual: la flota se lee por páginas
+        self.vista = VistaFiltrada(self.data_manager, 'flota', lambda: self.caja.resultado)
         columns = ("Nombre", "Cantidad", "Capacidad", "Ruta")
-        self.tree = ttk.Treeview(main_frame, columns=columns, show="headings")
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=150)
-
-        vsb = ttk.Scrollbar(main_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
-        self.tree.pack(side="left", fill="both", expand=True)
-        vsb.pack(side="right", fill="y")
+        self.lista = ListaVirtual(
+            main_frame, columns,
+            contar=self.vista.contar,
+            obtener=self.vista.obtener,
+            formatear=lambda nombre, info: (nombre, info.get('cantidad', 0), info.get('capacidad', 0), info.get('ruta', '')),
+            anchos={col: 150 for col in columns})
+        self.lista.pack(fill="both", expand=True)
 
     def _load_flota(self):
-        datos = self.data_manager.cargar_datos()
-        flota = datos.get('flota', {})
-        # limpiar
-        for it in self.tree.get_children():
-            self.tree.delete(it)
-        for nombre, info in flota.items():
-            self.tree.insert("", "end", values=(nombre, info.get('cantidad', 0), info.get('capacidad', 0), info.get('ruta', '')))
+        # Repite la búsqueda para que incluya los cambios; al terminar refresca la lista
+        self.caja.actualizar()
 
     def _add(self):
         dialog = FleetItemDialog(self.dialog, self.data_manager)
@@ -810,12 +926,10 @@ class FleetManagerDialog:
         self._load_flota()
 
     def _edit(self):
-        sel = self.tree.selection()
-        if not sel:
+        nombre = self.lista.seleccion()
+        if nombre is None:
             messagebox.showinfo("Editar", "Seleccione un elemento de la flota")
             return
-        item = sel[0]
-        nombre = self.tree.item(item)['values'][0]
         datos = self.data_manager.cargar_datos()
         info = datos.get('flota', {}).get(nombre)
         if not info:
@@ -826,20 +940,24 @@ class FleetManagerDialog:
         self._load_flota()
 
     def _delete(self):
-        sel = self.tree.selection()
-        if not sel:
+        nombre = self.lista.seleccion()
+        if nombre is None:
             messagebox.showinfo("Eliminar", "Seleccione un elemento de la flota")
             return
-        item = sel[0]
-        nombre = self.tree.item(item)['values'][0]
-        if messagebox.askyesno("Confirmar", f"Eliminar '{nombre}'?"):
-            try:
-                datos = self.data_manager.cargar_datos()
-                datos.get('flota', {}).pop(nombre, None)
-                self.data_manager.guardar_datos(datos)
-                self._load_flota()
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al eliminar: {str(e)}")
+        if not messagebox.askyesno("Confirmar", f"Eliminar '{nombre}'?"):
+            return
+
+        def eliminado(_):
+            self.eliminar_btn.state(['!disabled'])
+            self._load_flota()
+
+        def fallo(e):
+            self.eliminar_btn.state(['!disabled'])
+            messagebox.showerror("Error", f"Error al eliminar: {str(e)}")
+
+        self.eliminar_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, self.data_manager.eliminar_flota_item, nombre,
+                         al_terminar=eliminado, al_fallar=fallo)
 
 
 class FleetItemDialog:
@@ -873,19 +991,19 @@ class FleetItemDialog:
         ttk.Entry(main, textvariable=self.cap_var, width=10).grid(row=2, column=1, sticky="w", pady=6)
 
         ttk.Label(main, text="Asignar Ruta:").grid(row=3, column=0, sticky="w", pady=6)
-        try:
-            datos = self.data_manager.cargar_datos()
-            rutas = list(datos.get('rutas', {}).keys())
-        except Exception:
-            rutas = []
         self.ruta_var = tk.StringVar(value=self.info.get('ruta', ''))
-        self.ruta_combo = ttk.Combobox(main, textvariable=self.ruta_var, values=rutas, state='readonly')
+        self.ruta_combo = ttk.Combobox(main, textvariable=self.ruta_var, state='readonly')
         self.ruta_combo.grid(row=3, column=1, sticky="w", pady=6)
 
+        def mostrar_rutas(rutas):
+            self.ruta_combo['values'] = rutas
+        en_segundo_plano(self.dialog, self.data_manager.claves, 'rutas', al_terminar=mostrar_rutas)
+
         # Botones
         btns = ttk.Frame(main)
         btns.grid(row=4, column=0, columnspan=2, pady=12)
-        ttk.Button(btns, text="Guardar", command=self._guardar).pack(side="left", padx=6)
+        self.guardar_btn = ttk.Button(btns, text="Guardar", command=self._guardar)
+        self.guardar_btn.pack(side="left", padx=6)
         ttk.Button(btns, text="Cancelar", command=self.dialog.destroy).pack(side="left", padx=6)
 
     def _guardar(self):
@@ -904,20 +1022,25 @@ class FleetItemDialog:
 
         ruta = self.ruta_var.get().strip()
 
-        try:
-            datos = self.data_manager.cargar_datos()
-            if 'flota' not in datos:
-                datos['flota'] = {}
-            # si renombró el elemento, eliminar el anterior
-            if self.nombre_original and self.nombre_original != nombre:
-                datos['flota'].pop(self.nombre_original, None)
-            datos['flota'][nombre] = {'cantidad': cantidad, 'capacidad': capacidad, 'ruta': ruta}
-            self.data_manager.guardar_datos(datos)
+        def guardado(_):
             messagebox.showinfo("Éxito", "Elemento de flota guardado")
             self.dialog.destroy()
-        except Exception as e:
+
+        def fallo(e):
+            self.guardar_btn.state(['!disabled'])
             messagebox.showerror("Error", f"Error al guardar: {str(e)}")
 
+        # si renombró el elemento, se elimina el anterior
+        self.guardar_btn.state(['disabled'])
+        en_segundo_plano(
+            self.dialog,
+            lambda: self.data_manager.guardar_flota_item(
+                nombre,
+                {'cantidad': cantidad, 'capacidad': capacidad, 'ruta': ruta},
+                nombre_anterior=self.nombre_original
+            ),
+            al_terminar=guardado, al_fallar=fallo)
+
 
 class EditarRutaDialog:
     def __init__(self, parent, data_manager, nombre_ruta, ruta_data):
@@ -959,16 +1082,28 @@ class EditarRutaDialog:
         self.paradas_text.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
+        # Los nombres de las paradas se leen en segundo plano; guardar espera a tenerlos
         paradas = self.ruta_data.get('paradas', [])
-        self.paradas_text.insert("1.0", "\n".join(paradas))
+
+        def mostrar_paradas(nombres):
+            self.paradas_text.insert("1.0", "\n".join(nombres))
+            self.guardar_btn.state(['!disabled'])
 
         # Botones
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=2, column=0, columnspan=2, pady=12)
-        ttk.Button(button_frame, text="Guardar", command=self._guardar).pack(side="left", padx=5)
-        ttk.Button(button_frame, text="Eliminar Ruta", command=self._eliminar).pack(side="left", padx=5)
+        self.guardar_btn = ttk.Button(button_frame, text="Guardar", command=self._guardar)
+        self.guardar_btn.pack(side="left", padx=5)
+        self.eliminar_btn = ttk.Button(button_frame, text="Eliminar Ruta", command=self._eliminar)
+        self.eliminar_btn.pack(side="left", padx=5)
+        self.guardar_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, self.data_manager.nombres_paradas, paradas, al_terminar=mostrar_paradas)
         ttk.Button(button_frame, text="Cancelar", command=self.dialog.destroy).pack(side="left", padx=5)
 
+    def _botones(self, estado):
+        self.guardar_btn.state([estado])
+        self.eliminar_btn.state([estado])
+
     def _guardar(self):
         try:
             nuevo_nombre = self.nombre_var.get().strip()
@@ -983,29 +1118,41 @@ class EditarRutaDialog:
 
             from models.ruta import Ruta
             ruta = Ruta(nuevo_nombre, paradas)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al guardar la ruta: {str(e)}")
+            return
 
-            datos = self.data_manager.cargar_datos()
-            if nuevo_nombre != self.nombre_original:
-                datos.get('rutas', {}).pop(self.nombre_original, None)
-            if 'rutas' not in datos:
-                datos['rutas'] = {}
-            datos['rutas'][nuevo_nombre] = ruta.to_dict()
-            self.data_manager.guardar_datos(datos)
+        def guardada(_):
             messagebox.showinfo("Éxito", f"Ruta '{nuevo_nombre}' actualizada")
             self.dialog.destroy()
-        except Exception as e:
+
+        def fallo(e):
+            self._botones('!disabled')
             messagebox.showerror("Error", f"Error al guardar la ruta: {str(e)}")
 
+        # Guardar o eliminar corre en segundo plano; los botones evitan enviarlo dos veces
+        self._botones('disabled')
+        en_segundo_plano(
+            self.dialog,
+            lambda: self.data_manager.guardar_ruta(nuevo_nombre, ruta.to_dict(),
+                                                   nombre_anterior=self.nombre_original),
+            al_terminar=guardada, al_fallar=fallo)
+
     def _eliminar(self):
-        if messagebox.askyesno("Confirmar Eliminación", f"¿Eliminar la ruta '{self.nombre_original}'?"):
-            try:
-                datos = self.data_manager.cargar_datos()
-                datos.get('rutas', {}).pop(self.nombre_original, None)
-                self.data_manager.guardar_datos(datos)
-                messagebox.showinfo("Éxito", f"Ruta '{self.nombre_original}' eliminada")
-                self.dialog.destroy()
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al eliminar la ruta: {str(e)}")
+        if not messagebox.askyesno("Confirmar Eliminación", f"¿Eliminar la ruta '{self.nombre_original}'?"):
+            return
+
+        def eliminada(_):
+            messagebox.showinfo("Éxito", f"Ruta '{self.nombre_original}' eliminada")
+            self.dialog.destroy()
+
+        def fallo(e):
+            self._botones('!disabled')
+            messagebox.showerror("Error", f"Error al eliminar la ruta: {str(e)}")
+
+        self._botones('disabled')
+        en_segundo_plano(self.dialog, self.data_manager.eliminar_ruta, self.nombre_original,
+                         al_terminar=eliminada, al_fallar=fallo)
 
 
 class RutaDialog:
@@ -1013,7 +1160,7 @@ class RutaDialog:
         self.data_manager = data_manager
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Nueva Ruta")
-        self.dialog.geometry("600x420")
+        self.dialog.geometry("600x480")
         self.dialog.resizable(False, False)
         self.dialog.transient(parent)
         self.dialog.grab_set()
@@ -1033,12 +1180,22 @@ class RutaDialog:
         self.nombre_var = tk.StringVar()
         ttk.Entry(main_frame, textvariable=self.nombre_var, width=30).grid(row=0, column=1, pady=5, padx=(10, 0))
         
+        # Búsqueda de paradas conocidas con autocompletado
+        ttk.Label(main_frame, text="Buscar parada:").grid(row=1, column=0, sticky="nw", pady=5)
+        busqueda_frame = ttk.Frame(main_frame)
+        busqueda_frame.grid(row=1, column=1, pady=5, padx=(10, 0), sticky="ew")
+        self.entrada_parada = EntradaParada(busqueda_frame, None, width=40)
+        self.entrada_parada.pack(side="left", fill="x", expand=True, anchor="n")
+        self.agregar_btn = ttk.Button(busqueda_frame, text="Agregar", command=self._agregar_parada)
+        self.agregar_btn.pack(side="left", padx=(5, 0), anchor="n")
+        self.entrada_parada.entry.bind("<Return>", self._agregar_parada)
+        
         # Lista de paradas
-        ttk.Label(main_frame, text="Paradas (una por línea):").grid(row=1, column=0, sticky="nw", pady=5)
+        ttk.Label(main_frame, text="Paradas (una por línea):").grid(row=2, column=0, sticky="nw", pady=5)
         
         # Text widget para paradas
         text_frame = ttk.Frame(main_frame)
-        text_frame.grid(row=1, column=1, pady=5, padx=(10, 0), sticky="nsew")
+        text_frame.grid(row=2, column=1, pady=5, padx=(10, 0), sticky="nsew")
         
         self.paradas_text = tk.Text(text_frame, width=50, height=14)
         scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=self.paradas_text.yview)
@@ -1049,10 +1206,34 @@ class RutaDialog:
         
         # Botones
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=2, column=0, columnspan=2, pady=20)
+        button_frame.grid(row=3, column=0, columnspan=2, pady=20)
         
-        ttk.Button(button_frame, text="Crear", command=self._crear_ruta).pack(side="left", padx=5)
+        self.crear_btn = ttk.Button(button_frame, text="Crear", command=self._crear_ruta)
+        self.crear_btn.pack(side="left", padx=5)
         ttk.Button(button_frame, text="Cancelar", command=self.dialog.destroy).pack(side="left", padx=5)
+
+        # El nomenclátor puede tardar en construirse la primera vez: se carga en segundo plano
+        self.nomenclator = None
+        self.agregar_btn.state(['disabled'])
+        self.crear_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, self.data_manager.nomenclator, al_terminar=self._nomenclator_listo)
+
+    def _nomenclator_listo(self, nomenclator):
+        self.nomenclator = self.entrada_parada.nomenclator = nomenclator
+        self.agregar_btn.state(['!disabled'])
+        self.crear_btn.state(['!disabled'])
+    
+    def _agregar_parada(self, event=None):
+        """Agrega la parada buscada como nueva línea de la lista"""
+        if not self.entrada_parada.get() or self.nomenclator is None:
+            return
+        nombre = confirmar_parada(self.dialog, self.nomenclator, self.entrada_parada.get())
+        if nombre is None:
+            return
+        if self.paradas_text.get("1.0", "end-1c").strip():
+            nombre = "\n" + nombre
+        self.paradas_text.insert(tk.END, nombre)
+        self.entrada_parada.limpiar()
     
     def _crear_ruta(self):
         try:
@@ -1063,29 +1244,37 @@ class RutaDialog:
                 messagebox.showerror("Error", "El nombre de la ruta es obligatorio")
                 return
             
-            # Procesar paradas
+            # Procesar paradas; las escritas a mano se comparan con las conocidas
             paradas = []
             if paradas_text:
-                paradas = [p.strip() for p in paradas_text.split('\n') if p.strip()]
+                for linea in paradas_text.split('\n'):
+                    if not linea.strip():
+                        continue
+                    parada = confirmar_parada(self.dialog, self.nomenclator, linea)
+                    if parada is None:
+                        return
+                    paradas.append(parada)
             
             # Crear la ruta
             from models.ruta import Ruta
             ruta = Ruta(nombre, paradas)
-            
-            # Guardar en el data manager
-            datos = self.data_manager.cargar_datos()
-            if 'rutas' not in datos:
-                datos['rutas'] = {}
-            
-            datos['rutas'][nombre] = ruta.to_dict()
-            self.data_manager.guardar_datos(datos)
-            
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al crear la ruta: {str(e)}")
+            return
+
+        def creada(_):
             messagebox.showinfo("Éxito", f"Ruta '{nombre}' creada exitosamente con {len(paradas)} paradas")
             self.dialog.destroy()
-            
-        except Exception as e:
+
+        def fallo(e):
+            self.crear_btn.state(['!disabled'])
             messagebox.showerror("Error", f"Error al crear la ruta: {str(e)}")
 
+        # Guardar en el data manager, en segundo plano
+        self.crear_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, self.data_manager.guardar_ruta, nombre, ruta.to_dict(),
+                         al_terminar=creada, al_fallar=fallo)
+
 
 class EditarRecorridoDialog:
     def __init__(self, parent, data_manager, nombre_ruta, ruta_data):
@@ -1097,11 +1286,19 @@ class EditarRecorridoDialog:
         self.dialog.geometry("800x600")
         self.dialog.transient(parent)
         self.dialog.grab_set()
+        # El recorrido en edición se publica en la capa en vivo hasta guardar o cancelar
+        self._guardado = False
         
         # Centrar la ventana
         self.dialog.geometry("+%d+%d" % (parent.winfo_rootx() + 50, parent.winfo_rooty() + 50))
         
         self._create_widgets()
+        self.dialog.bind("<Destroy>", self._al_cerrar, add="+")
+
+    def _al_cerrar(self, event):
+        # Si no se guardó, el borrador no debe quedar en el mapa abierto
+        if event.widget is self.dialog and not self._guardado:
+            capa_compartida().eliminar_ruta(self.nombre_ruta)
     
     def _create_widgets(self):
         # Frame principal con 2 columnas
@@ -1112,8 +1309,9 @@ class EditarRecorridoDialog:
         map_frame = ttk.LabelFrame(main_frame, text="Mapa de Recorrido")
         map_frame.pack(side="left", fill="both", expand=True, padx=(0, 5))
         
-        # Crear vista del mapa
-        self.map_view = MapView(map_frame)
+        # Crear vista del mapa (reutiliza el HTML si el recorrido no cambió)
+        ruta = self.data_manager.obtener_ruta(self.nombre_ruta)
+        self.map_view = MapView(map_frame, [ruta] if ruta else [])
         self.map_view.pack(fill="both", expand=True)
         
         # Frame derecho para la lista de paradas y botones
@@ -1132,17 +1330,13 @@ class EditarRecorridoDialog:
         self.paradas_listbox.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
-        # Cargar paradas existentes
-        paradas = self.ruta_data.get('paradas', [])
-        for parada in paradas:
-            self.paradas_listbox.insert(tk.END, parada)
-        
         # Frame para botones de control de paradas
         buttons_frame = ttk.Frame(control_frame)
         buttons_frame.pack(fill="x", pady=10)
         
-        ttk.Button(buttons_frame, text="Agregar Parada", 
-                  command=self._agregar_parada).pack(fill="x", pady=2)
+        self.agregar_btn = ttk.Button(buttons_frame, text="Agregar Parada", 
+                                      command=self._agregar_parada)
+        self.agregar_btn.pack(fill="x", pady=2)
         ttk.Button(buttons_frame, text="Eliminar Parada", 
                   command=self._eliminar_parada).pack(fill="x", pady=2)
         ttk.Button(buttons_frame, text="Mover Arriba", 
@@ -1154,18 +1348,35 @@ class EditarRecorridoDialog:
         action_frame = ttk.Frame(control_frame)
         action_frame.pack(fill="x", pady=10)
         
-        ttk.Button(action_frame, text="Guardar Cambios", 
-                  command=self._guardar_cambios).pack(side="left", padx=5)
+        self.guardar_btn = ttk.Button(action_frame, text="Guardar Cambios", 
+                                      command=self._guardar_cambios)
+        self.guardar_btn.pack(side="left", padx=5)
         ttk.Button(action_frame, text="Cancelar", 
                   command=self.dialog.destroy).pack(side="left", padx=5)
+
+        # Las paradas existentes y el nomenclátor se leen en segundo plano
+        self.nomenclator = None
+        self.agregar_btn.state(['disabled'])
+        self.guardar_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, self._leer_paradas, self.ruta_data.get('paradas', []),
+                         al_terminar=self._paradas_listas)
+
+    def _leer_paradas(self, paradas):
+        """Se ejecuta fuera del hilo de Tk"""
+        return self.data_manager.nombres_paradas(paradas), self.data_manager.nomenclator()
+
+    def _paradas_listas(self, resultado):
+        nombres, self.nomenclator = resultado
+        for parada in nombres:
+            self.paradas_listbox.insert(tk.END, parada)
+        self.agregar_btn.state(['!disabled'])
+        self.guardar_btn.state(['!disabled'])
     
     def _agregar_parada(self):
         """Agrega una nueva parada al recorrido"""
-        nueva_parada = simpledialog.askstring("Nueva Parada", 
-                                            "Ingrese el nombre de la parada:",
-                                            parent=self.dialog)
+        nueva_parada = pedir_parada(self.dialog, self.nomenclator)
         if nueva_parada:
-            self.paradas_listbox.insert(tk.END, nueva_parada.strip())
+            self.paradas_listbox.insert(tk.END, nueva_parada)
             self._actualizar_mapa()
     
     def _eliminar_parada(self):
@@ -1200,31 +1411,39 @@ class EditarRecorridoDialog:
         # Obtener lista actual de paradas
         paradas = list(self.paradas_listbox.get(0, tk.END))
         
-        # Actualizar el mapa (implementar en MapView la funcionalidad necesaria)
-        # self.map_view.actualizar_recorrido(paradas)
-        pass
+        # El mapa abierto muestra el recorrido editado en su capa en vivo
+        capa_compartida().actualizar_ruta(self.nombre_ruta, self.data_manager.posiciones_paradas(paradas))
     
     def _guardar_cambios(self):
         """Guarda los cambios en el recorrido"""
-        try:
-            # Obtener lista actual de paradas
-            paradas = list(self.paradas_listbox.get(0, tk.END))
-            
-            if not paradas:
-                messagebox.showerror("Error", "Debe haber al menos una parada")
-                return
-            
-            # Actualizar datos
+        # Obtener lista actual de paradas
+        paradas = list(self.paradas_listbox.get(0, tk.END))
+        
+        if not paradas:
+            messagebox.showerror("Error", "Debe haber al menos una parada")
+            return
+
+        def guardar():
+            """Se ejecuta fuera del hilo de Tk"""
             datos = self.data_manager.cargar_datos()
-            datos['rutas'][self.nombre_ruta]['paradas'] = paradas
-            self.data_manager.guardar_datos(datos)
-            
+            ruta_data = dict(datos['rutas'][self.nombre_ruta])
+            ruta_data['paradas'] = paradas
+            self.data_manager.guardar_ruta(self.nombre_ruta, ruta_data)
+
+        def guardado(_):
+            # El mapa abierto muestra el recorrido guardado hasta que se vuelva a generar
+            self._guardado = True
+            self._actualizar_mapa()
             messagebox.showinfo("Éxito", f"Recorrido de la ruta '{self.nombre_ruta}' actualizado exitosamente")
             self.dialog.destroy()
-            
-        except Exception as e:
+
+        def fallo(e):
+            self.guardar_btn.state(['!disabled'])
             messagebox.showerror("Error", f"Error al guardar el recorrido: {str(e)}")
 
+        self.guardar_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, guardar, al_terminar=guardado, al_fallar=fallo)
+
 
 class EditarRecorridoDialog:
     def __init__(self, parent, data_manager, nombre_ruta, ruta_data):
@@ -1236,11 +1455,19 @@ class EditarRecorridoDialog:
         self.dialog.geometry("800x600")
         self.dialog.transient(parent)
         self.dialog.grab_set()
+        # El recorrido en edición se publica en la capa en vivo hasta guardar o cancelar
+        self._guardado = False
         
         # Centrar la ventana
         self.dialog.geometry("+%d+%d" % (parent.winfo_rootx() + 50, parent.winfo_rooty() + 50))
         
         self._create_widgets()
+        self.dialog.bind("<Destroy>", self._al_cerrar, add="+")
+
+    def _al_cerrar(self, event):
+        # Si no se guardó, el borrador no debe quedar en el mapa abierto
+        if event.widget is self.dialog and not self._guardado:
+            capa_compartida().eliminar_ruta(self.nombre_ruta)
         
     def _create_widgets(self):
         # Frame principal con 2 columnas
@@ -1251,8 +1478,9 @@ class EditarRecorridoDialog:
         map_frame = ttk.LabelFrame(main_frame, text="Mapa de Recorrido")
         map_frame.pack(side="left", fill="both", expand=True, padx=(0, 5))
         
-        # Crear vista del mapa
-        self.map_view = MapView(map_frame)
+        # Crear vista del mapa (reutiliza el HTML si el recorrido no cambió)
+        ruta = self.data_manager.obtener_ruta(self.nombre_ruta)
+        self.map_view = MapView(map_frame, [ruta] if ruta else [])
         self.map_view.pack(fill="both", expand=True)
         
         # Frame derecho para la lista de paradas y botones
@@ -1271,17 +1499,13 @@ class EditarRecorridoDialog:
         self.paradas_listbox.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
-        # Cargar paradas existentes
-        paradas = self.ruta_data.get('paradas', [])
-        for parada in paradas:
-            self.paradas_listbox.insert(tk.END, parada)
-        
         # Frame para botones de control de paradas
         buttons_frame = ttk.Frame(control_frame)
         buttons_frame.pack(fill="x", pady=10)
         
-        ttk.Button(buttons_frame, text="Agregar Parada", 
-                  command=self._agregar_parada).pack(fill="x", pady=2)
+        self.agregar_btn = ttk.Button(buttons_frame, text="Agregar Parada", 
+                                      command=self._agregar_parada)
+        self.agregar_btn.pack(fill="x", pady=2)
         ttk.Button(buttons_frame, text="Eliminar Parada", 
                   command=self._eliminar_parada).pack(fill="x", pady=2)
         ttk.Button(buttons_frame, text="Mover Arriba", 
@@ -1293,18 +1517,35 @@ class EditarRecorridoDialog:
         action_frame = ttk.Frame(control_frame)
         action_frame.pack(fill="x", pady=10)
         
-        ttk.Button(action_frame, text="Guardar Cambios", 
-                  command=self._guardar_cambios).pack(side="left", padx=5)
+        self.guardar_btn = ttk.Button(action_frame, text="Guardar Cambios", 
+                                      command=self._guardar_cambios)
+        self.guardar_btn.pack(side="left", padx=5)
         ttk.Button(action_frame, text="Cancelar", 
                   command=self.dialog.destroy).pack(side="left", padx=5)
+
+        # Las paradas existentes y el nomenclátor se leen en segundo plano
+        self.nomenclator = None
+        self.agregar_btn.state(['disabled'])
+        self.guardar_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, self._leer_paradas, self.ruta_data.get('paradas', []),
+                         al_terminar=self._paradas_listas)
+
+    def _leer_paradas(self, paradas):
+        """Se ejecuta fuera del hilo de Tk"""
+        return self.data_manager.nombres_paradas(paradas), self.data_manager.nomenclator()
+
+    def _paradas_listas(self, resultado):
+        nombres, self.nomenclator = resultado
+        for parada in nombres:
+            self.paradas_listbox.insert(tk.END, parada)
+        self.agregar_btn.state(['!disabled'])
+        self.guardar_btn.state(['!disabled'])
     
     def _agregar_parada(self):
         """Agrega una nueva parada al recorrido"""
-        nueva_parada = simpledialog.askstring("Nueva Parada", 
-                                            "Ingrese el nombre de la parada:",
-                                            parent=self.dialog)
+        nueva_parada = pedir_parada(self.dialog, self.nomenclator)
         if nueva_parada:
-            self.paradas_listbox.insert(tk.END, nueva_parada.strip())
+            self.paradas_listbox.insert(tk.END, nueva_parada)
             self._actualizar_mapa()
     
     def _eliminar_parada(self):
@@ -1339,27 +1580,35 @@ class EditarRecorridoDialog:
         # Obtener lista actual de paradas
         paradas = list(self.paradas_listbox.get(0, tk.END))
         
-        # Actualizar el mapa (implementar en MapView la funcionalidad necesaria)
-        # self.map_view.actualizar_recorrido(paradas)
-        pass
+        # El mapa abierto muestra el recorrido editado en su capa en vivo
+        capa_compartida().actualizar_ruta(self.nombre_ruta, self.data_manager.posiciones_paradas(paradas))
     
     def _guardar_cambios(self):
         """Guarda los cambios en el recorrido"""
-        try:
-            # Obtener lista actual de paradas
-            paradas = list(self.paradas_listbox.get(0, tk.END))
-            
-            if not paradas:
-                messagebox.showerror("Error", "Debe haber al menos una parada")
-                return
-            
-            # Actualizar datos
+        # Obtener lista actual de paradas
+        paradas = list(self.paradas_listbox.get(0, tk.END))
+        
+        if not paradas:
+            messagebox.showerror("Error", "Debe haber al menos una parada")
+            return
+
+        def guardar():
+            """Se ejecuta fuera del hilo de Tk"""
             datos = self.data_manager.cargar_datos()
-            datos['rutas'][self.nombre_ruta]['paradas'] = paradas
-            self.data_manager.guardar_datos(datos)
-            
+            ruta_data = dict(datos['rutas'][self.nombre_ruta])
+            ruta_data['paradas'] = paradas
+            self.data_manager.guardar_ruta(self.nombre_ruta, ruta_data)
+
+        def guardado(_):
+            # El mapa abierto muestra el recorrido guardado hasta que se vuelva a generar
+            self._guardado = True
+            self._actualizar_mapa()
             messagebox.showinfo("Éxito", f"Recorrido de la ruta '{self.nombre_ruta}' actualizado exitosamente")
             self.dialog.destroy()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al guardar el recorrido: {str(e)}")
\ No newline at end of file
+
+        def fallo(e):
+            self.guardar_btn.state(['!disabled'])
+            messagebox.showerror("Error", f"Error al guardar el recorrido: {str(e)}")
+
+        self.guardar_btn.state(['disabled'])
+        en_segundo_plano(self.dialog, guardar, al_terminar=guardado, al_fallar=fallo)
@@ -1,71 +1,327 @@
 import tkinter as tk
 import folium
+import hashlib
+import json
 import os
-import tempfile
+import threading
 import webbrowser # 👈 Usaremos la biblioteca estándar de Python
+from concurrent.futures import Future, ThreadPoolExecutor
+from folium import plugins
+
+from config import HOST, PORT, MAP_CACHE_DIR, MAP_CACHE_MAX, MAP_POLL_INTERVAL, MAP_PAYLOAD_MAX, TILE_CONFIG
+from services.almacenamiento import escribir_atomico
+from utils.geo import simplificar
+
+# Subir al cambiar cómo se dibuja el mapa, para no reutilizar HTML anteriores
+VERSION_MAPA = 4
+
+# Coordenadas de Coquimbo
+MAP_CENTER_COQUIMBO = [-29.9533, -71.3436]
+
+# Marcadores de referencia: (posición, texto, color, icono)
+MARCADORES_COQUIMBO = [
+    ([-29.9654, -71.3508], 'Cruz del Tercer Milenio', 'blue', 'plus'),
+    ([-29.9545, -71.3440], 'Plaza de Armas de Coquimbo', 'green', 'info-sign'),
+    ([-29.9366, -71.3364], 'Fuerte Lambert', 'red', 'shield')
+]
+
+# Un solo hilo genera los mapas; los pedidos del mismo mapa se comparten
+_generador = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mapa")
+_en_curso = {}
+_en_curso_lock = threading.Lock()
+
+# Tolerancia de simplificación de los recorridos por nivel de zoom: ~1 píxel, en grados
+TOLERANCIAS_ZOOM = {zoom: 360 / (256 * 2 ** zoom) for zoom in range(10, 19)}
+
+# Dibuja la red (paradas agrupadas y recorridos) desde un único GeoJSON embebido;
+# cada recorrido cambia al nivel de simplificación que corresponde al zoom
+SCRIPT_RED = """
+<script>
+window.addEventListener('load', function () {
+    var mapa = %(mapa)s, paradas = %(paradas)s, red = %(red)s, lineas = [];
+
+    L.geoJSON(red, {
+        filter: function (f) { return f.properties.tipo === 'ruta'; },
+        style: {color: '#3388ff', weight: 4, opacity: 0.8},
+        onEachFeature: function (f, capa) {
+            capa.bindTooltip(f.properties.nombre);
+            lineas.push([capa, f.properties.niveles]);
+        }
+    }).addTo(mapa);
+
+    paradas.addLayers(red.features.filter(function (f) { return f.properties.tipo === 'parada'; })
+        .map(function (f) {
+            var c = f.geometry.coordinates;
+            return L.circleMarker([c[1], c[0]], {radius: 4, fillOpacity: 0.8}).bindPopup(f.properties.nombre);
+        }));
+
+    function aplicarZoom() {
+        var zoom = mapa.getZoom();
+        lineas.forEach(function (linea) {
+            var zooms = Object.keys(linea[1]).map(Number), elegido = Math.min.apply(null, zooms);
+            zooms.forEach(function (z) { if (z <= zoom && z > elegido) { elegido = z; } });
+            linea[0].setLatLngs(linea[1][elegido].map(function (c) { return [c[1], c[0]]; }));
+        });
+    }
+    mapa.on('zoomend', aplicarZoom);
+    aplicarZoom();
+});
+</script>
+"""
+
+# Consulta /cambios en el servidor de services/mapa_vivo.py y aplica solo las diferencias
+SCRIPT_CAPA_VIVA = """
+<script>
+window.addEventListener('load', function () {
+    var buses = %(buses)s, url = %(url)s, intervalo = %(intervalo)d;
+    var rutas = L.layerGroup().addTo(%(mapa)s), marcadores = {}, lineas = {}, version = 0;
+
+    function texto(numero, p) {
+        return 'Bus ' + numero + ' · ' + (p.ruta || '') + '<br>' + (p.parada || '') + ' · ' +
+            p.pasajeros + '/' + p.capacidad + ' pasajeros';
+    }
+
+    function aplicar(cambios) {
+        if (cambios.completo) { buses.clearLayers(); rutas.clearLayers(); marcadores = {}; lineas = {}; }
+        var nuevos = [];
+        cambios.features.forEach(function (f) {
+            var c = f.geometry.coordinates, p = f.properties;
+            if (p.tipo === 'bus') {
+                if (marcadores[f.id]) {
+                    marcadores[f.id].setLatLng([c[1], c[0]]).setTooltipContent(texto(f.id, p));
+                } else {
+                    marcadores[f.id] = L.circleMarker([c[1], c[0]], {radius: 5, color: '#d32f2f', fillOpacity: 0.9})
+                        .bindTooltip(texto(f.id, p));
+                    nuevos.push(marcadores[f.id]);
+                }
+            } else if (lineas[f.id]) {
+                lineas[f.id].setLatLngs(c.map(function (x) { return [x[1], x[0]]; }));
+            } else {
+                lineas[f.id] = L.polyline(c.map(function (x) { return [x[1], x[0]]; }),
+                    {color: '#ff9800', dashArray: '6'}).bindTooltip(f.id).addTo(rutas);
+            }
+        });
+        // Agregar en bloque es mucho más rápido para el agrupador
+        buses.addLayers(nuevos);
+        buses.removeLayers(cambios.eliminados.buses.filter(function (n) { return marcadores[n]; })
+            .map(function (n) { var m = marcadores[n]; delete marcadores[n]; return m; }));
+        cambios.eliminados.rutas.forEach(function (nombre) {
+            if (lineas[nombre]) { rutas.removeLayer(lineas[nombre]); delete lineas[nombre]; }
+        });
+        version = cambios.version;
+    }
+
+    function consultar() {
+        fetch(url + '/cambios?desde=' + version)
+            .then(function (respuesta) { return respuesta.json(); })
+            .then(aplicar)
+            .catch(function () {})
+            .then(function () { setTimeout(consultar, intervalo); });
+    }
+    consultar();
+});
+</script>
+"""
+
+# Si el servidor local no arrancó, las teselas se piden directamente a TILE_CONFIG['url']
+_teselas_locales = True
+
+def usar_teselas_locales(activas):
+    """Indica si el servidor local del mapa está disponible para entregar las teselas"""
+    global _teselas_locales
+    _teselas_locales = bool(activas)
+
+def entradas_mapa(rutas=None, marcadores=None):
+    """Todo lo que determina el contenido del mapa, en forma serializable"""
+    return {
+        'version': VERSION_MAPA,
+        'centro': MAP_CENTER_COQUIMBO,
+        'capa_viva': {'url': f"http://{HOST}:{PORT}", 'intervalo': MAP_POLL_INTERVAL},
+        # Teselas desde la caché local (services/teselas.py), también sin conexión
+        'teselas': (f"http://{HOST}:{PORT}/teselas/{{z}}/{{x}}/{{y}}.png" if _teselas_locales
+                    else TILE_CONFIG['url']),
+        'marcadores': [list(m) for m in (MARCADORES_COQUIMBO if marcadores is None else marcadores)],
+        'rutas': [{
+            'nombre': ruta.nombre,
+            'paradas': [[str(parada), list(getattr(parada, 'posicion', None) or [])]
+                        for parada in ruta.paradas]
+        } for ruta in rutas or []]
+    }
+
+def clave_mapa(entradas):
+    contenido = json.dumps(entradas, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:24]
+
+def generar_mapa(entradas):
+    """Devuelve un Future con la ruta del HTML del mapa.
+
+    Si un mapa con las mismas entradas ya está en MAP_CACHE_DIR el Future
+    está resuelto de inmediato; si no, se genera en segundo plano.
+    """
+    archivo = MAP_CACHE_DIR / f"buscango_map_{clave_mapa(entradas)}.html"
+    with _en_curso_lock:
+        futuro = _en_curso.get(archivo)
+        if futuro is not None:
+            return futuro
+        if archivo.exists():
+            # Marcar como usado recientemente para la limpieza del caché
+            os.utime(archivo)
+            futuro = Future()
+            futuro.set_result(archivo)
+            return futuro
+        futuro = _en_curso[archivo] = _generador.submit(_generar, entradas, archivo)
+    return futuro
+
+def _generar(entradas, archivo):
+    try:
+        MAP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        escribir_atomico(archivo, _construir_html(entradas))
+        _limpiar_cache()
+        return archivo
+    finally:
+        with _en_curso_lock:
+            _en_curso.pop(archivo, None)
+
+def _construir_html(entradas):
+    # Canvas en lugar de SVG: miles de marcadores en movimiento
+    m = folium.Map(location=entradas['centro'], zoom_start=14, tiles=None, prefer_canvas=True)
+    folium.TileLayer(tiles=entradas['teselas'], name='OpenStreetMap', max_zoom=19,
+                     attr='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>').add_to(m)
+
+    title_html = '<h3 align="center" style="font-size:20px"><b>BuScanGo - Mapa de Coquimbo</b></h3>'
+    m.get_root().html.add_child(folium.Element(title_html))
+
+    for posicion, texto, color, icono in entradas['marcadores']:
+        folium.Marker(
+            posicion,
+            popup=texto,
+            icon=folium.Icon(color=color, icon=icono)
+        ).add_to(m)
+
+    # Paradas y buses se agrupan en el navegador según el zoom
+    paradas = plugins.MarkerCluster(name="Paradas", options={'chunkedLoading': True,
+                                                             'disableClusteringAtZoom': 17}).add_to(m)
+    buses = plugins.MarkerCluster(name="Buses", options={'chunkedLoading': True}).add_to(m)
+
+    red = _red_geojson(entradas['rutas'], MAP_PAYLOAD_MAX)
+    m.get_root().html.add_child(folium.Element(SCRIPT_RED % {
+        'mapa': m.get_name(), 'paradas': paradas.get_name(),
+        # "</" dentro de un nombre cerraría el <script>
+        'red': json.dumps(red, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')}))
+
+    capa = entradas['capa_viva']
+    m.get_root().html.add_child(folium.Element(SCRIPT_CAPA_VIVA % {
+        'mapa': m.get_name(), 'buses': buses.get_name(),
+        'url': json.dumps(capa['url']), 'intervalo': capa['intervalo']}))
+
+    return m.get_root().render()
+
+def _coordenadas_geojson(puntos):
+    # GeoJSON usa [lon, lat]; 5 decimales son ~1 m
+    return [[round(lon, 5), round(lat, 5)] for lat, lon in puntos]
+
+def _red_geojson(rutas, presupuesto):
+    """Paradas y recorridos en un FeatureCollection de a lo más ~presupuesto bytes.
+
+    Cada recorrido lleva en ``niveles`` su línea simplificada para cada zoom
+    de TOLERANCIAS_ZOOM (solo los niveles que cambian algo). Los niveles se
+    agregan del más grueso al más fino mientras quepan en el presupuesto; el
+    más grueso y las paradas se incluyen siempre.
+    """
+    paradas = {}
+    lineas = []
+    for ruta in rutas:
+        ubicadas = [(nombre, posicion) for nombre, posicion in ruta['paradas'] if posicion]
+        for nombre, (lat, lon) in ubicadas:
+            # Las paradas compartidas entre rutas se dibujan una vez
+            paradas.setdefault((nombre, round(lat, 5), round(lon, 5)), None)
+        if len(ubicadas) > 1:
+            lineas.append((ruta['nombre'], [posicion for _, posicion in ubicadas]))
+
+    features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                 'properties': {'tipo': 'parada', 'nombre': nombre}}
+                for nombre, lat, lon in paradas]
+    usado = len(json.dumps(features, ensure_ascii=False, separators=(',', ':')))
+
+    niveles = [{} for _ in lineas]
+    for zoom in sorted(TOLERANCIAS_ZOOM):
+        nivel = [_coordenadas_geojson(simplificar(puntos, TOLERANCIAS_ZOOM[zoom])) for _, puntos in lineas]
+        nuevos = [(i, coordenadas) for i, coordenadas in enumerate(nivel)
+                  if not niveles[i] or niveles[i][max(niveles[i])] != coordenadas]
+        tamano = sum(len(json.dumps(coordenadas, separators=(',', ':'))) for _, coordenadas in nuevos)
+        if any(niveles) and usado + tamano > presupuesto:
+            break
+        for i, coordenadas in nuevos:
+            niveles[i][zoom] = coordenadas
+        usado += tamano
+
+    for (nombre, _), por_zoom in zip(lineas, niveles):
+        features.append({'type': 'Feature',
+                         'geometry': {'type': 'LineString', 'coordinates': por_zoom[min(por_zoom)]},
+                         'properties': {'tipo': 'ruta', 'nombre': nombre, 'niveles': por_zoom}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+def _limpiar_cache():
+    """Borra los mapas menos usados si hay más de MAP_CACHE_MAX"""
+    archivos = sorted(MAP_CACHE_DIR.glob("buscango_map_*.html"),
+                      key=lambda archivo: archivo.stat().st_mtime, reverse=True)
+    for archivo in archivos[MAP_CACHE_MAX:]:
+        try:
+            archivo.unlink()
+        except OSError:
+            pass
 
 class MapView(tk.Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, rutas=None, marcadores=None):
         super().__init__(parent)
         self.parent = parent
         self.temp_file = None
+        self._futuro = None
 
-        # 1. Crear el archivo del mapa al iniciar
-        try:
-            self._create_map_file()
-            
-            # 2. Crear un botón grande y claro para abrir el mapa
-            launch_button = tk.Button(
-                self, 
-                text="🗺️ Abrir Mapa de Coquimbo", 
-                command=self._open_map_in_browser,
-                bg="#4285F4",  # Un color similar al de Google
-                fg="white",
-                font=("Arial", 14, "bold"),
-                relief=tk.FLAT,
-                padx=20,
-                pady=15
-            )
-            launch_button.pack(expand=True, padx=50, pady=50)
+        # Botón grande y claro para abrir el mapa; se habilita cuando el mapa está listo
+        self.launch_button = tk.Button(
+            self,
+            text="🗺️ Abrir Mapa de Coquimbo",
+            command=self._open_map_in_browser,
+            bg="#4285F4",  # Un color similar al de Google
+            fg="white",
+            font=("Arial", 14, "bold"),
+            relief=tk.FLAT,
+            padx=20,
+            pady=15
+        )
+        self.launch_button.pack(expand=True, padx=50, pady=50)
+        self.actualizar(rutas, marcadores)
 
+    def actualizar(self, rutas=None, marcadores=None):
+        """Pide el mapa para estas rutas y marcadores sin bloquear la interfaz"""
+        try:
+            futuro = self._futuro = generar_mapa(entradas_mapa(rutas, marcadores))
         except Exception as e:
             self._display_error_message(f"Error fatal al crear el archivo del mapa: {e}")
             return
+        if futuro.done():
+            self._mapa_listo(futuro)
+        else:
+            self.launch_button.config(state=tk.DISABLED, text="⏳ Generando mapa...")
+            self.after(100, self._esperar_mapa, futuro)
 
-    def _create_map_file(self):
-        """Crea el archivo HTML del mapa y lo guarda en una carpeta temporal."""
-        # --- CAMBIOS AQUÍ ---
-        # Coordenadas de Coquimbo
-        map_center = [-29.9533, -71.3436]
-        
-        m = folium.Map(location=map_center, zoom_start=14, tiles='OpenStreetMap')
-        
-        title_html = '<h3 align="center" style="font-size:20px"><b>BuScanGo - Mapa de Coquimbo</b></h3>'
-        m.get_root().html.add_child(folium.Element(title_html))
-
-        # Marcadores de ejemplo para Coquimbo
-        folium.Marker(
-            [-29.9654, -71.3508], 
-            popup='Cruz del Tercer Milenio',
-            icon=folium.Icon(color='blue', icon='plus')
-        ).add_to(m)
-        
-        folium.Marker(
-            [-29.9545, -71.3440], 
-            popup='Plaza de Armas de Coquimbo',
-            icon=folium.Icon(color='green', icon='info-sign')
-        ).add_to(m)
-
-        folium.Marker(
-            [-29.9366, -71.3364], 
-            popup='Fuerte Lambert',
-            icon=folium.Icon(color='red', icon='shield')
-        ).add_to(m)
-        # --- FIN DE LOS CAMBIOS ---
+    def _esperar_mapa(self, futuro):
+        # Un pedido más reciente reemplaza a este
+        if futuro is not self._futuro or not self.winfo_exists():
+            return
+        if futuro.done():
+            self._mapa_listo(futuro)
+        else:
+            self.after(100, self._esperar_mapa, futuro)
 
-        # Guardar el archivo
-        self.temp_file = os.path.join(tempfile.gettempdir(), "buscango_map.html")
-        m.save(self.temp_file)
+    def _mapa_listo(self, futuro):
+        try:
+            self.temp_file = str(futuro.result())
+        except Exception as e:
+            self._display_error_message(f"Error fatal al crear el archivo del mapa: {e}")
+            return
+        self.launch_button.config(state=tk.NORMAL, text="🗺️ Abrir Mapa de Coquimbo")
 
     def _open_map_in_browser(self):
         """Abre el archivo del mapa en el navegador web predeterminado."""
@@ -73,18 +329,10 @@ class MapView(tk.Frame):
             webbrowser.open(f'file:///{self.temp_file}')
         else:
             self._display_error_message("Error: No se pudo encontrar el archivo del mapa para abrir.")
-    
+
     def _display_error_message(self, message):
         """Muestra un mensaje de error si algo sale mal."""
         for widget in self.winfo_children():
             widget.destroy()
         error_label = tk.Label(self, text=message, fg="red", font=("Arial", 12))
         error_label.pack(expand=True)
-
-    def __del__(self):
-        """Limpia el archivo temporal al cerrar la aplicación."""
-        try:
-            if hasattr(self, 'temp_file') and self.temp_file and os.path.exists(self.temp_file):
-                os.remove(self.temp_file)
-        except Exception:
-            pass
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""Tareas en segundo plano para la interfaz.
+
+Las lecturas y escrituras de datos corren en un grupo de hilos y el hilo de
+Tk revisa con ``after()`` cuáles terminaron, para aplicar sus resultados
+sin tocar los widgets desde otro hilo. Mientras una ventana tiene tareas
+pendientes muestra el cursor de espera.
+"""
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+from config import TASK_WORKERS, TASK_POLL_INTERVAL
+
+class Tareas:
+    """Grupo de hilos cuyos resultados se entregan en el hilo de Tk"""
+
+    def __init__(self, raiz, hilos=TASK_WORKERS, intervalo=TASK_POLL_INTERVAL):
+        self.raiz = raiz
+        self.intervalo = intervalo
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="tarea")
+        # (futuro, widget, ventana, al_terminar, al_fallar) en orden de envío
+        self._pendientes = []
+        # ventana -> (tareas pendientes, cursor anterior)
+        self._ocupadas = {}
+        self._revision_id = None
+
+    def ejecutar(self, widget, funcion, *args, al_terminar=None, al_fallar=None):
+        """Ejecuta funcion(*args) en segundo plano.
+
+        Al terminar se llama al_terminar(resultado) o al_fallar(error) en el
+        hilo de Tk, salvo que ``widget`` ya se haya cerrado. Sin al_fallar el
+        error se muestra en un mensaje.
+        """
+        futuro = self._ejecutor.submit(funcion, *args)
+        ventana = widget.winfo_toplevel()
+        self._pendientes.append((futuro, widget, ventana, al_terminar, al_fallar))
+        self._ocupar(ventana)
+        if self._revision_id is None:
+            self._revision_id = self.raiz.after(self.intervalo, self._revisar)
+        return futuro
+
+    def detener(self):
+        """Espera a que terminen las tareas enviadas (p. ej. guardados) y deja de revisar"""
+        if self._revision_id is not None:
+            try:
+                self.raiz.after_cancel(self._revision_id)
+            except tk.TclError:
+                # La ventana raíz ya se destruyó
+                pass
+            self._revision_id = None
+        self._ejecutor.shutdown(wait=True)
+        self._pendientes.clear()
+
+    def _revisar(self):
+        self._revision_id = None
+        terminadas = [tarea for tarea in self._pendientes if tarea[0].done()]
+        if terminadas:
+            self._pendientes = [tarea for tarea in self._pendientes if not tarea[0].done()]
+        for futuro, widget, ventana, al_terminar, al_fallar in terminadas:
+            self._liberar(ventana)
+            self._entregar(futuro, widget, al_terminar, al_fallar)
+        if self._pendientes:
+            self._revision_id = self.raiz.after(self.intervalo, self._revisar)
+
+    def _entregar(self, futuro, widget, al_terminar, al_fallar):
+        # Si la ventana se cerró antes de que terminara la tarea, el resultado se descarta
+        try:
+            if not widget.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        error = futuro.exception()
+        if error is None:
+            if al_terminar:
+                al_terminar(futuro.result())
+        elif al_fallar:
+            al_fallar(error)
+        else:
+            print(f"Error en tarea en segundo plano: {error}")
+            messagebox.showerror("Error", f"Error al procesar los datos: {str(error)}", parent=widget)
+
+    def _ocupar(self, ventana):
+        clave = str(ventana)
+        pendientes, cursor = self._ocupadas.get(clave, (0, None))
+        if not pendientes:
+            cursor = ventana.cget("cursor")
+            ventana.config(cursor="watch")
+        self._ocupadas[clave] = (pendientes + 1, cursor)
+
+    def _liberar(self, ventana):
+        clave = str(ventana)
+        pendientes, cursor = self._ocupadas.get(clave, (1, ""))
+        if pendientes > 1:
+            self._ocupadas[clave] = (pendientes - 1, cursor)
+            return
+        self._ocupadas.pop(clave, None)
+        try:
+            ventana.config(cursor=cursor)
+        except tk.TclError:
+            pass
+
+_tareas = None
+
+def tareas(widget):
+    """Grupo de tareas de la aplicación, creado al primer uso sobre la ventana raíz de ``widget``"""
+    global _tareas
+    if _tareas is None:
+        _tareas = Tareas(widget._root())
+    return _tareas
+
+def en_segundo_plano(widget, funcion, *args, al_terminar=None, al_fallar=None):
+    """Atajo para tareas(widget).ejecutar(...)"""
+    return tareas(widget).ejecutar(widget, funcion, *args, al_terminar=al_terminar, al_fallar=al_fallar)
+
+def detener_tareas():
+    """Espera las tareas pendientes de la aplicación; llamar antes de cerrar el DataManager"""
+    global _tareas
+    if _tareas is not None:
+        _tareas.detener()
+        _tareas = None
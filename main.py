@@ -5,6 +5,7 @@ import sys
 from tkinter import messagebox
 
 from gui import MainWindow
+from gui.tareas import detener_tareas
 from database import DatabaseManager
 from services import DataManager
 from utils import setup_logger
@@ -26,7 +27,7 @@ def main():
         
         # Inicializar servicios
         db = DatabaseManager()
-        data_manager = DataManager("data.json")
+        data_manager = DataManager.desde_config(db)
         
         # Crear ventana principal
         app = MainWindow(root, data_manager)
@@ -34,6 +35,12 @@ def main():
         
         root.mainloop()
         
+        # Terminar los guardados en curso y volcar el diario de cambios pendiente a data.json
+        detener_tareas()
+        app.servidor_mapa.detener()
+        data_manager.cerrar()
+        db.cerrar()
+        
     except Exception as e:
         logger.error(f"Error al iniciar la aplicación: {str(e)}")
         messagebox.showerror("Error", f"Error al iniciar la aplicación: {str(e)}")
@@ -1,4 +1,6 @@
 from .ruta import Ruta
 from .bus import Bus
+from .parada import Parada, RegistroParadas
+from .flota import FleetArray, BusVista
 
-__all__ = ['Ruta', 'Bus']
\ No newline at end of file
+__all__ = ['Ruta', 'Bus', 'Parada', 'RegistroParadas', 'FleetArray', 'BusVista']
\ No newline at end of file
@@ -1,6 +1,10 @@
-from utils.constants import BUS_STATES
+from utils.constants import BUS_STATES, VELOCIDAD_PROMEDIO, RADIO_PARADA, MAX_DESVIO_RUTA
+from utils.geo import distancia
 
 class Bus:
+    __slots__ = ('numero', 'capacidad', 'estado', 'posicion', 'pasajeros',
+                 'ruta_actual', 'posicion_ruta')
+
     def __init__(self, numero, capacidad=40):
         if not isinstance(numero, str):
             raise ValueError("El número de bus debe ser una cadena de texto")
@@ -18,10 +22,34 @@ class Bus:
     def asignar_ruta(self, ruta):
         self.ruta_actual = ruta
         self.estado = BUS_STATES["IN_ROUTE"]
-        self.posicion = 0 if ruta else None
+        self.posicion_ruta = 0
 
-    def actualizar_posicion(self, lat, lon):
+    def actualizar_posicion(self, lat, lon, indice_paradas=None, radio_km=RADIO_PARADA):
+        """Actualiza la posición; con un índice de paradas la ajusta a la ruta.
+
+        Si la posición está a menos de radio_km de una parada de la ruta, el
+        bus queda en ella; si no, se ubica en el tramo más cercano entre el
+        actual y los dos siguientes. Devuelve el ID de la parada más cercana
+        dentro de radio_km, o None.
+        """
         self.posicion = (lat, lon)
+        if indice_paradas is None:
+            return None
+        cercana = indice_paradas.mas_cercano(lat, lon, radio_km)
+        parada_id = cercana[1] if cercana else None
+
+        ruta = self.ruta_actual
+        if ruta and ruta.paradas:
+            indice = ruta.indice_parada(parada_id) if parada_id is not None else None
+            if indice is not None:
+                self.posicion_ruta = indice
+                self.posicion = tuple(ruta.paradas[indice].posicion)
+            else:
+                tramo = ruta.proyectar(lat, lon, self.posicion_ruta, alcance=3)
+                if tramo is not None and tramo[2] <= MAX_DESVIO_RUTA:
+                    self.posicion_ruta = tramo[0]
+                    self.posicion = tramo[3]
+        return parada_id
         
     def subir_pasajeros(self, cantidad):
         if not isinstance(cantidad, int) or cantidad < 0:
@@ -68,12 +96,32 @@ class Bus:
             return None
         return self.ruta_actual.paradas[self.posicion_ruta + 1]
 
-    def calcular_tiempo_estimado(self, parada_destino):
-        """Calcula el tiempo estimado hasta la parada destino"""
-        if not self.posicion or not parada_destino.posicion:
+    def calcular_tiempo_estimado(self, parada_destino, estimador=None):
+        """Calcula el tiempo estimado en minutos hasta la parada destino.
+
+        Con un ``services.eta.EstimadorETA`` usa los tiempos de viaje
+        observados; si no, la geometría de la ruta actual o, si la parada no
+        está en ella, la distancia en línea recta.
+        """
+        if estimador is not None:
+            tiempo = estimador.eta(self, parada_destino)
+            if tiempo is not None:
+                return tiempo
+
+        if self.ruta_actual and self.ruta_actual.paradas:
+            ruta = self.ruta_actual
+            destino = ruta.indice_parada(parada_destino)
+            if destino is not None:
+                origen = self.posicion_ruta % len(ruta.paradas)
+                tiempo = ruta.tiempo_hasta_parada(destino) - ruta.tiempo_hasta_parada(origen)
+                if tiempo < 0:
+                    # Ruta circular: se completa la vuelta pasando por la primera parada
+                    tiempo += ruta.tiempo_ciclo()
+                return tiempo
+
+        if not self.posicion or not getattr(parada_destino, 'posicion', None):
             return None
-        # TODO: Implementar cálculo real basado en distancia y tráfico
-        return 0  # Temporal
+        return distancia(self.posicion, parada_destino.posicion) / VELOCIDAD_PROMEDIO * 60
     
     def mover_siguiente_parada(self):
         """Mueve el bus a la siguiente parada en la ruta"""
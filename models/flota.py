@@ -0,0 +1,178 @@
+import math
+from array import array
+
+from .bus import Bus
+from .ruta import Ruta
+
+class FleetArray:
+    """Flota almacenada por columnas en arreglos tipados.
+
+    En lugar de un objeto (o diccionario) por bus, cada atributo se guarda en
+    un ``array`` y cada bus es una posición. Los estados y las rutas se
+    guardan como índices a listas compartidas. ``flota[numero]`` entrega una
+    vista liviana (``BusVista``) con la misma interfaz que ``Bus``.
+    """
+
+    def __init__(self):
+        self.numeros = []
+        self._indices = {}
+        self.capacidad = array('i')
+        self.pasajeros = array('i')
+        self.posicion_ruta = array('i')
+        self.estado = array('H')
+        self.ruta = array('i')  # -1: sin ruta
+        self.lat = array('d')   # NaN: sin posición
+        self.lon = array('d')
+        self.estados = []
+        self._indice_estados = {}
+        self.rutas = []
+        self._indice_rutas = {}
+
+    def __len__(self):
+        return len(self.numeros)
+
+    def __contains__(self, numero):
+        return numero in self._indices
+
+    def __iter__(self):
+        return (BusVista(self, i) for i in range(len(self.numeros)))
+
+    def __getitem__(self, numero):
+        return BusVista(self, self._indices[numero])
+
+    def indice(self, numero):
+        return self._indices[numero]
+
+    def codigo_estado(self, estado):
+        """Índice del estado en ``estados``, agregándolo si es nuevo"""
+        codigo = self._indice_estados.get(estado)
+        if codigo is None:
+            codigo = self._indice_estados[estado] = len(self.estados)
+            self.estados.append(estado)
+        return codigo
+
+    def codigo_ruta(self, ruta):
+        """Índice de la ruta en ``rutas`` (-1 si es None), agregándola si es nueva"""
+        if ruta is None:
+            return -1
+        codigo = self._indice_rutas.get(ruta.nombre)
+        if codigo is None or self.rutas[codigo] is not ruta:
+            codigo = self._indice_rutas[ruta.nombre] = len(self.rutas)
+            self.rutas.append(ruta)
+        return codigo
+
+    def agregar(self, numero, capacidad=40, estado="AVAILABLE", ruta=None,
+                posicion=None, pasajeros=0, posicion_ruta=0):
+        """Agrega un bus y devuelve su vista"""
+        if not isinstance(numero, str):
+            raise ValueError("El número de bus debe ser una cadena de texto")
+        if numero in self._indices:
+            raise ValueError(f"El bus {numero} ya existe en la flota")
+        if not isinstance(capacidad, int) or capacidad <= 0:
+            raise ValueError("La capacidad debe ser un número entero positivo")
+        self._indices[numero] = len(self.numeros)
+        self.numeros.append(numero)
+        self.capacidad.append(capacidad)
+        self.pasajeros.append(pasajeros)
+        self.posicion_ruta.append(posicion_ruta)
+        self.estado.append(self.codigo_estado(estado))
+        self.ruta.append(self.codigo_ruta(ruta))
+        lat, lon = posicion if posicion is not None else (math.nan, math.nan)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        return BusVista(self, len(self.numeros) - 1)
+
+    @classmethod
+    def from_dicts(cls, buses, rutas=None):
+        """Crea la flota desde ``{numero: bus.to_dict()}`` (el formato de data.json).
+
+        ``rutas`` asocia nombres de ruta con objetos ``Ruta``; las rutas que no
+        estén ahí se crean sin paradas para conservar el nombre.
+        """
+        rutas = dict(rutas or {})
+        flota = cls()
+        for numero, data in buses.items():
+            nombre_ruta = data.get('ruta')
+            ruta = None
+            if nombre_ruta:
+                ruta = rutas.get(nombre_ruta)
+                if ruta is None:
+                    ruta = rutas[nombre_ruta] = Ruta(nombre_ruta)
+            flota.agregar(
+                data.get('numero', numero),
+                data.get('capacidad', 40),
+                data.get('estado', "AVAILABLE"),
+                ruta,
+                data.get('posicion'),
+                data.get('pasajeros', 0)
+            )
+        return flota
+
+    def to_dicts(self):
+        return {bus.numero: bus.to_dict() for bus in self}
+
+class BusVista(Bus):
+    """Vista de un bus dentro de un ``FleetArray``; lee y escribe sus arreglos"""
+    __slots__ = ('_flota', '_i')
+
+    def __init__(self, flota, indice):
+        self._flota = flota
+        self._i = indice
+
+    @property
+    def numero(self):
+        return self._flota.numeros[self._i]
+
+    @property
+    def capacidad(self):
+        return self._flota.capacidad[self._i]
+
+    @capacidad.setter
+    def capacidad(self, valor):
+        self._flota.capacidad[self._i] = valor
+
+    @property
+    def pasajeros(self):
+        return self._flota.pasajeros[self._i]
+
+    @pasajeros.setter
+    def pasajeros(self, valor):
+        self._flota.pasajeros[self._i] = valor
+
+    @property
+    def posicion_ruta(self):
+        return self._flota.posicion_ruta[self._i]
+
+    @posicion_ruta.setter
+    def posicion_ruta(self, valor):
+        self._flota.posicion_ruta[self._i] = valor
+
+    @property
+    def estado(self):
+        return self._flota.estados[self._flota.estado[self._i]]
+
+    @estado.setter
+    def estado(self, valor):
+        self._flota.estado[self._i] = self._flota.codigo_estado(valor)
+
+    @property
+    def ruta_actual(self):
+        codigo = self._flota.ruta[self._i]
+        return self._flota.rutas[codigo] if codigo >= 0 else None
+
+    @ruta_actual.setter
+    def ruta_actual(self, ruta):
+        self._flota.ruta[self._i] = self._flota.codigo_ruta(ruta)
+
+    @property
+    def posicion(self):
+        lat = self._flota.lat[self._i]
+        if math.isnan(lat):
+            return None
+        return (lat, self._flota.lon[self._i])
+
+    @posicion.setter
+    def posicion(self, valor):
+        lat, lon = valor if valor is not None else (math.nan, math.nan)
+        self._flota.lat[self._i] = lat
+        self._flota.lon[self._i] = lon
@@ -0,0 +1,123 @@
+class Parada:
+    __slots__ = ('id', 'nombre', 'posicion')
+
+    def __init__(self, id, nombre, posicion=None):
+        self.id = id
+        self.nombre = nombre
+        self.posicion = tuple(posicion) if posicion else None
+
+    def __str__(self):
+        return self.nombre
+
+    def __repr__(self):
+        return f"Parada({self.id}, {self.nombre!r})"
+
+    def to_dict(self):
+        return {
+            'nombre': self.nombre,
+            'posicion': list(self.posicion) if self.posicion else None
+        }
+
+    @classmethod
+    def from_dict(cls, id, data):
+        return cls(id, data['nombre'], data.get('posicion'))
+
+class RegistroParadas:
+    """Tabla global de paradas: cada parada se guarda una sola vez con un ID entero.
+
+    Las rutas referencian paradas por ID, así renombrar o ubicar una parada
+    no obliga a modificar las rutas que pasan por ella. Los nombres se
+    comparan en forma canónica (sin distinguir mayúsculas ni espacios extra).
+    """
+
+    def __init__(self, paradas=None):
+        self._paradas = {}
+        self._por_nombre = {}
+        self._siguiente_id = 1
+        for parada in paradas or []:
+            self._agregar(parada)
+
+    @staticmethod
+    def canonico(nombre):
+        return " ".join(str(nombre).split()).casefold()
+
+    def __len__(self):
+        return len(self._paradas)
+
+    def __iter__(self):
+        return iter(self._paradas.values())
+
+    def __contains__(self, parada_id):
+        return parada_id in self._paradas
+
+    def _agregar(self, parada):
+        self._paradas[parada.id] = parada
+        self._por_nombre[self.canonico(parada.nombre)] = parada.id
+        self._siguiente_id = max(self._siguiente_id, parada.id + 1)
+
+    def obtener(self, parada_id):
+        return self._paradas[parada_id]
+
+    def buscar(self, nombre):
+        """Devuelve el ID de la parada con ese nombre, o None"""
+        return self._por_nombre.get(self.canonico(nombre))
+
+    def internar(self, nombre, posicion=None):
+        """Devuelve la parada con ese nombre, creándola si no existe, y si fue creada"""
+        nombre = " ".join(str(nombre).split())
+        if not nombre:
+            raise ValueError("El nombre de la parada no puede estar vacío")
+        parada_id = self.buscar(nombre)
+        if parada_id is not None:
+            return self._paradas[parada_id], False
+        parada = Parada(self._siguiente_id, nombre, posicion)
+        self._agregar(parada)
+        return parada, True
+
+    def renombrar(self, parada_id, nuevo_nombre):
+        parada = self._paradas[parada_id]
+        nuevo_nombre = " ".join(str(nuevo_nombre).split())
+        existente = self.buscar(nuevo_nombre)
+        if existente is not None and existente != parada_id:
+            raise ValueError(f"Ya existe una parada llamada '{nuevo_nombre}'")
+        del self._por_nombre[self.canonico(parada.nombre)]
+        parada.nombre = nuevo_nombre
+        self._por_nombre[self.canonico(nuevo_nombre)] = parada_id
+        return parada
+
+    def eliminar(self, parada_id):
+        parada = self._paradas.pop(parada_id)
+        del self._por_nombre[self.canonico(parada.nombre)]
+
+    def nombres(self, ids):
+        """Nombres de una lista de IDs de parada (los textos se devuelven tal cual)"""
+        return [self._paradas[p].nombre if p in self._paradas else str(p) for p in ids]
+
+    def to_dict(self):
+        # Las claves de un objeto JSON son texto
+        return {str(parada.id): parada.to_dict() for parada in self._paradas.values()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(Parada.from_dict(int(parada_id), info) for parada_id, info in data.items())
+
+def migrar_rutas(datos, registro):
+    """Reemplaza los nombres de parada de las rutas por IDs del registro.
+
+    Devuelve las paradas creadas durante la migración.
+    """
+    creadas = []
+    for ruta in datos.get('rutas', {}).values():
+        paradas = ruta.get('paradas', [])
+        if not any(isinstance(p, str) for p in paradas):
+            continue
+        ids = []
+        for p in paradas:
+            if isinstance(p, str):
+                parada, nueva = registro.internar(p)
+                if nueva:
+                    creadas.append(parada)
+                p = parada.id
+            ids.append(p)
+        ruta['paradas'] = ids
+    return creadas
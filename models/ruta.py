@@ -1,22 +1,52 @@
+import math
+from bisect import bisect_right
+
+from utils.constants import MIN_DISTANCIA_PARADAS, VELOCIDAD_PROMEDIO, TIEMPO_TRAMO_DEFECTO
+from utils.geo import distancia, interpolar
+
 class Ruta:
+    # _tramos, _acumulada, _regreso e _indices: calculados al primer uso (None = sin calcular)
+    __slots__ = ('nombre', '_paradas', '_tramos', '_acumulada', '_regreso', '_indices')
+
     def __init__(self, nombre, paradas=None):
         self.nombre = nombre
         self.paradas = paradas or []
+
+    @property
+    def paradas(self):
+        return self._paradas
+
+    @paradas.setter
+    def paradas(self, paradas):
+        self._paradas = paradas
+        self.invalidar_geometria()
+
+    def invalidar_geometria(self):
+        """Descarta las distancias calculadas (p. ej. si cambió la ubicación de una parada)"""
+        self._tramos = None
+        self._acumulada = None
+        self._regreso = None
+        self._indices = None
     
     def agregar_parada(self, parada):
         self.paradas.append(parada)
+        self.invalidar_geometria()
     
     def eliminar_parada(self, indice):
-        return self.paradas.pop(indice)
+        parada = self.paradas.pop(indice)
+        self.invalidar_geometria()
+        return parada
     
     def mover_parada(self, indice_origen, indice_destino):
         parada = self.paradas.pop(indice_origen)
         self.paradas.insert(indice_destino, parada)
+        self.invalidar_geometria()
     
     def to_dict(self):
         return {
             'nombre': self.nombre,
-            'paradas': self.paradas
+            # Las paradas del registro se guardan por ID
+            'paradas': [getattr(parada, 'id', parada) for parada in self.paradas]
         }
     
     @classmethod
@@ -29,23 +59,130 @@ class Ruta:
             raise ValueError("La ruta debe tener al menos una parada")
         
         # Validar que no haya paradas duplicadas
-        paradas_unicas = set(parada.id for parada in self.paradas)
+        # Las paradas pueden ser objetos Parada o directamente sus IDs
+        paradas_unicas = set(getattr(parada, 'id', parada) for parada in self.paradas)
         if len(paradas_unicas) != len(self.paradas):
             raise ValueError("La ruta tiene paradas duplicadas")
 
+        # Validar la distancia mínima entre paradas consecutivas ubicadas
+        for origen, destino in zip(self.paradas, self.paradas[1:]):
+            pos_origen = getattr(origen, 'posicion', None)
+            pos_destino = getattr(destino, 'posicion', None)
+            if pos_origen and pos_destino and distancia(pos_origen, pos_destino) < MIN_DISTANCIA_PARADAS:
+                raise ValueError(f"Las paradas '{origen}' y '{destino}' están a menos de "
+                                 f"{MIN_DISTANCIA_PARADAS} km")
+
+    def _geometria(self):
+        """Longitud de cada tramo y distancia acumulada hasta cada parada, en km.
+
+        También deja en ``_regreso`` el largo del tramo de la última parada a la primera.
+        """
+        if self._acumulada is None:
+            tramos = [self._distancia_tramo(self.paradas[i], self.paradas[i + 1])
+                      for i in range(len(self.paradas) - 1)]
+            acumulada = [0.0] if self.paradas else []
+            for tramo in tramos:
+                acumulada.append(acumulada[-1] + tramo)
+            self._regreso = (self._distancia_tramo(self.paradas[-1], self.paradas[0])
+                             if len(self.paradas) > 1 else 0.0)
+            self._tramos = tramos
+            self._acumulada = acumulada
+        return self._tramos, self._acumulada
+
+    def indice_parada(self, parada_id):
+        """Posición de una parada (ID u objeto) dentro de la ruta, o None"""
+        if self._indices is None:
+            self._indices = {}
+            for indice, parada in enumerate(self.paradas):
+                self._indices.setdefault(getattr(parada, 'id', parada), indice)
+        return self._indices.get(getattr(parada_id, 'id', parada_id))
+
+    def proyectar(self, lat, lon, desde=0, alcance=None):
+        """Tramo más cercano a (lat, lon) como (indice, fraccion, distancia_km, punto), o None.
+
+        Revisa ``alcance`` tramos a partir de ``desde`` (todos si es None),
+        incluido el de regreso de la última a la primera parada.
+        """
+        n = len(self.paradas)
+        if n < 2:
+            return None
+        escala = math.cos(math.radians(lat))
+        mejor = None
+        for paso in range(n if alcance is None else min(alcance, n)):
+            k = (desde + paso) % n
+            origen = getattr(self.paradas[k], 'posicion', None)
+            destino = getattr(self.paradas[(k + 1) % n], 'posicion', None)
+            if not origen or not destino:
+                continue
+            # Proyección en un plano local centrado en el punto consultado
+            ox, oy = (origen[1] - lon) * escala, origen[0] - lat
+            dx, dy = (destino[1] - origen[1]) * escala, destino[0] - origen[0]
+            largo = dx * dx + dy * dy
+            fraccion = min(max(-(ox * dx + oy * dy) / largo, 0.0), 1.0) if largo else 0.0
+            punto = interpolar(origen, destino, fraccion)
+            d = distancia((lat, lon), punto)
+            if mejor is None or d < mejor[2]:
+                mejor = (k, fraccion, d, punto)
+        return mejor
+
+    def _distancia_tramo(self, parada_origen, parada_destino):
+        """Distancia en km entre dos paradas; estimada si alguna no tiene coordenadas"""
+        origen = getattr(parada_origen, 'posicion', None)
+        destino = getattr(parada_destino, 'posicion', None)
+        if origen and destino:
+            return distancia(origen, destino)
+        return TIEMPO_TRAMO_DEFECTO / 60 * VELOCIDAD_PROMEDIO
+
+    def longitud_total(self):
+        """Longitud de la ruta en km, de la primera a la última parada"""
+        _, acumulada = self._geometria()
+        return acumulada[-1] if acumulada else 0.0
+
+    def distancia_hasta_parada(self, indice):
+        """Distancia en km desde la primera parada hasta la parada indicada"""
+        return self._geometria()[1][indice]
+
+    def tiempo_hasta_parada(self, indice):
+        """Tiempo estimado en minutos desde la primera parada hasta la parada indicada"""
+        return self.distancia_hasta_parada(indice) / VELOCIDAD_PROMEDIO * 60
+
+    def parada_en(self, distancia_km):
+        """Índice de la última parada alcanzada tras recorrer distancia_km"""
+        _, acumulada = self._geometria()
+        if not acumulada:
+            return None
+        return min(max(bisect_right(acumulada, distancia_km) - 1, 0), len(acumulada) - 1)
+
+    def posicion_en(self, distancia_km):
+        """Posición (lat, lon) tras recorrer distancia_km, o None si faltan coordenadas"""
+        indice = self.parada_en(distancia_km)
+        if indice is None:
+            return None
+        tramos, acumulada = self._geometria()
+        origen = getattr(self.paradas[indice], 'posicion', None)
+        if indice == len(tramos) or distancia_km <= acumulada[indice]:
+            return origen
+        destino = getattr(self.paradas[indice + 1], 'posicion', None)
+        if not origen or not destino:
+            return None
+        return interpolar(origen, destino, (distancia_km - acumulada[indice]) / tramos[indice])
+
     def calcular_tiempo_total(self):
-        """Calcula el tiempo total estimado de la ruta"""
-        tiempo_total = 0
-        for i in range(len(self.paradas) - 1):
-            tiempo_tramo = self._calcular_tiempo_entre_paradas(
-                self.paradas[i], 
-                self.paradas[i + 1]
-            )
-            tiempo_total += tiempo_tramo
-        return tiempo_total
+        """Calcula el tiempo total estimado de la ruta en minutos"""
+        return self.longitud_total() / VELOCIDAD_PROMEDIO * 60
+
+    def tiempos_circuito(self):
+        """Minutos de cada tramo del circuito: el i va de la parada i a la i + 1 y el último regresa a la primera"""
+        if not self.paradas:
+            return []
+        tramos, _ = self._geometria()
+        return [d / VELOCIDAD_PROMEDIO * 60 for d in tramos + [self._regreso]]
+
+    def tiempo_ciclo(self):
+        """Minutos de una vuelta completa, incluido el regreso a la primera parada"""
+        longitud = self.longitud_total()
+        return (longitud + (self._regreso or 0.0)) / VELOCIDAD_PROMEDIO * 60
     
     def _calcular_tiempo_entre_paradas(self, parada_origen, parada_destino):
-        """Calcula el tiempo estimado entre dos paradas"""
-        # TODO: Implementar cálculo real basado en distancia y velocidad promedio
-        # Por ahora retorna un tiempo fijo de 5 minutos entre paradas
-        return 5  # minutos
\ No newline at end of file
+        """Calcula el tiempo estimado entre dos paradas en minutos"""
+        return self._distancia_tramo(parada_origen, parada_destino) / VELOCIDAD_PROMEDIO * 60
@@ -1,5 +1,5 @@
 from .data_manager import DataManager
-from .simulador import Simulador
+from .simulador import Simulador, ColaActualizaciones
 from .notifier import Notificador
 
-__all__ = ['DataManager', 'Simulador', 'Notificador']
\ No newline at end of file
+__all__ = ['DataManager', 'Simulador', 'ColaActualizaciones', 'Notificador']
\ No newline at end of file
@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from config import DATA_CONFIG
+
+def escribir_atomico(ruta, contenido):
+    """Escribe un archivo completo vía archivo temporal + fsync + rename.
+
+    Un corte a mitad de la escritura deja intacta la versión anterior.
+    """
+    ruta = Path(ruta)
+    fd, temporal = tempfile.mkstemp(prefix=f".{ruta.name}.", suffix=".tmp", dir=ruta.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except Exception:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    # Persistir también la entrada del directorio (no disponible en Windows)
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(ruta.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def aplicar_entrada(datos, entrada):
+    """Aplica una entrada del diario ('set', 'del' o 'campo') sobre el modelo"""
+    coleccion = datos.setdefault(entrada['col'], {})
+    clave = entrada['clave']
+    if entrada['op'] == 'set':
+        coleccion[clave] = entrada['valor']
+    elif entrada['op'] == 'del':
+        coleccion.pop(clave, None)
+    elif entrada['op'] == 'campo' and clave in coleccion:
+        coleccion[clave][entrada['campo']] = entrada['valor']
+
+class AlmacenJSON:
+    """Almacenamiento en data.json con diario de cambios (write-ahead log).
+
+    Cada mutación se agrega como una línea al diario (``data.json.wal``). Cada
+    ``compactar_cada`` entradas el modelo se vuelca completo a ``data.json`` de
+    forma atómica y el diario se vacía.
+    """
+
+    def __init__(self, archivo, compactar_cada=None, fsync_diario=None):
+        # Usar ruta absoluta para evitar problemas de directorio
+        if not os.path.isabs(archivo):
+            self.archivo = Path(__file__).parent.parent / archivo
+        else:
+            self.archivo = Path(archivo)
+        self.data_dir = self.archivo.parent
+        self.diario = self.archivo.with_name(self.archivo.name + '.wal')
+
+        # Crear directorio si no existe
+        if not self.data_dir.exists():
+            self.data_dir.mkdir(parents=True)
+
+        self.compactar_cada = compactar_cada or DATA_CONFIG['compactar_cada']
+        self.fsync_diario = DATA_CONFIG['fsync_diario'] if fsync_diario is None else fsync_diario
+        self._diario_f = None
+        self._entradas_diario = 0
+
+    def firma(self):
+        """(mtime, tamaño) de instantánea y diario; cambia si otro proceso escribe"""
+        firma = []
+        for ruta in (self.archivo, self.diario):
+            try:
+                stat = ruta.stat()
+                firma.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                firma.append(None)
+        return tuple(firma)
+
+    def cargar(self):
+        try:
+            if self.archivo.exists():
+                with open(self.archivo, 'r', encoding='utf-8') as f:
+                    datos = json.load(f)
+            else:
+                datos = {'rutas': {}, 'buses': {}}
+        except json.JSONDecodeError:
+            raise ValueError(f"El archivo {self.archivo} está corrupto")
+        except Exception as e:
+            raise IOError(f"Error al cargar datos: {str(e)}")
+
+        entradas = 0
+        if self.diario.exists():
+            # Bytes del diario hasta la última entrada completa
+            validos = 0
+            with open(self.diario, 'rb') as f:
+                for linea in f:
+                    try:
+                        if not linea.endswith(b'\n'):
+                            raise ValueError("línea sin terminar")
+                        entrada = json.loads(linea.decode('utf-8'))
+                    except ValueError:
+                        # Última línea incompleta por un corte: se descarta
+                        break
+                    aplicar_entrada(datos, entrada)
+                    entradas += 1
+                    validos += len(linea)
+                cortado = f.seek(0, os.SEEK_END) > validos
+            if cortado:
+                self._truncar_diario(validos)
+        self._entradas_diario = entradas
+        return datos
+
+    def _truncar_diario(self, validos):
+        """Quita del diario lo que sigue a la última entrada completa.
+
+        Si no se quitara, la próxima entrada se escribiría pegada a esos bytes
+        y quedaría ilegible junto con todas las siguientes.
+        """
+        print(f"Diario {self.diario} cortado: se descartan los bytes desde {validos}")
+        if self._diario_f is not None:
+            self._diario_f.close()
+            self._diario_f = None
+        try:
+            os.truncate(self.diario, validos)
+        except Exception as e:
+            raise IOError(f"Error al reparar el diario: {str(e)}")
+
+    def registrar(self, entradas, datos):
+        """Agrega las entradas al diario; compacta si el diario creció demasiado"""
+        lineas = ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in entradas)
+        try:
+            if self._diario_f is None:
+                self._diario_f = open(self.diario, 'a', encoding='utf-8')
+            self._diario_f.write(lineas)
+            self._diario_f.flush()
+            if self.fsync_diario:
+                os.fsync(self._diario_f.fileno())
+        except Exception as e:
+            raise IOError(f"Error al escribir el diario: {str(e)}")
+        self._entradas_diario += len(entradas)
+        if self._entradas_diario >= self.compactar_cada:
+            self.guardar(datos)
+
+    def guardar(self, datos):
+        """Reescribe el documento completo de forma atómica y vacía el diario"""
+        escribir_atomico(self.archivo, json.dumps(datos, indent=2, ensure_ascii=False))
+        # El diario ya está contenido en la instantánea
+        if self._diario_f is not None:
+            self._diario_f.close()
+            self._diario_f = None
+        if self.diario.exists():
+            os.remove(self.diario)
+        self._entradas_diario = 0
+
+    def compactar(self, datos):
+        if self._entradas_diario:
+            self.guardar(datos)
+
+    def cerrar(self, datos):
+        if datos is not None:
+            self.compactar(datos)
+        if self._diario_f is not None:
+            self._diario_f.close()
+            self._diario_f = None
@@ -1,45 +1,476 @@
-import json
-import os
-from pathlib import Path
+import threading
+from contextlib import contextmanager
+
+from config import DATA_CONFIG
+from utils.constants import BUS_STATES, RADIO_BUSQUEDA_PARADA
+from models.parada import RegistroParadas, migrar_rutas
+from models.ruta import Ruta
+from utils.indice_espacial import IndiceEspacial
+from utils.indice_secundario import IndiceSecundario
+from .almacenamiento import AlmacenJSON, aplicar_entrada
+from .busqueda import IndiceBusqueda
+from .nomenclator import Nomenclator
+
+# Índices secundarios: nombre -> (colección, valores por los que se indexa cada registro)
+INDICES = {
+    'buses_por_ruta': ('buses', lambda bus: [bus['ruta']] if bus.get('ruta') else []),
+    'buses_por_estado': ('buses', lambda bus: [bus['estado']] if bus.get('estado') else []),
+    'rutas_por_parada': ('rutas', lambda ruta: ruta.get('paradas', [])),
+}
 
 class DataManager:
-    def __init__(self, archivo):
-        # Usar ruta absoluta para evitar problemas de directorio
-        if not os.path.isabs(archivo):
-            self.archivo = Path(__file__).parent.parent / archivo
-        else:
-            self.archivo = Path(archivo)
-        self.data_dir = self.archivo.parent
-        
-        # Crear directorio si no existe
-        if not self.data_dir.exists():
-            self.data_dir.mkdir(parents=True)
-    
+    """Modelo de datos en memoria respaldado por un almacenamiento intercambiable.
+
+    Por defecto usa ``AlmacenJSON`` (data.json + diario de cambios); con
+    ``almacen`` se puede pasar cualquier objeto con la misma interfaz, por
+    ejemplo ``database.AlmacenSQLite``.
+    """
+
+    def __init__(self, archivo=None, compactar_cada=None, fsync_diario=None, almacen=None):
+        if almacen is None:
+            almacen = AlmacenJSON(archivo or DATA_CONFIG['archivo'], compactar_cada, fsync_diario)
+        self.almacen = almacen
+        self.archivo = almacen.archivo
+
+        # Modelo en memoria y firma del almacenamiento del que se leyó
+        self._lock = threading.RLock()
+        self._datos = None
+        self._firma = None
+        # Rutas migradas de nombres a IDs de parada solo en memoria: se guardan con el primer cambio
+        self._migracion_pendiente = False
+        # Tabla de paradas del modelo: las rutas guardan IDs de este registro
+        self.paradas = RegistroParadas()
+        # Índices espaciales de paradas y buses, construidos al primer uso
+        self._indice_paradas = None
+        self._indice_buses = None
+        # Índices secundarios (ver INDICES), construidos al primer uso
+        self._indices = {}
+        # Índices de búsqueda por colección (ver buscar) y contador de invalidaciones
+        self._busquedas = {}
+        self._generacion_busquedas = 0
+        # Nomenclátor (archivo + paradas registradas), construido al primer uso
+        self._nomenclator = None
+        # Claves de cada colección en orden, para leer por páginas (ver pagina)
+        self._claves = {}
+        # Funciones que se enteran de los cambios del modelo (ver suscribir)
+        self._suscriptores = []
+        # Cambios por avisar al soltar el lock y cuántas veces lo tiene tomado el hilo dueño
+        self._avisos = []
+        self._profundidad = 0
+
+    @classmethod
+    def desde_config(cls, db_manager=None):
+        """Crea el DataManager con el almacenamiento indicado en DATA_CONFIG['backend']"""
+        if DATA_CONFIG.get('backend', 'json') == 'sqlite':
+            from database import DatabaseManager, AlmacenSQLite
+            return cls(almacen=AlmacenSQLite(db_manager or DatabaseManager()))
+        return cls(DATA_CONFIG['archivo'])
+
     def cargar_datos(self):
+        """Devuelve el modelo en memoria, releyendo el disco solo si otro proceso lo cambió.
+
+        El diccionario devuelto es el modelo compartido: las modificaciones se
+        persisten llamando a guardar_datos con ese mismo diccionario.
+        """
+        with self._bloqueo():
+            firma = self.almacen.firma()
+            if self._datos is None or firma != self._firma:
+                datos = self.almacen.cargar()
+                # Una lectura no escribe: si las rutas aún usan nombres de parada, la
+                # migración se guarda junto con el primer cambio (ver _registrar)
+                self._migracion_pendiente = self._preparar_paradas(datos)
+                # Cargar puede haber reparado el diario
+                firma = self.almacen.firma()
+                self._datos = datos
+                self._firma = firma
+                self._indice_buses = None
+                self._indices.clear()
+                self._descartar_busquedas()
+                self._claves.clear()
+                self._notificar(None)
+            return self._datos
+
+    def _preparar_paradas(self, datos):
+        """Reconstruye el registro de paradas y migra las rutas que aún usan nombres"""
+        self.paradas = RegistroParadas.from_dict(datos.setdefault('paradas', {}))
+        self._indice_paradas = None
+        self._nomenclator = None
+        if not migrar_rutas(datos, self.paradas):
+            return False
+        datos['paradas'] = self.paradas.to_dict()
+        return True
+
+    def suscribir(self, funcion):
+        """Registra funcion(entrada), llamada tras cada cambio del modelo.
+
+        ``entrada`` es la entrada del diario aplicada ({'op', 'col', 'clave', ...})
+        o None si cambió el modelo completo (se releyó o se reescribió).
+        """
+        with self._bloqueo():
+            self._suscriptores.append(funcion)
+
+    @contextmanager
+    def _bloqueo(self):
+        """Toma el lock del modelo; los cambios se avisan a los suscriptores al soltarlo.
+
+        Así un suscriptor que toma sus propios locks (p. ej. el planificador)
+        nunca lo hace con el del modelo tomado.
+        """
+        avisos = []
         try:
-            if self.archivo.exists():
-                with open(self.archivo, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {'rutas': {}, 'buses': {}}
-        except json.JSONDecodeError:
-            raise ValueError(f"El archivo {self.archivo} está corrupto")
-        except Exception as e:
-            raise IOError(f"Error al cargar datos: {str(e)}")
-    
+            with self._lock:
+                self._profundidad += 1
+                try:
+                    yield
+                finally:
+                    self._profundidad -= 1
+                    if not self._profundidad:
+                        avisos, self._avisos = self._avisos, []
+        finally:
+            for entrada in avisos:
+                self._avisar(entrada)
+
+    def _notificar(self, entrada):
+        # Llamar con el lock tomado: se entrega al soltarlo (ver _bloqueo)
+        self._avisos.append(entrada)
+
+    def _avisar(self, entrada):
+        for funcion in list(self._suscriptores):
+            try:
+                funcion(entrada)
+            except Exception as e:
+                print(f"Error al notificar un cambio de datos: {e}")
+
+    def invalidar_cache(self):
+        """Fuerza a releer el almacenamiento en la próxima llamada a cargar_datos"""
+        with self._bloqueo():
+            self._datos = None
+            self._firma = None
+            self._indice_buses = None
+            self._indices.clear()
+            self._descartar_busquedas()
+            self._claves.clear()
+
+    def _registrar(self, *entradas):
+        """Aplica las entradas al modelo en memoria y las persiste"""
+        with self._bloqueo():
+            datos = self.cargar_datos()
+            for entrada in entradas:
+                # Las claves por página solo cambian si se agrega o se quita un registro
+                existia = entrada['clave'] in datos.get(entrada['col'], {})
+                aplicar_entrada(datos, entrada)
+                if (entrada['op'] == 'set' and not existia) or (entrada['op'] == 'del' and existia):
+                    self._claves.pop(entrada['col'], None)
+                self._reindexar(datos, entrada)
+            try:
+                if self._migracion_pendiente:
+                    # El diario usa IDs que solo existen en el modelo migrado: se guarda completo
+                    self.almacen.guardar(datos)
+                    self._migracion_pendiente = False
+                else:
+                    self.almacen.registrar(entradas, datos)
+            except Exception:
+                self.invalidar_cache()
+                raise
+            self._firma = self.almacen.firma()
+            for entrada in entradas:
+                self._notificar(entrada)
+
+    def _reindexar(self, datos, entrada):
+        """Actualiza los índices secundarios ya construidos con el registro modificado"""
+        if entrada['op'] != 'campo' or entrada['campo'] != 'posicion':
+            # Las rutas se buscan también por los nombres de sus paradas
+            self._descartar_busquedas('rutas' if entrada['col'] == 'paradas' else entrada['col'])
+        coleccion = datos.get(entrada['col'], {})
+        clave = entrada['clave']
+        for nombre, indice in self._indices.items():
+            if INDICES[nombre][0] != entrada['col']:
+                continue
+            if clave in coleccion:
+                indice.poner(clave, coleccion[clave])
+            else:
+                indice.quitar(clave)
+
+    def _indice(self, nombre):
+        """Índice secundario ``nombre`` de INDICES, construyéndolo si hace falta"""
+        with self._bloqueo():
+            datos = self.cargar_datos()
+            indice = self._indices.get(nombre)
+            if indice is None:
+                coleccion, valores = INDICES[nombre]
+                indice = IndiceSecundario.desde_coleccion(valores, datos.get(coleccion, {}))
+                self._indices[nombre] = indice
+            return indice
+
+    def buses_de_ruta(self, nombre_ruta):
+        """Números de los buses asignados a una ruta"""
+        with self._bloqueo():
+            return self._indice('buses_por_ruta').claves(nombre_ruta)
+
+    def buses_con_estado(self, estado):
+        """Números de los buses en un estado ('AVAILABLE', 'IN_ROUTE', ...)"""
+        with self._bloqueo():
+            return self._indice('buses_por_estado').claves(estado)
+
+    def buses_por_ruta(self):
+        """{nombre de ruta: cantidad de buses asignados}"""
+        with self._bloqueo():
+            return self._indice('buses_por_ruta').cantidades()
+
+    def rutas_de_parada(self, parada_id):
+        """Nombres de las rutas que pasan por una parada"""
+        with self._bloqueo():
+            return self._indice('rutas_por_parada').claves(parada_id)
+
+    def _descartar_busquedas(self, *colecciones):
+        """Descarta los índices de búsqueda de esas colecciones (de todas si no se indican)"""
+        self._generacion_busquedas += 1
+        if colecciones:
+            for coleccion in colecciones:
+                self._busquedas.pop(coleccion, None)
+        else:
+            self._busquedas.clear()
+
+    def _textos_busqueda(self, coleccion, clave, registro):
+        if coleccion == 'buses':
+            estado = registro.get('estado')
+            return (clave, registro.get('ruta'), estado, BUS_STATES.get(estado))
+        if coleccion == 'rutas':
+            return (clave, *self.paradas.nombres(registro.get('paradas', [])))
+        return (clave, registro.get('ruta'))
+
+    def buscar(self, coleccion, texto):
+        """Claves de 'buses', 'rutas' o 'flota' que tienen palabras que empiezan con las de ``texto``.
+
+        Los buses se buscan por número, ruta y estado; las rutas por nombre y
+        paradas; la flota por nombre y ruta. El índice se arma en la primera
+        búsqueda tras un cambio de la colección, fuera del lock salvo la
+        lectura de los textos, así conviene llamarlo desde un hilo aparte.
+        """
+        with self._bloqueo():
+            datos = self.cargar_datos()
+            indice = self._busquedas.get(coleccion)
+            if indice is None:
+                generacion = self._generacion_busquedas
+                registros = [(clave, self._textos_busqueda(coleccion, clave, registro))
+                             for clave, registro in datos.get(coleccion, {}).items()]
+        if indice is None:
+            indice = IndiceBusqueda(registros)
+            with self._bloqueo():
+                # Si los datos cambiaron mientras se armaba, se usa esta vez pero no se guarda
+                if generacion == self._generacion_busquedas:
+                    self._busquedas[coleccion] = indice
+        return indice.buscar(texto)
+
+    def compactar(self):
+        """Vuelca los cambios pendientes del diario al almacenamiento principal"""
+        with self._bloqueo():
+            if self._datos is not None:
+                self.almacen.compactar(self._datos)
+                self._firma = self.almacen.firma()
+
+    def cerrar(self):
+        """Compacta los cambios pendientes y libera el almacenamiento"""
+        with self._bloqueo():
+            self.almacen.cerrar(self._datos)
+
     def guardar_datos(self, datos):
-        try:
-            with open(self.archivo, 'w', encoding='utf-8') as f:
-                json.dump(datos, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"Error al guardar datos: {e}")
-            return False
-        
+        """Reescribe el documento completo"""
+        with self._bloqueo():
+            try:
+                self._preparar_paradas(datos)
+                self.almacen.guardar(datos)
+                self._migracion_pendiente = False
+                # El modelo guardado pasa a ser el autoritativo
+                self._datos = datos
+                self._firma = self.almacen.firma()
+                self._indice_buses = None
+                self._indices.clear()
+                self._descartar_busquedas()
+                self._claves.clear()
+                self._notificar(None)
+                return True
+            except Exception as e:
+                print(f"Error al guardar datos: {e}")
+                # El modelo en memoria pudo quedar modificado sin persistir
+                self.invalidar_cache()
+                return False
+
+    def guardar_bus(self, numero, bus_data):
+        """Crea o reemplaza un bus"""
+        with self._bloqueo():
+            self._registrar({'op': 'set', 'col': 'buses', 'clave': numero, 'valor': bus_data})
+            self._indexar_bus(numero, bus_data.get('posicion'))
+
+    def eliminar_bus(self, numero):
+        """Elimina un bus"""
+        with self._bloqueo():
+            self._registrar({'op': 'del', 'col': 'buses', 'clave': numero})
+            self._indexar_bus(numero, None)
+
+    def guardar_ruta(self, nombre, ruta_data, nombre_anterior=None):
+        """Crea o reemplaza una ruta; si se indica nombre_anterior, la renombra.
+
+        Las paradas pueden venir como IDs, objetos Parada o nombres. Un nombre
+        que solo difiere de una parada existente en tildes o puntuación se
+        toma como esa parada; los nombres nuevos se agregan al registro con
+        las coordenadas del nomenclátor, si las tiene.
+        """
+        with self._bloqueo():
+            self.cargar_datos()
+            nomenclator = self.nomenclator()
+            entradas = []
+            ids = []
+            for parada in ruta_data.get('paradas', []):
+                if isinstance(parada, str):
+                    nombre_parada = nomenclator.buscar(parada) or parada
+                    parada, nueva = self.paradas.internar(nombre_parada, nomenclator.posicion(nombre_parada))
+                    if nueva:
+                        nomenclator.agregar(parada.nombre, parada.posicion)
+                        entradas.append(self._entrada_parada(parada))
+                ids.append(getattr(parada, 'id', parada))
+            ruta_data = dict(ruta_data, paradas=ids)
+            if nombre_anterior and nombre_anterior != nombre:
+                entradas.append({'op': 'del', 'col': 'rutas', 'clave': nombre_anterior})
+            entradas.append({'op': 'set', 'col': 'rutas', 'clave': nombre, 'valor': ruta_data})
+            self._registrar(*entradas)
+
+    def eliminar_ruta(self, nombre):
+        """Elimina una ruta"""
+        self._registrar({'op': 'del', 'col': 'rutas', 'clave': nombre})
+
+    def obtener_ruta(self, nombre):
+        """Devuelve la ruta como objeto Ruta con sus objetos Parada, o None"""
+        with self._bloqueo():
+            ruta_data = self.cargar_datos().get('rutas', {}).get(nombre)
+            if ruta_data is None:
+                return None
+            return Ruta(nombre, [self.paradas.obtener(p) for p in ruta_data.get('paradas', [])
+                                 if p in self.paradas])
+
+    def nombres_paradas(self, ids):
+        """Nombres de las paradas indicadas por ID, para mostrarlas en la interfaz"""
+        with self._bloqueo():
+            self.cargar_datos()
+            return self.paradas.nombres(ids)
+
+    def posiciones_paradas(self, nombres):
+        """Coordenadas de las paradas con esos nombres, omitiendo las que no tienen"""
+        with self._bloqueo():
+            self.cargar_datos()
+            posiciones = []
+            for nombre in nombres:
+                parada_id = self.paradas.buscar(nombre)
+                if parada_id is not None and self.paradas.obtener(parada_id).posicion:
+                    posiciones.append(self.paradas.obtener(parada_id).posicion)
+            return posiciones
+
+    def _entrada_parada(self, parada):
+        return {'op': 'set', 'col': 'paradas', 'clave': str(parada.id), 'valor': parada.to_dict()}
+
+    def renombrar_parada(self, parada_id, nuevo_nombre):
+        """Cambia el nombre de una parada en todas las rutas que pasan por ella"""
+        with self._bloqueo():
+            self.cargar_datos()
+            parada = self.paradas.renombrar(parada_id, nuevo_nombre)
+            self._registrar(self._entrada_parada(parada))
+            self._nomenclator = None
+
+    def ubicar_parada(self, parada_id, lat, lon):
+        """Actualiza las coordenadas de una parada"""
+        with self._bloqueo():
+            self.cargar_datos()
+            parada = self.paradas.obtener(parada_id)
+            parada.posicion = (lat, lon)
+            self._registrar({'op': 'campo', 'col': 'paradas', 'clave': str(parada_id),
+                             'campo': 'posicion', 'valor': [lat, lon]})
+            if self._indice_paradas is not None:
+                self._indice_paradas.mover(parada_id, lat, lon)
+            if self._nomenclator is not None:
+                self._nomenclator.ubicar(parada.nombre, (lat, lon))
+
+    def eliminar_parada(self, parada_id):
+        """Elimina una parada del registro; falla si alguna ruta pasa por ella"""
+        with self._bloqueo():
+            rutas = self.rutas_de_parada(parada_id)
+            if rutas:
+                raise ValueError(f"La parada está en uso en las rutas: {', '.join(rutas)}")
+            if parada_id not in self.paradas:
+                return
+            self.paradas.eliminar(parada_id)
+            self._registrar({'op': 'del', 'col': 'paradas', 'clave': str(parada_id)})
+            if self._indice_paradas is not None:
+                self._indice_paradas.eliminar(parada_id)
+
+    def contar(self, coleccion):
+        """Cantidad de elementos de una colección ('buses', 'rutas', 'flota', ...)"""
+        with self._bloqueo():
+            return len(self.cargar_datos().get(coleccion, {}))
+
+    def claves(self, coleccion):
+        """Copia de las claves de una colección en orden de inserción"""
+        with self._bloqueo():
+            return list(self.cargar_datos().get(coleccion, {}))
+
+    def registros(self, coleccion, claves):
+        """(clave, datos) de las claves indicadas que existen en la colección"""
+        with self._bloqueo():
+            elementos = self.cargar_datos().get(coleccion, {})
+            return [(clave, elementos[clave]) for clave in claves if clave in elementos]
+
+    def pagina(self, coleccion, inicio, cantidad):
+        """Elementos inicio..inicio+cantidad de una colección como lista de (clave, datos).
+
+        Mantiene el orden de inserción. La lista de claves se arma una vez y
+        se descarta solo cuando la colección gana o pierde elementos.
+        """
+        with self._bloqueo():
+            elementos = self.cargar_datos().get(coleccion, {})
+            claves = self._claves.get(coleccion)
+            if claves is None:
+                claves = self._claves[coleccion] = list(elementos)
+            return [(clave, elementos[clave]) for clave in claves[inicio:inicio + cantidad]]
+
+    def nomenclator(self):
+        """Nomenclátor de GAZETTEER_FILE con las paradas registradas, construido al primer uso.
+
+        Las paradas registradas se agregan primero, así su forma de escribirse
+        es la que se sugiere y sus coordenadas tienen prioridad.
+        """
+        with self._bloqueo():
+            self.cargar_datos()
+            if self._nomenclator is None:
+                nomenclator = Nomenclator()
+                for parada in self.paradas:
+                    nomenclator.agregar(parada.nombre, parada.posicion)
+                nomenclator.cargar_archivo()
+                self._nomenclator = nomenclator
+            return self._nomenclator
+
+    def guardar_flota_item(self, nombre, info, nombre_anterior=None):
+        """Crea o reemplaza un elemento de flota; si se indica nombre_anterior, lo renombra"""
+        entradas = []
+        if nombre_anterior and nombre_anterior != nombre:
+            entradas.append({'op': 'del', 'col': 'flota', 'clave': nombre_anterior})
+        entradas.append({'op': 'set', 'col': 'flota', 'clave': nombre, 'valor': info})
+        self._registrar(*entradas)
+
+    def eliminar_flota_item(self, nombre):
+        """Elimina un elemento de flota"""
+        self._registrar({'op': 'del', 'col': 'flota', 'clave': nombre})
+
     def buscar_bus(self, numero):
         """Busca un bus por su número"""
         try:
-            datos = self.cargar_datos()
-            return next((bus for bus in datos['buses'].values() 
+            buses = self.cargar_datos().get('buses', {})
+            bus = buses.get(numero)
+            if bus is not None and bus.get('numero') == numero:
+                return bus
+            # Registros cuya clave no coincide con el número
+            buscar = getattr(self.almacen, 'buscar_bus', None)
+            if buscar is not None:
+                return buscar(numero)
+            return next((bus for bus in buses.values()
                         if bus['numero'] == numero), None)
         except Exception as e:
             raise ValueError(f"Error al buscar bus: {str(e)}")
@@ -47,11 +478,61 @@ class DataManager:
     def actualizar_posicion_bus(self, numero_bus, lat, lon):
         """Actualiza la posición de un bus"""
         try:
-            datos = self.cargar_datos()
-            if numero_bus in datos['buses']:
-                datos['buses'][numero_bus]['posicion'] = (lat, lon)
-                self.guardar_datos(datos)
+            with self._bloqueo():
+                if numero_bus not in self.cargar_datos()['buses']:
+                    return False
+                self._registrar({'op': 'campo', 'col': 'buses', 'clave': numero_bus,
+                                 'campo': 'posicion', 'valor': [lat, lon]})
+                self._indexar_bus(numero_bus, (lat, lon))
                 return True
-            return False
         except Exception as e:
-            raise ValueError(f"Error al actualizar posición: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error al actualizar posición: {str(e)}")
+
+    def indice_paradas(self):
+        """Índice espacial de las paradas con coordenadas (claves: ID de parada)"""
+        with self._bloqueo():
+            self.cargar_datos()
+            if self._indice_paradas is None:
+                indice = IndiceEspacial()
+                for parada in self.paradas:
+                    if parada.posicion:
+                        indice.mover(parada.id, *parada.posicion)
+                self._indice_paradas = indice
+            return self._indice_paradas
+
+    def indice_buses(self):
+        """Índice espacial de los buses con posición conocida (claves: número de bus)"""
+        with self._bloqueo():
+            datos = self.cargar_datos()
+            if self._indice_buses is None:
+                indice = IndiceEspacial()
+                for numero, bus in datos.get('buses', {}).items():
+                    if bus.get('posicion'):
+                        indice.mover(numero, *bus['posicion'])
+                self._indice_buses = indice
+            return self._indice_buses
+
+    def _indexar_bus(self, numero, posicion):
+        if self._indice_buses is None:
+            return
+        if posicion:
+            self._indice_buses.mover(numero, *posicion)
+        else:
+            self._indice_buses.eliminar(numero)
+
+    def parada_mas_cercana(self, lat, lon, radio_km=RADIO_BUSQUEDA_PARADA):
+        """Parada más cercana a (lat, lon) como (distancia_km, Parada), o None si no hay a menos de radio_km"""
+        with self._bloqueo():
+            cercana = self.indice_paradas().mas_cercano(lat, lon, radio_km)
+            return (cercana[0], self.paradas.obtener(cercana[1])) if cercana else None
+
+    def paradas_cercanas(self, lat, lon, radio_km):
+        """Paradas a menos de radio_km: lista de (distancia_km, Parada) ordenada"""
+        with self._bloqueo():
+            return [(d, self.paradas.obtener(parada_id))
+                    for d, parada_id in self.indice_paradas().cercanos(lat, lon, radio_km)]
+
+    def buses_cercanos(self, lat, lon, radio_km):
+        """Buses a menos de radio_km: lista de (distancia_km, numero) ordenada"""
+        with self._bloqueo():
+            return self.indice_buses().cercanos(lat, lon, radio_km)
@@ -0,0 +1,139 @@
+"""Ejecución por lotes de escenarios de simulación en paralelo.
+
+Cada escenario es un diccionario con:
+
+- ``nombre``: identificador del escenario.
+- ``rutas``: nombre de ruta -> lista de paradas (objetos ``Parada``).
+- ``buses_por_ruta``: nombre de ruta -> cantidad de buses.
+- ``capacidad``: capacidad de cada bus (por defecto 40).
+- ``demanda``: ocupación esperada (0 a 1) o None para demanda uniforme.
+- ``duracion``: segundos de servicio a simular.
+- ``paso``: segundos simulados por paso (por defecto SIMULATOR_CONFIG).
+- ``semilla``: semilla explícita; si falta se deriva de ``semilla_base``.
+
+Uso desde consola::
+
+    python -m services.escenarios --buses 2,4,8 --demanda 0.3,0.6 --semillas 3
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import SIMULATOR_CONFIG
+from models.bus import Bus
+from models.ruta import Ruta
+from .simulador import MotorFlota
+
+COLUMNAS = ('nombre', 'buses', 'demanda', 'semilla', 'ocupacion_promedio',
+            'carga_maxima', 'intervalo_promedio', 'intervalo_desviacion')
+
+def ejecutar_escenario(escenario):
+    """Simula un escenario sin interfaz y devuelve sus métricas agregadas"""
+    capacidad = escenario.get('capacidad', 40)
+    paso = escenario.get('paso', SIMULATOR_CONFIG['update_interval'])
+
+    buses = []
+    for nombre_ruta, cantidad in escenario['buses_por_ruta'].items():
+        ruta = Ruta(nombre_ruta, list(escenario['rutas'][nombre_ruta]))
+        for k in range(cantidad):
+            bus = Bus(f"{nombre_ruta}-{k}", capacidad)
+            bus.ruta_actual = ruta
+            # Repartir los buses a lo largo de la ruta para no partir agrupados
+            bus.posicion_ruta = k * len(ruta.paradas) // cantidad
+            buses.append(bus)
+
+    motor, buses = MotorFlota.desde_buses(
+        buses, semilla=escenario['semilla'], demanda=escenario.get('demanda'))
+
+    ocupacion_total = 0.0
+    llegadas_total = 0
+    carga_maxima = 0
+    # Momentos en que cada ruta pasa por su primera parada, para medir intervalos
+    pasadas = [[] for _ in range(len(motor.num_paradas))]
+    for tick in range(1, int(escenario['duracion'] // paso) + 1):
+        llegaron = motor.avanzar(paso)
+        if not llegaron.size:
+            continue
+        pasajeros = motor.pasajeros[llegaron]
+        ocupacion_total += float(np.sum(pasajeros / motor.capacidad[llegaron]))
+        llegadas_total += llegaron.size
+        carga_maxima = max(carga_maxima, int(pasajeros.max()))
+        for i in llegaron[motor.parada[llegaron] == 0]:
+            pasadas[motor.ruta[i]].append(tick * paso)
+
+    intervalos = np.concatenate([np.diff(p) for p in pasadas if len(p) > 1] or [np.zeros(0)])
+    return {
+        'nombre': escenario['nombre'],
+        'buses': len(buses),
+        'demanda': escenario.get('demanda'),
+        'semilla': escenario['semilla'],
+        'ocupacion_promedio': ocupacion_total / llegadas_total if llegadas_total else 0.0,
+        'carga_maxima': carga_maxima,
+        'intervalo_promedio': float(intervalos.mean()) if intervalos.size else None,
+        'intervalo_desviacion': float(intervalos.std()) if intervalos.size else None
+    }
+
+def ejecutar_escenarios(escenarios, max_workers=None, semilla_base=0):
+    """Ejecuta los escenarios en un ProcessPoolExecutor y devuelve sus resultados en orden.
+
+    Los escenarios sin ``semilla`` reciben una derivada de ``semilla_base`` y de
+    su posición, así el resultado no depende de qué proceso ejecute cada uno.
+    """
+    semillas = np.random.SeedSequence(semilla_base).generate_state(len(escenarios))
+    preparados = []
+    for escenario, semilla in zip(escenarios, semillas):
+        escenario = dict(escenario)
+        escenario.setdefault('semilla', int(semilla))
+        preparados.append(escenario)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(ejecutar_escenario, preparados))
+
+def formatear_tabla(resultados):
+    """Devuelve los resultados como una tabla de texto"""
+    filas = [COLUMNAS]
+    for resultado in resultados:
+        fila = []
+        for columna in COLUMNAS:
+            valor = resultado[columna]
+            if isinstance(valor, float):
+                valor = f"{valor:.2f}"
+            fila.append("-" if valor is None else str(valor))
+        filas.append(fila)
+    anchos = [max(len(fila[i]) for fila in filas) for i in range(len(COLUMNAS))]
+    return "\n".join("  ".join(v.ljust(a) for v, a in zip(fila, anchos)).rstrip() for fila in filas)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta escenarios de simulación en paralelo")
+    parser.add_argument("--datos", default="data.json", help="archivo de datos con las rutas")
+    parser.add_argument("--buses", default="2,4,8", help="buses por ruta, separados por coma")
+    parser.add_argument("--demanda", default="0.5", help="niveles de demanda (0 a 1), separados por coma")
+    parser.add_argument("--semillas", type=int, default=1, help="repeticiones con distinta semilla")
+    parser.add_argument("--horas", type=float, default=18, help="horas de servicio a simular")
+    parser.add_argument("--procesos", type=int, default=None, help="procesos en paralelo")
+    args = parser.parse_args()
+
+    from services.data_manager import DataManager
+    data_manager = DataManager(args.datos)
+    rutas = {}
+    for nombre in data_manager.cargar_datos().get('rutas', {}):
+        ruta = data_manager.obtener_ruta(nombre)
+        if len(ruta.paradas) > 1:
+            rutas[nombre] = ruta.paradas
+
+    escenarios = []
+    for cantidad in (int(b) for b in args.buses.split(",")):
+        for demanda in (float(d) for d in args.demanda.split(",")):
+            for repeticion in range(args.semillas):
+                escenarios.append({
+                    'nombre': f"{cantidad}x{len(rutas)} d={demanda} #{repeticion}",
+                    'rutas': rutas,
+                    'buses_por_ruta': {nombre: cantidad for nombre in rutas},
+                    'demanda': demanda,
+                    'duracion': args.horas * 3600
+                })
+    print(formatear_tabla(ejecutar_escenarios(escenarios, args.procesos)))
+
+if __name__ == "__main__":
+    main()
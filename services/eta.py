@@ -0,0 +1,265 @@
+"""Estimación de tiempos de llegada (ETA) a partir de los recorridos observados.
+
+Cada tramo de una ruta (parada k -> k+1, incluido el regreso de la última a
+la primera) guarda las últimas duraciones observadas por franja horaria.
+Las medianas se precalculan en una tabla acumulada por ruta, así el tiempo
+entre dos paradas cualesquiera es una resta y la ETA de toda la flota a
+todas las paradas se calcula con unas pocas operaciones de NumPy.
+"""
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+from utils.constants import RADIO_PARADA
+from utils.geo import RADIO_TIERRA_KM, distancia
+
+def _haversine(lat1, lon1, lat2, lon2):
+    """Versión vectorizada de utils.geo.haversine (grados -> km)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+def _pares_tramos(ruta):
+    """(parada de origen, parada de destino) de cada tramo del circuito, por ID"""
+    ids = [getattr(parada, 'id', parada) for parada in ruta.paradas]
+    return [(ids[k], ids[(k + 1) % len(ids)]) for k in range(len(ids))]
+
+class EstimadorETA:
+    """Tiempos de llegada por ruta y franja horaria.
+
+    ``minutos_franja`` define el ancho de las franjas del día, ``ventana`` la
+    cantidad de observaciones recientes que se conservan por tramo y franja, y
+    ``radio_llegada`` (km) la distancia a la que una posición cuenta como
+    llegada a una parada.
+    """
+
+    def __init__(self, rutas=(), minutos_franja=60, ventana=50, radio_llegada=RADIO_PARADA):
+        self.minutos_franja = minutos_franja
+        self.num_franjas = -(-24 * 60 // minutos_franja)
+        self.ventana = ventana
+        self.radio_llegada = radio_llegada
+        self.rutas = {}
+        # ruta -> (tramo, franja) -> últimas duraciones en segundos
+        self._muestras = {}
+        # ruta -> tiempos acumulados (franjas x paradas + 1) en segundos
+        self._tablas = {}
+        # ruta -> coordenadas de sus paradas y largo de sus tramos
+        self._coordenadas = {}
+        for ruta in rutas:
+            self.agregar_ruta(ruta)
+
+    def agregar_ruta(self, ruta):
+        """Registra (o reemplaza) una ruta.
+
+        Las observaciones se guardan por número de tramo: si cambiaron las
+        paradas, cada tramo conserva las de su mismo par de paradas y se
+        descartan las de los tramos que ya no existen.
+        """
+        anterior = self.rutas.get(ruta.nombre)
+        self.rutas[ruta.nombre] = ruta
+        muestras = self._muestras.get(ruta.nombre)
+        if muestras is None:
+            self._muestras[ruta.nombre] = self._nuevas_muestras()
+        elif anterior is not None:
+            pares_anteriores, pares = _pares_tramos(anterior), _pares_tramos(ruta)
+            if pares != pares_anteriores:
+                nuevo = {par: tramo for tramo, par in enumerate(pares)}
+                remapeadas = self._nuevas_muestras()
+                for (tramo, franja), observadas in muestras.items():
+                    destino = nuevo.get(pares_anteriores[tramo]) if tramo < len(pares_anteriores) else None
+                    if destino is not None:
+                        remapeadas[(destino, franja)] = observadas
+                self._muestras[ruta.nombre] = remapeadas
+        self._tablas.pop(ruta.nombre, None)
+        posiciones = [getattr(p, 'posicion', None) or (np.nan, np.nan) for p in ruta.paradas]
+        lat = np.array([p[0] for p in posiciones], dtype=float)
+        lon = np.array([p[1] for p in posiciones], dtype=float)
+        # Largo de cada tramo, incluido el de regreso a la primera parada
+        largo = _haversine(lat, lon, np.roll(lat, -1), np.roll(lon, -1))
+        self._coordenadas[ruta.nombre] = (lat, lon, largo)
+
+    def _nuevas_muestras(self):
+        return defaultdict(lambda: deque(maxlen=self.ventana))
+
+    def franja(self, momento=None):
+        """Franja horaria de un instante (segundos desde epoch o datetime)"""
+        if momento is None:
+            momento = time.time()
+        elif hasattr(momento, 'timestamp'):
+            momento = momento.timestamp()
+        hora = time.localtime(momento)
+        return (hora.tm_hour * 60 + hora.tm_min) // self.minutos_franja
+
+    def registrar_tramo(self, nombre_ruta, tramo, segundos, momento):
+        """Agrega la duración observada del tramo ``tramo`` (parada tramo -> tramo+1)"""
+        self._muestras[nombre_ruta][(tramo, self.franja(momento))].append(segundos)
+        self._tablas.pop(nombre_ruta, None)
+
+    def registrar_posiciones(self, nombre_ruta, posiciones):
+        """Aprende de las posiciones ``(lat, lon, timestamp)`` de un bus, en orden temporal.
+
+        Una posición a menos de ``radio_llegada`` de una parada cuenta como
+        llegada; el tiempo entre llegadas a paradas consecutivas es una
+        observación del tramo. Devuelve la cantidad de tramos registrados.
+        """
+        ruta = self.rutas[nombre_ruta]
+        n = len(ruta.paradas)
+        ubicadas = [(k, p.posicion) for k, p in enumerate(ruta.paradas)
+                    if getattr(p, 'posicion', None)]
+        if n < 2 or not ubicadas:
+            return 0
+
+        registrados = 0
+        anterior = None  # (parada, momento de llegada)
+        for lat, lon, momento in posiciones:
+            parada, cercania = min(((k, distancia((lat, lon), pos)) for k, pos in ubicadas),
+                                   key=lambda par: par[1])
+            if cercania > self.radio_llegada:
+                continue
+            if anterior is not None and parada == anterior[0]:
+                # Sigue detenido en la misma parada: cuenta desde la llegada
+                continue
+            if anterior is not None and parada == (anterior[0] + 1) % n:
+                self.registrar_tramo(nombre_ruta, anterior[0], momento - anterior[1], anterior[1])
+                registrados += 1
+            anterior = (parada, momento)
+        return registrados
+
+    def aprender_historial(self, db_manager, buses, desde=None, hasta=None):
+        """Aprende del historial de posiciones en la base; ``buses`` es {numero: nombre_ruta}"""
+        registrados = 0
+        for numero, nombre_ruta in buses.items():
+            if nombre_ruta in self.rutas:
+                registrados += self.registrar_posiciones(
+                    nombre_ruta, db_manager.historial_posiciones(numero, desde, hasta))
+        return registrados
+
+    def tabla(self, nombre_ruta):
+        """Tiempos acumulados desde la primera parada, por franja (segundos).
+
+        Por cada tramo se usa la mediana de su franja; si la franja no tiene
+        observaciones, la mediana de todas las del tramo, y si el tramo nunca
+        se observó, el tiempo geométrico de la ruta.
+        """
+        tabla = self._tablas.get(nombre_ruta)
+        if tabla is not None:
+            return tabla
+
+        ruta = self.rutas[nombre_ruta]
+        n = len(ruta.paradas)
+        tramos = np.tile(np.array(ruta.tiempos_circuito(), dtype=float) * 60, (self.num_franjas, 1))
+
+        por_tramo = defaultdict(list)
+        for (tramo, franja), muestras in self._muestras[nombre_ruta].items():
+            if tramo < n and muestras:
+                por_tramo[tramo].extend(muestras)
+        for tramo, muestras in por_tramo.items():
+            tramos[:, tramo] = np.median(muestras)
+        for (tramo, franja), muestras in self._muestras[nombre_ruta].items():
+            if tramo < n and muestras:
+                tramos[franja, tramo] = np.median(muestras)
+
+        tabla = np.zeros((self.num_franjas, n + 1))
+        np.cumsum(tramos, axis=1, out=tabla[:, 1:])
+        self._tablas[nombre_ruta] = tabla
+        return tabla
+
+    def construir_tablas(self):
+        """Precalcula las tablas de todas las rutas"""
+        for nombre_ruta in self.rutas:
+            self.tabla(nombre_ruta)
+
+    def _avance(self, nombre_ruta, origen, lat, lon):
+        """Fracción ya recorrida del tramo que sigue a ``origen``, según la posición del bus"""
+        lat_p, lon_p, largo = self._coordenadas[nombre_ruta]
+        siguiente = (origen + 1) % len(lat_p)
+        restante = _haversine(lat, lon, lat_p[siguiente], lon_p[siguiente])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avance = 1 - restante / largo[origen]
+        return np.nan_to_num(np.clip(avance, 0, 1), nan=0.0)
+
+    def _etas(self, nombre_ruta, origen, lat, lon, destinos, franja):
+        tabla = self.tabla(nombre_ruta)[franja]
+        total = tabla[-1]
+        tramo = tabla[origen + 1] - tabla[origen]
+        # Tiempo ya recorrido desde la primera parada, contando el avance en el tramo actual
+        recorrido = tabla[origen] + self._avance(nombre_ruta, origen, lat, lon) * tramo
+        etas = tabla[destinos][None, :] - recorrido[:, None]
+        if total > 0:
+            # Las paradas ya pasadas se alcanzan en la vuelta siguiente
+            np.mod(etas, total, out=etas)
+        return etas / 60
+
+    def _preparar(self, buses):
+        """Agrupa los buses por ruta en arreglos (numeros, parada actual, lat, lon)"""
+        grupos = defaultdict(list)
+        for bus in buses:
+            ruta = bus.ruta_actual
+            if ruta is not None:
+                grupos[ruta.nombre].append(bus)
+
+        preparados = {}
+        for nombre_ruta, grupo in grupos.items():
+            if nombre_ruta not in self.rutas:
+                self.agregar_ruta(grupo[0].ruta_actual)
+            n = len(self.rutas[nombre_ruta].paradas)
+            if not n:
+                continue
+            posiciones = [bus.posicion or (np.nan, np.nan) for bus in grupo]
+            preparados[nombre_ruta] = (
+                [bus.numero for bus in grupo],
+                np.array([bus.posicion_ruta % n for bus in grupo], dtype=np.intp),
+                np.array([p[0] for p in posiciones], dtype=float),
+                np.array([p[1] for p in posiciones], dtype=float))
+        return preparados
+
+    def etas_ruta(self, nombre_ruta, buses, momento=None):
+        """ETA en minutos de cada bus de la ruta a cada una de sus paradas.
+
+        Devuelve ``(numeros, matriz)`` con una fila por bus y una columna por
+        parada, en el orden de la ruta.
+        """
+        preparado = self._preparar(bus for bus in buses
+                                   if bus.ruta_actual and bus.ruta_actual.nombre == nombre_ruta)
+        if nombre_ruta not in preparado:
+            return [], np.zeros((0, len(self.rutas[nombre_ruta].paradas)))
+        numeros, origen, lat, lon = preparado[nombre_ruta]
+        destinos = np.arange(len(self.rutas[nombre_ruta].paradas))
+        return numeros, self._etas(nombre_ruta, origen, lat, lon, destinos, self.franja(momento))
+
+    def etas_flota(self, buses, momento=None):
+        """ETA de toda la flota: {nombre_ruta: (numeros, matriz)} como en etas_ruta"""
+        franja = self.franja(momento)
+        resultado = {}
+        for nombre_ruta, (numeros, origen, lat, lon) in self._preparar(buses).items():
+            destinos = np.arange(len(self.rutas[nombre_ruta].paradas))
+            resultado[nombre_ruta] = (numeros, self._etas(nombre_ruta, origen, lat, lon, destinos, franja))
+        return resultado
+
+    def etas_parada(self, parada_id, buses, momento=None):
+        """Próximas llegadas a una parada: lista de (minutos, numero, nombre_ruta) ordenada"""
+        franja = self.franja(momento)
+        llegadas = []
+        for nombre_ruta, (numeros, origen, lat, lon) in self._preparar(buses).items():
+            destino = self.rutas[nombre_ruta].indice_parada(parada_id)
+            if destino is None:
+                continue
+            etas = self._etas(nombre_ruta, origen, lat, lon, np.array([destino]), franja)[:, 0]
+            llegadas.extend(zip(etas.tolist(), numeros, [nombre_ruta] * len(numeros)))
+        llegadas.sort()
+        return llegadas
+
+    def eta(self, bus, parada, momento=None):
+        """ETA en minutos de un bus a una parada de su ruta, o None si no pasa por ella"""
+        ruta = bus.ruta_actual
+        if ruta is None:
+            return None
+        if ruta.nombre not in self.rutas:
+            self.agregar_ruta(ruta)
+        destino = self.rutas[ruta.nombre].indice_parada(parada)
+        if destino is None:
+            return None
+        (_, origen, lat, lon), = self._preparar([bus]).values()
+        return float(self._etas(ruta.nombre, origen, lat, lon, np.array([destino]),
+                                self.franja(momento))[0, 0])
@@ -0,0 +1,209 @@
+"""Capa en vivo del mapa: posiciones de buses y recorridos en edición.
+
+La página del mapa (gui/map_view.py) se genera una sola vez y consulta
+periódicamente ``/cambios?desde=<version>`` en un servidor HTTP local. Cada
+cambio de la capa recibe un número de versión, y el servidor responde solo
+lo que cambió después de la versión que ya tiene la página, como un único
+FeatureCollection GeoJSON (buses como Point, recorridos como LineString).
+El mismo servidor entrega las teselas del mapa desde la caché local
+(services/teselas.py) en ``/teselas/<z>/<x>/<y>.png``.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from config import HOST, PORT
+from utils.indice_espacial import IndiceEspacial
+
+class CapaViva:
+    """Estado versionado de la capa en vivo (segura entre hilos)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        # clave -> (versión del último cambio, datos o None si se eliminó)
+        self._buses = {}
+        self._rutas = {}
+        self.indice_buses = IndiceEspacial()
+
+    def actualizar_buses(self, estados):
+        """Publica posiciones de buses; ``estados`` es {numero: estado} con 'posicion'"""
+        with self._lock:
+            self.version += 1
+            for numero, estado in estados.items():
+                posicion = estado.get('posicion')
+                if not posicion:
+                    continue
+                self._buses[numero] = (self.version, {
+                    'type': 'Feature',
+                    'id': numero,
+                    'geometry': {'type': 'Point', 'coordinates': [posicion[1], posicion[0]]},
+                    'properties': {
+                        'tipo': 'bus',
+                        'ruta': estado.get('ruta'),
+                        'parada': estado.get('nombre_parada'),
+                        'pasajeros': estado.get('pasajeros'),
+                        'capacidad': estado.get('capacidad')
+                    }
+                })
+                self.indice_buses.mover(numero, posicion[0], posicion[1])
+
+    def eliminar_buses(self, numeros):
+        with self._lock:
+            self.version += 1
+            for numero in numeros:
+                if numero in self._buses:
+                    self._buses[numero] = (self.version, None)
+                    self.indice_buses.eliminar(numero)
+
+    def actualizar_ruta(self, nombre, posiciones):
+        """Publica el trazado de una ruta como lista de [lat, lon]"""
+        with self._lock:
+            self.version += 1
+            self._rutas[nombre] = (self.version, {
+                'type': 'Feature',
+                'id': nombre,
+                'geometry': {'type': 'LineString', 'coordinates': [[lon, lat] for lat, lon in posiciones]},
+                'properties': {'tipo': 'ruta'}
+            })
+
+    def eliminar_ruta(self, nombre):
+        with self._lock:
+            if nombre in self._rutas:
+                self.version += 1
+                self._rutas[nombre] = (self.version, None)
+
+    def cambios_desde(self, desde=0):
+        """Cambios posteriores a la versión ``desde``.
+
+        Si ``desde`` es 0 o mayor que la versión actual (p. ej. la aplicación
+        se reinició) la respuesta es completa y la página debe descartar lo
+        que tenía.
+        """
+        with self._lock:
+            completo = desde <= 0 or desde > self.version
+            if completo:
+                desde = 0
+            cambios = {'type': 'FeatureCollection', 'version': self.version, 'completo': completo,
+                       'features': [], 'eliminados': {'buses': [], 'rutas': []}}
+            for coleccion, elementos in (('buses', self._buses), ('rutas', self._rutas)):
+                for clave, (version, feature) in elementos.items():
+                    if version <= desde:
+                        continue
+                    if feature is not None:
+                        cambios['features'].append(feature)
+                    elif not completo:
+                        cambios['eliminados'][coleccion].append(clave)
+            return cambios
+
+    def buses_cercanos(self, lat, lon, radio_km):
+        with self._lock:
+            return self.indice_buses.cercanos(lat, lon, radio_km)
+
+_capa_compartida = CapaViva()
+
+def capa_compartida():
+    """Capa usada por la ventana principal y los editores de recorrido"""
+    return _capa_compartida
+
+class _ManejadorMapa(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = parse_qs(url.query)
+        try:
+            if url.path == '/cambios':
+                desde = int(parametros.get('desde', ['0'])[0])
+                self._responder(self.server.capa.cambios_desde(desde))
+            elif url.path.startswith('/teselas/'):
+                z, x, y = url.path[len('/teselas/'):].removesuffix('.png').split('/')
+                self._responder_tesela(self.server.tesela(int(z), int(x), int(y)))
+            elif url.path == '/cercanos':
+                lat = float(parametros['lat'][0])
+                lon = float(parametros['lon'][0])
+                radio = float(parametros.get('radio', ['0.5'])[0])
+                self._responder(self.server.cercanos(lat, lon, radio))
+            else:
+                self.send_error(404)
+        except (KeyError, ValueError) as e:
+            self.send_error(400, f"Parámetros inválidos: {e}")
+
+    def _responder(self, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.send_header('Cache-Control', 'no-store')
+        # La página del mapa se abre como file://
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _responder_tesela(self, datos):
+        if datos is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(datos)))
+        self.send_header('Cache-Control', 'max-age=86400')
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, format, *args):
+        # Una consulta por segundo llenaría la consola
+        pass
+
+class ServidorMapa:
+    """Servidor HTTP local (config.HOST/PORT) con la capa en vivo y las teselas del mapa"""
+
+    def __init__(self, capa, data_manager=None, teselas=None, host=HOST, port=PORT):
+        self.capa = capa
+        self.data_manager = data_manager
+        self.teselas = teselas
+        self.host = host
+        self.port = port
+        self._servidor = None
+        self._hilo = None
+
+    def iniciar(self):
+        if self._servidor is not None:
+            return True
+        try:
+            self._servidor = ThreadingHTTPServer((self.host, self.port), _ManejadorMapa)
+        except OSError as e:
+            print(f"No se pudo iniciar el servidor del mapa en {self.host}:{self.port}: {e}")
+            return False
+        self._servidor.daemon_threads = True
+        self._servidor.capa = self.capa
+        self._servidor.cercanos = self.cercanos
+        self._servidor.tesela = self.tesela
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return True
+
+    def detener(self):
+        """Detiene el servidor y cierra la caché de teselas"""
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._hilo.join()
+            self._servidor = None
+            self._hilo = None
+        if self.teselas is not None:
+            self.teselas.cerrar()
+            self.teselas = None
+
+    def tesela(self, z, x, y):
+        if self.teselas is None:
+            return None
+        return self.teselas.obtener_o_descargar(z, x, y)
+
+    def cercanos(self, lat, lon, radio_km):
+        """Buses de la capa y paradas a menos de radio_km de (lat, lon)"""
+        respuesta = {'buses': [[d, numero] for d, numero in self.capa.buses_cercanos(lat, lon, radio_km)],
+                     'paradas': []}
+        if self.data_manager is not None:
+            respuesta['paradas'] = [[d, parada.id, parada.nombre] for d, parada in
+                                    self.data_manager.paradas_cercanas(lat, lon, radio_km)]
+        return respuesta
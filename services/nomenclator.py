@@ -0,0 +1,174 @@
+"""Nomenclátor local de paradas: nombre -> coordenadas, sin geocodificación en red.
+
+Los nombres se normalizan (sin tildes, mayúsculas ni puntuación) y se
+indexan por trigramas. Una consulta junta las listas de los trigramas del
+texto y cuenta coincidencias por nombre con NumPy, así sugerir y buscar
+duplicados cuesta menos de un milisegundo aun con decenas de miles de
+nombres.
+"""
+import csv
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from config import GAZETTEER_FILE
+
+# Candidatos por trigramas que se reordenan dando prioridad a los prefijos
+CANDIDATOS_SUGERENCIA = 50
+
+def normalizar(nombre):
+    """Forma comparable de un nombre: "Parque Magallanes, 1504" -> "parque magallanes 1504" """
+    texto = unicodedata.normalize('NFKD', str(nombre).casefold())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w]+', ' ', texto).split())
+
+def trigramas(normalizado):
+    texto = f"  {normalizado} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+class Nomenclator:
+    """Índice de trigramas sobre nombres de paradas con sus coordenadas.
+
+    Se consulta desde el hilo de Tk mientras los guardados en segundo plano
+    agregan paradas: lecturas y escrituras toman el mismo lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.nombres = []
+        self.posiciones = []
+        self._normalizados = []
+        self._por_normalizado = {}
+        # trigrama -> índices de los nombres que lo contienen
+        self._indice = {}
+        self._arreglos = {}
+        self._tamanos = []
+        self._tamanos_np = None
+
+    @classmethod
+    def desde_archivo(cls, archivo=GAZETTEER_FILE):
+        nomenclator = cls()
+        nomenclator.cargar_archivo(archivo)
+        return nomenclator
+
+    def cargar_archivo(self, archivo=GAZETTEER_FILE):
+        """Agrega los nombres de un CSV con columnas nombre, lat, lon (coordenadas opcionales)"""
+        try:
+            with open(archivo, encoding='utf-8', newline='') as f:
+                for fila in csv.DictReader(f):
+                    lat, lon = fila.get('lat'), fila.get('lon')
+                    self.agregar(fila['nombre'], (float(lat), float(lon)) if lat and lon else None)
+        except FileNotFoundError:
+            print(f"No se encontró el nomenclátor {archivo}")
+
+    def __len__(self):
+        with self._lock:
+            return len(self.nombres)
+
+    def agregar(self, nombre, posicion=None):
+        """Agrega un nombre y devuelve su índice.
+
+        Si ya existe se conserva la forma en que se escribió primero y solo se
+        completa la posición si no la tenía.
+        """
+        normalizado = normalizar(nombre)
+        if not normalizado:
+            raise ValueError("El nombre de la parada no puede estar vacío")
+        with self._lock:
+            indice = self._por_normalizado.get(normalizado)
+            if indice is not None:
+                if posicion and self.posiciones[indice] is None:
+                    self.posiciones[indice] = tuple(posicion)
+                return indice
+            indice = len(self.nombres)
+            self.nombres.append(" ".join(str(nombre).split()))
+            self.posiciones.append(tuple(posicion) if posicion else None)
+            self._normalizados.append(normalizado)
+            self._por_normalizado[normalizado] = indice
+            grupo = trigramas(normalizado)
+            for trigrama in grupo:
+                self._indice.setdefault(trigrama, []).append(indice)
+                self._arreglos.pop(trigrama, None)
+            self._tamanos.append(len(grupo))
+            self._tamanos_np = None
+            return indice
+
+    def buscar(self, nombre):
+        """Nombre registrado que se escribe igual salvo tildes, mayúsculas o puntuación, o None"""
+        normalizado = normalizar(nombre)
+        with self._lock:
+            indice = self._por_normalizado.get(normalizado)
+            return None if indice is None else self.nombres[indice]
+
+    def posicion(self, nombre):
+        normalizado = normalizar(nombre)
+        with self._lock:
+            indice = self._por_normalizado.get(normalizado)
+            return None if indice is None else self.posiciones[indice]
+
+    def ubicar(self, nombre, posicion):
+        """Reemplaza la posición de un nombre, agregándolo si no existe"""
+        with self._lock:
+            self.posiciones[self.agregar(nombre)] = tuple(posicion) if posicion else None
+
+    def _coincidencias(self, normalizado):
+        """Trigramas de la consulta y cuántos comparte con cada nombre (llamar con self._lock tomado)"""
+        grupo = trigramas(normalizado)
+        listas = []
+        for trigrama in grupo:
+            if trigrama not in self._indice:
+                continue
+            arreglo = self._arreglos.get(trigrama)
+            if arreglo is None:
+                arreglo = self._arreglos[trigrama] = np.array(self._indice[trigrama], dtype=np.int32)
+            listas.append(arreglo)
+        if not listas:
+            return grupo, None
+        if self._tamanos_np is None:
+            self._tamanos_np = np.array(self._tamanos, dtype=np.float64)
+        return grupo, np.bincount(np.concatenate(listas), minlength=len(self.nombres))
+
+    def sugerir(self, texto, limite=10):
+        """Nombres para autocompletar lo que se lleva escrito, los más parecidos primero.
+
+        Puntúa la fracción de trigramas del texto que tiene cada nombre; entre
+        los mejores, los que empiezan con el texto van primero y luego los más
+        cortos.
+        """
+        normalizado = normalizar(texto)
+        if not normalizado:
+            return []
+        with self._lock:
+            grupo, cuenta = self._coincidencias(normalizado)
+            if cuenta is None:
+                return []
+            candidatos = np.flatnonzero(cuenta)
+            puntaje = cuenta[candidatos] / len(grupo)
+            if len(candidatos) > CANDIDATOS_SUGERENCIA:
+                mejores = np.argpartition(-puntaje, CANDIDATOS_SUGERENCIA)[:CANDIDATOS_SUGERENCIA]
+                candidatos, puntaje = candidatos[mejores], puntaje[mejores]
+            orden = sorted(zip(candidatos.tolist(), puntaje.tolist()),
+                           key=lambda par: (not self._normalizados[par[0]].startswith(normalizado),
+                                            -par[1], len(self._normalizados[par[0]])))
+            return [self.nombres[i] for i, _ in orden[:limite]]
+
+    def duplicados(self, nombre, umbral=0.6):
+        """Nombres registrados parecidos a ``nombre`` como [(similitud, nombre)], de mayor a menor.
+
+        La similitud es el coeficiente de Dice entre trigramas; un nombre que
+        solo difiere en tildes, mayúsculas o puntuación tiene similitud 1.
+        """
+        normalizado = normalizar(nombre)
+        if not normalizado:
+            return []
+        with self._lock:
+            grupo, cuenta = self._coincidencias(normalizado)
+            if cuenta is None:
+                return []
+            candidatos = np.flatnonzero(cuenta)
+            similitud = 2 * cuenta[candidatos] / (len(grupo) + self._tamanos_np[candidatos])
+            parecidos = similitud >= umbral
+            resultado = sorted(zip(similitud[parecidos].tolist(), candidatos[parecidos].tolist()), reverse=True)
+            return [(round(s, 3), self.nombres[i]) for s, i in resultado]
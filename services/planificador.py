@@ -0,0 +1,324 @@
+"""Planificador de viajes entre paradas, combinando todas las rutas.
+
+Las rutas son circulares y no tienen horario: se supone que sus buses salen
+de la primera parada cada ``frecuencia`` minutos (el ciclo de la ruta
+dividido por sus buses asignados, o FRECUENCIA_DEFECTO) y tardan lo que
+indica la geometría de la ruta entre paradas.
+
+La búsqueda sigue RAPTOR (Delling, Pajor y Werneck, 2012): la ronda k
+encuentra las mejores llegadas usando k buses, recorriendo una sola vez
+cada ruta que pasa por alguna parada mejorada en la ronda anterior, y luego
+agrega los trasbordos a pie entre paradas cercanas. El grafo (rutas por
+parada y caminatas) se precalcula y se actualiza por ruta cuando cambian
+los datos.
+
+    python -m services.planificador "Terminal de Buses Coquimbo" "Mall Plaza La Serena" --salida 08:00
+"""
+import argparse
+import math
+import threading
+from datetime import datetime
+
+from models.parada import RegistroParadas
+from utils.constants import FRECUENCIA_DEFECTO, RADIO_TRASBORDO, VELOCIDAD_CAMINATA
+from utils.indice_espacial import IndiceEspacial
+
+class _Patron:
+    """Paradas de una ruta con el minuto en que un bus pasa por cada una"""
+    __slots__ = ('ruta', 'paradas', 'desfases', 'ciclo', 'frecuencia')
+
+    def __init__(self, ruta, frecuencia):
+        self.ruta = ruta
+        self.paradas = [parada.id for parada in ruta.paradas]
+        # Minutos desde la primera parada; el ciclo incluye el regreso a ella
+        self.desfases = [ruta.tiempo_hasta_parada(i) for i in range(len(ruta.paradas))]
+        self.ciclo = ruta.tiempo_ciclo()
+        self.frecuencia = frecuencia
+
+    def paso(self, posicion):
+        """Minuto, relativo a la salida de la primera parada, en que se pasa por la posición.
+
+        Las posiciones desde len(paradas) corresponden a la vuelta siguiente.
+        """
+        vuelta, indice = divmod(posicion, len(self.paradas))
+        return self.desfases[indice] + vuelta * self.ciclo
+
+class Planificador:
+    """Viaje más rápido entre dos paradas con RAPTOR sobre rutas con frecuencia fija.
+
+    ``frecuencias`` fija los minutos entre buses de algunas rutas; las demás
+    usan su ciclo dividido por ``buses_por_ruta`` o FRECUENCIA_DEFECTO.
+    """
+
+    def __init__(self, rutas=(), frecuencias=None, buses_por_ruta=None, radio_trasbordo=RADIO_TRASBORDO):
+        self.frecuencias = dict(frecuencias or {})
+        self.buses_por_ruta = dict(buses_por_ruta or {})
+        self.radio_trasbordo = radio_trasbordo
+        self.data_manager = None
+        self._lock = threading.RLock()
+        self._patrones = {}
+        # parada -> [(patrón, posición en la ruta)]
+        self._rutas_por_parada = {}
+        # parada -> {parada vecina: minutos a pie}
+        self._caminatas = {}
+        self.paradas = {}
+        self._indice = IndiceEspacial()
+        self._sucio = False
+        for ruta in rutas:
+            self.actualizar_ruta(ruta)
+
+    @classmethod
+    def desde_data_manager(cls, data_manager):
+        """Planificador que se mantiene al día con los cambios de data_manager"""
+        planificador = cls()
+        planificador.data_manager = data_manager
+        planificador._sucio = True
+        data_manager.suscribir(planificador._al_cambiar)
+        return planificador
+
+    def _al_cambiar(self, entrada):
+        with self._lock:
+            if entrada is None or self._sucio:
+                # Se reconstruye todo en la próxima consulta
+                self._sucio = True
+            elif entrada['col'] == 'rutas':
+                if entrada['op'] == 'del':
+                    self.eliminar_ruta(entrada['clave'])
+                else:
+                    self.actualizar_ruta(self.data_manager.obtener_ruta(entrada['clave']))
+            elif entrada['col'] == 'paradas' and entrada['op'] == 'campo' and entrada['campo'] == 'posicion':
+                parada_id = int(entrada['clave'])
+                if parada_id in self.paradas:
+                    self.actualizar_parada(self.data_manager.paradas.obtener(parada_id))
+            elif entrada['col'] == 'buses' and entrada['op'] in ('set', 'del'):
+                self._contar_buses()
+
+    def _contar_buses(self):
+        self.buses_por_ruta = self.data_manager.buses_por_ruta()
+        for nombre, patron in self._patrones.items():
+            patron.frecuencia = self._frecuencia(nombre, patron.ciclo)
+
+    def _frecuencia(self, nombre, ciclo):
+        if nombre in self.frecuencias:
+            return self.frecuencias[nombre]
+        buses = self.buses_por_ruta.get(nombre)
+        return ciclo / buses if buses else FRECUENCIA_DEFECTO
+
+    def _preparar(self):
+        """Reconstruye el grafo completo desde data_manager si quedó desactualizado"""
+        if not self._sucio:
+            return
+        # Copia de los nombres: el modelo puede cambiar mientras se reconstruye
+        nombres = self.data_manager.claves('rutas')
+        self._sucio = False
+        for nombre in list(self._patrones):
+            self.eliminar_ruta(nombre)
+        self._contar_buses()
+        for nombre in nombres:
+            ruta = self.data_manager.obtener_ruta(nombre)
+            if ruta is not None:
+                self.actualizar_ruta(ruta)
+
+    def actualizar_ruta(self, ruta):
+        """Agrega o reemplaza una ruta; solo se recalculan sus paradas y caminatas"""
+        with self._lock:
+            self.eliminar_ruta(ruta.nombre)
+            if len(ruta.paradas) < 2:
+                return
+            patron = _Patron(ruta, FRECUENCIA_DEFECTO)
+            patron.frecuencia = self._frecuencia(ruta.nombre, patron.ciclo)
+            self._patrones[ruta.nombre] = patron
+            for posicion, parada in enumerate(ruta.paradas):
+                if parada.id not in self._rutas_por_parada:
+                    self._rutas_por_parada[parada.id] = []
+                    self._agregar_parada(parada)
+                self._rutas_por_parada[parada.id].append((patron, posicion))
+
+    def eliminar_ruta(self, nombre):
+        with self._lock:
+            patron = self._patrones.pop(nombre, None)
+            if patron is None:
+                return
+            for parada_id in patron.paradas:
+                pasadas = [par for par in self._rutas_por_parada.get(parada_id, ()) if par[0] is not patron]
+                if pasadas:
+                    self._rutas_por_parada[parada_id] = pasadas
+                elif parada_id in self._rutas_por_parada:
+                    del self._rutas_por_parada[parada_id]
+                    self._quitar_parada(parada_id)
+
+    def actualizar_parada(self, parada):
+        """Recalcula las caminatas de una parada y los tiempos de sus rutas (p. ej. si se movió)"""
+        with self._lock:
+            self._quitar_parada(parada.id)
+            self._agregar_parada(parada)
+            for patron in {patron for patron, _ in self._rutas_por_parada.get(parada.id, ())}:
+                patron.ruta.invalidar_geometria()
+                self.actualizar_ruta(patron.ruta)
+
+    def _agregar_parada(self, parada):
+        self.paradas[parada.id] = parada
+        self._caminatas[parada.id] = {}
+        if not parada.posicion:
+            return
+        for d, vecina in self._indice.cercanos(parada.posicion[0], parada.posicion[1], self.radio_trasbordo):
+            minutos = d / VELOCIDAD_CAMINATA * 60
+            self._caminatas[parada.id][vecina] = minutos
+            self._caminatas[vecina][parada.id] = minutos
+        self._indice.mover(parada.id, parada.posicion[0], parada.posicion[1])
+
+    def _quitar_parada(self, parada_id):
+        self.paradas.pop(parada_id, None)
+        self._indice.eliminar(parada_id)
+        for vecina in self._caminatas.pop(parada_id, {}):
+            self._caminatas[vecina].pop(parada_id, None)
+
+    def _resolver(self, parada):
+        """ID de una parada dada como objeto Parada, ID o nombre"""
+        if isinstance(parada, str):
+            canonico = RegistroParadas.canonico(parada)
+            for candidata in self.paradas.values():
+                if RegistroParadas.canonico(candidata.nombre) == canonico:
+                    return candidata.id
+            raise ValueError(f"Ninguna ruta pasa por la parada '{parada}'")
+        parada_id = getattr(parada, 'id', parada)
+        if parada_id not in self.paradas:
+            raise ValueError(f"Ninguna ruta pasa por la parada {parada_id}")
+        return parada_id
+
+    @staticmethod
+    def minutos(momento):
+        """Minutos desde medianoche de un datetime/time, o el número tal cual"""
+        if hasattr(momento, 'hour'):
+            return momento.hour * 60 + momento.minute + momento.second / 60
+        return float(momento)
+
+    def planificar(self, origen, destino, salida, max_buses=5):
+        """Viaje más rápido de origen a destino saliendo en ``salida``, o None.
+
+        ``salida`` son minutos desde medianoche (o un datetime). Devuelve
+        {'salida', 'llegada', 'duracion', 'trasbordos', 'tramos'}, donde cada
+        tramo es {'tipo': 'bus' o 'caminata', 'ruta', 'desde', 'hasta',
+        'salida', 'llegada'} con objetos Parada y minutos.
+        """
+        with self._lock:
+            self._preparar()
+            origen = self._resolver(origen)
+            destino = self._resolver(destino)
+            salida = self.minutos(salida)
+
+            # Por ronda k: rondas[k] tiene las paradas cuya mejor llegada se logró
+            # con k buses (desde ellas se sube en la ronda siguiente) y bajadas[k]
+            # las llegadas en bus, desde las que se puede seguir a pie. Una
+            # llegada en bus más tardía que una a pie sigue sirviendo para caminar.
+            rondas = [{origen: (salida, None)}]
+            bajadas = [{origen: (salida, None)}]
+            mejor = {origen: salida}
+            mejor_bus = {}
+            for k in range(max_buses + 1):
+                ronda, en_bus = rondas[k], bajadas[k]
+                for parada, (llegada, _) in list(en_bus.items()):
+                    for vecina, minutos in self._caminatas[parada].items():
+                        t = llegada + minutos
+                        if t < min(mejor.get(vecina, math.inf), mejor.get(destino, math.inf)):
+                            mejor[vecina] = t
+                            ronda[vecina] = (t, ('caminata', None, parada, llegada))
+                if k == max_buses or not ronda:
+                    break
+                siguiente, en_bus = {}, {}
+                for patron, comienzo in self._patrones_a_recorrer(ronda).values():
+                    self._recorrer(patron, comienzo, ronda, mejor, mejor_bus, siguiente, en_bus, destino)
+                rondas.append(siguiente)
+                bajadas.append(en_bus)
+
+            if destino not in mejor:
+                return None
+            return self._viaje(rondas, bajadas, destino, salida)
+
+    def _patrones_a_recorrer(self, marcadas):
+        """Rutas que pasan por paradas marcadas, con la primera posición marcada de cada una"""
+        patrones = {}
+        for parada in marcadas:
+            for patron, posicion in self._rutas_por_parada.get(parada, ()):
+                actual = patrones.get(patron.ruta.nombre)
+                if actual is None or posicion < actual[1]:
+                    patrones[patron.ruta.nombre] = (patron, posicion)
+        return patrones
+
+    def _recorrer(self, patron, comienzo, anterior, mejor, mejor_bus, ronda, en_bus, destino):
+        """Recorre una ruta circular desde ``comienzo`` durante una vuelta y casi otra.
+
+        Se puede subir durante la primera vuelta; la segunda permite bajar en
+        las paradas anteriores a la de subida.
+        """
+        n = len(patron.paradas)
+        base = None  # salida desde la primera parada del bus que se lleva
+        subida = None
+        for posicion in range(comienzo, comienzo + 2 * n - 1):
+            parada = patron.paradas[posicion % n]
+            paso = patron.paso(posicion)
+            if base is not None:
+                t = base + paso
+                if t < min(mejor_bus.get(parada, math.inf), mejor.get(destino, math.inf)):
+                    etiqueta = ('bus', patron.ruta.nombre, subida[0], subida[1])
+                    mejor_bus[parada] = t
+                    en_bus[parada] = (t, etiqueta)
+                    if t < mejor.get(parada, math.inf):
+                        mejor[parada] = t
+                        ronda[parada] = (t, etiqueta)
+            if posicion < comienzo + n and parada in anterior:
+                llegada = anterior[parada][0]
+                if base is None or llegada < base + paso:
+                    # Primer bus que pasa por la parada después de llegar a ella
+                    salida_bus = math.ceil((llegada - paso) / patron.frecuencia - 1e-9) * patron.frecuencia
+                    if base is None or salida_bus < base:
+                        base = salida_bus
+                        subida = (parada, base + paso)
+
+    def _viaje(self, rondas, bajadas, destino, salida):
+        k = max(k for k, ronda in enumerate(rondas) if destino in ronda)
+        llegada_final, etiqueta = rondas[k][destino]
+        llegada, parada = llegada_final, destino
+        tramos = []
+        while etiqueta is not None:
+            tipo, ruta, desde, hora_salida = etiqueta
+            tramos.append({'tipo': tipo, 'ruta': ruta, 'desde': self.paradas[desde],
+                           'hasta': self.paradas[parada], 'salida': hora_salida, 'llegada': llegada})
+            parada = desde
+            if tipo == 'caminata':
+                llegada, etiqueta = bajadas[k][parada]
+            else:
+                # La subida usó la mejor llegada a esa parada de una ronda anterior
+                k = max(j for j in range(k) if parada in rondas[j])
+                llegada, etiqueta = rondas[k][parada]
+        tramos.reverse()
+        buses = sum(1 for tramo in tramos if tramo['tipo'] == 'bus')
+        return {'salida': salida, 'llegada': llegada_final, 'duracion': llegada_final - salida,
+                'trasbordos': max(buses - 1, 0), 'tramos': tramos}
+
+def _hora(minutos):
+    minutos = round(minutos)
+    return f"{minutos // 60 % 24:02d}:{minutos % 60:02d}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca el viaje más rápido entre dos paradas")
+    parser.add_argument("origen", help="nombre de la parada de origen")
+    parser.add_argument("destino", help="nombre de la parada de destino")
+    parser.add_argument("--salida", default=None, help="hora de salida HH:MM (por defecto, ahora)")
+    parser.add_argument("--datos", default="data.json", help="archivo de datos con las rutas")
+    args = parser.parse_args()
+
+    from services.data_manager import DataManager
+    planificador = Planificador.desde_data_manager(DataManager(args.datos))
+    salida = datetime.strptime(args.salida, "%H:%M") if args.salida else datetime.now()
+    viaje = planificador.planificar(args.origen, args.destino, salida)
+    if viaje is None:
+        print(f"No hay viaje de '{args.origen}' a '{args.destino}'")
+        return
+    for tramo in viaje['tramos']:
+        medio = f"Ruta {tramo['ruta']}" if tramo['tipo'] == 'bus' else "A pie"
+        print(f"{_hora(tramo['salida'])} -> {_hora(tramo['llegada'])}  {medio}: {tramo['desde']} -> {tramo['hasta']}")
+    print(f"Llegada {_hora(viaje['llegada'])} ({viaje['duracion']:.0f} min, {viaje['trasbordos']} trasbordos)")
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,382 @@
 import threading
 import time
-import random
+from collections import deque
+
+import numpy as np
+
+from config import SIMULATOR_CONFIG
+
+# Duración (s) de un tramo entre dos paradas en el mismo lugar, p. ej. el
+# regreso a la primera parada en una ruta A -> B -> A
+DURACION_MINIMA_TRAMO = 1.0
+
+# Espera mínima (s) entre ciclos del hilo del simulador, también sin
+# multiplicador, para no acaparar el intérprete frente al hilo de Tk
+ESPERA_MINIMA = 0.001
+
+class MotorFlota:
+    """Estado de toda la flota en arreglos NumPy, avanzado en un solo paso vectorizado.
+
+    Cada bus ocupa una posición de los arreglos: ruta, parada actual, avance
+    (0 a 1) en el tramo hacia la siguiente parada, pasajeros y capacidad. Las
+    duraciones en segundos de los tramos de todas las rutas se guardan
+    concatenadas en ``duracion_tramos``; ``inicio_ruta`` indica dónde empieza
+    cada ruta. Las rutas son circuitos: tras la última parada viene el tramo
+    de regreso a la primera, con el que el bus inicia una nueva vuelta.
+    """
+
+    def __init__(self, duraciones_rutas, rutas_buses, capacidades, semilla=None, demanda=None):
+        """
+        Args:
+            duraciones_rutas: por cada ruta, duraciones (s) de sus tramos; el
+                tramo i va de la parada i a la i + 1 y el último regresa a la primera.
+            rutas_buses: índice de ruta de cada bus.
+            capacidades: capacidad de cada bus.
+            semilla: semilla o ``np.random.Generator`` para la demanda de pasajeros.
+            demanda: ocupación esperada (0 a 1) en cada parada; con None la
+                cantidad de pasajeros es uniforme entre 0 y la capacidad.
+        """
+        tramos = [np.asarray(d, dtype=np.float64) for d in duraciones_rutas]
+        self.num_paradas = np.array([len(d) for d in tramos], dtype=np.int32)
+        self.inicio_ruta = np.zeros(len(tramos), dtype=np.int64)
+        if tramos:
+            self.inicio_ruta[1:] = np.cumsum([len(d) for d in tramos])[:-1]
+        duraciones = np.concatenate(tramos) if tramos else np.zeros(0)
+        if not np.all(duraciones >= 0):
+            raise ValueError("Las duraciones de los tramos no pueden ser negativas")
+        # Solo los tramos de largo cero reciben la duración mínima; los cortos se respetan
+        self.duracion_tramos = np.where(duraciones == 0, DURACION_MINIMA_TRAMO, duraciones)
+
+        self.ruta = np.asarray(rutas_buses, dtype=np.int32)
+        self.capacidad = np.asarray(capacidades, dtype=np.int32)
+        n = len(self.ruta)
+        self.parada = np.zeros(n, dtype=np.int32)
+        self.avance = np.zeros(n, dtype=np.float64)
+        self.pasajeros = np.zeros(n, dtype=np.int32)
+        self.vueltas = np.zeros(n, dtype=np.int64)
+        # Rutas de una sola parada no tienen tramos que recorrer
+        self.activo = self.num_paradas[self.ruta] > 1 if n else np.zeros(0, dtype=bool)
+
+        if isinstance(semilla, np.random.Generator):
+            self.rng = semilla
+        else:
+            self.rng = np.random.default_rng(semilla)
+        self.demanda = demanda
+
+    def __len__(self):
+        return len(self.ruta)
+
+    def avanzar(self, dt):
+        """Avanza ``dt`` segundos simulados y devuelve los índices de los buses que llegaron a una parada"""
+        llegaron = np.zeros(len(self), dtype=bool)
+        if not len(self):
+            return np.flatnonzero(llegaron)
+
+        activos = np.flatnonzero(self.activo)
+        tramo = self.inicio_ruta[self.ruta[activos]] + self.parada[activos]
+        self.avance[activos] += dt / self.duracion_tramos[tramo]
+
+        # Un paso largo puede cruzar varias paradas: se repite solo sobre los que llegaron
+        pendientes = activos[self.avance[activos] >= 1.0]
+        while pendientes.size:
+            llegaron[pendientes] = True
+            tramo = self.inicio_ruta[self.ruta[pendientes]] + self.parada[pendientes]
+            sobrante = (self.avance[pendientes] - 1.0) * self.duracion_tramos[tramo]
+
+            siguiente = self.parada[pendientes] + 1
+            fin = siguiente >= self.num_paradas[self.ruta[pendientes]]
+            siguiente[fin] = 0
+            self.vueltas[pendientes[fin]] += 1
+            self.parada[pendientes] = siguiente
+
+            tramo = self.inicio_ruta[self.ruta[pendientes]] + siguiente
+            self.avance[pendientes] = sobrante / self.duracion_tramos[tramo]
+            pendientes = pendientes[self.avance[pendientes] >= 1.0]
+
+        # Suben y bajan pasajeros en las paradas alcanzadas
+        indices = np.flatnonzero(llegaron)
+        if indices.size:
+            if self.demanda is None:
+                self.pasajeros[indices] = self.rng.integers(0, self.capacidad[indices] + 1)
+            else:
+                self.pasajeros[indices] = self.rng.binomial(self.capacidad[indices], self.demanda)
+        return indices
+
+    @classmethod
+    def desde_buses(cls, buses, semilla=None, demanda=None):
+        """Construye el motor a partir de objetos Bus con ruta asignada.
+
+        Devuelve el motor y la lista de buses en el mismo orden que sus arreglos.
+        """
+        buses = [bus for bus in buses if bus.ruta_actual and bus.ruta_actual.paradas]
+        rutas, indice_rutas, rutas_buses = [], {}, []
+        for bus in buses:
+            clave = id(bus.ruta_actual)
+            if clave not in indice_rutas:
+                indice_rutas[clave] = len(rutas)
+                rutas.append(bus.ruta_actual)
+            rutas_buses.append(indice_rutas[clave])
+
+        duraciones = []
+        for ruta in rutas:
+            # tiempos_circuito devuelve minutos; una ruta de una parada no tiene tramos
+            duraciones.append([minutos * 60 for minutos in ruta.tiempos_circuito()]
+                              if len(ruta.paradas) > 1 else [])
+        motor = cls(duraciones, rutas_buses, [bus.capacidad for bus in buses], semilla, demanda)
+        for i, bus in enumerate(buses):
+            motor.parada[i] = bus.posicion_ruta % len(bus.ruta_actual.paradas)
+            motor.pasajeros[i] = bus.pasajeros
+        return motor, buses
+
+class RelojSimulacion:
+    """Reloj de paso fijo con multiplicador de velocidad y compensación de deriva.
+
+    El tiempo real transcurrido, escalado por ``multiplicador``, se acumula y
+    se entrega en pasos lógicos de ``paso`` segundos simulados; lo que sobra
+    queda en el acumulador para el ciclo siguiente, así el costo de cada paso
+    no desplaza el reloj. Si se acumulan más de ``max_pasos`` (p. ej. tras un
+    bloqueo largo) el exceso se descarta en lugar de recuperarse en los ciclos
+    siguientes. Con ``multiplicador=None`` los pasos se entregan sin esperar
+    (lo más rápido posible).
+    """
+
+    def __init__(self, paso, multiplicador=1.0, max_pasos=100, reloj=time.monotonic):
+        if paso <= 0:
+            raise ValueError("El paso del reloj debe ser positivo")
+        if multiplicador is not None and multiplicador <= 0:
+            raise ValueError("El multiplicador debe ser positivo o None")
+        self.paso = paso
+        self.multiplicador = multiplicador
+        self.max_pasos = max_pasos
+        self.ticks = 0
+        self._reloj = reloj
+        # Pausar y reanudar llegan desde el hilo de Tk mientras el simulador consume pasos
+        self._lock = threading.Lock()
+        self._acumulado = 0.0
+        self._ultimo = None
+        self._pausado = False
+
+    @property
+    def tiempo(self):
+        """Segundos simulados transcurridos"""
+        return self.ticks * self.paso
+
+    @property
+    def pausado(self):
+        return self._pausado
+
+    def iniciar(self):
+        with self._lock:
+            self._acumulado = 0.0
+            self._ultimo = self._reloj()
+
+    def _acumular(self):
+        # Llamar con self._lock tomado
+        ahora = self._reloj()
+        if not self._pausado and self._ultimo is not None:
+            self._acumulado += (ahora - self._ultimo) * self.multiplicador
+        self._ultimo = ahora
+
+    def pausar(self):
+        """Detiene el reloj conservando los pasos ya acumulados"""
+        with self._lock:
+            if not self._pausado and self.multiplicador is not None:
+                self._acumular()
+            self._pausado = True
+
+    def reanudar(self):
+        with self._lock:
+            # Sin pausa previa reiniciar _ultimo perdería el tiempo ya transcurrido
+            if not self._pausado:
+                return
+            self._ultimo = self._reloj()
+            self._pausado = False
+
+    def pasos_pendientes(self):
+        """Cantidad de pasos a simular ahora (a lo sumo ``max_pasos``) y los marca como consumidos"""
+        with self._lock:
+            if self._pausado:
+                return 0
+            if self.multiplicador is None:
+                pasos = self.max_pasos
+            else:
+                self._acumular()
+                disponibles = int(self._acumulado // self.paso)
+                pasos = min(disponibles, self.max_pasos)
+                # Los pasos que no caben en max_pasos se descartan; solo queda la fracción
+                self._acumulado -= disponibles * self.paso
+            self.ticks += pasos
+            return pasos
+
+    def espera(self):
+        """Segundos reales hasta que haya un nuevo paso disponible"""
+        if self.multiplicador is None:
+            return 0.0
+        with self._lock:
+            if self._pausado:
+                return self.paso / self.multiplicador
+            faltante = self.paso - self._acumulado
+        return max(faltante, 0.0) / self.multiplicador
+
+class ColaActualizaciones:
+    """Cola acotada de instantáneas entre el hilo del simulador y el de Tk.
+
+    El simulador publica una instantánea por ciclo (número de bus -> estado) y
+    la GUI la drena periódicamente con ``after()``. Al drenar, varias
+    actualizaciones pendientes de un mismo bus se reducen a la última. Si la
+    GUI se atrasa más de ``max_instantaneas``, las más antiguas se fusionan en
+    lugar de descartarse.
+    """
+
+    def __init__(self, max_instantaneas=64):
+        self._lock = threading.Lock()
+        self._instantaneas = deque()
+        self._max = max_instantaneas
+        self._fusionadas = {}
+
+    def publicar(self, estados):
+        if not estados:
+            return
+        with self._lock:
+            if len(self._instantaneas) >= self._max:
+                self._fusionadas.update(self._instantaneas.popleft())
+            self._instantaneas.append(estados)
+
+    def drenar(self):
+        """Devuelve el último estado pendiente de cada bus y vacía la cola"""
+        with self._lock:
+            instantaneas, self._instantaneas = self._instantaneas, deque()
+            estados, self._fusionadas = self._fusionadas, {}
+        for instantanea in instantaneas:
+            estados.update(instantanea)
+        return estados
 
 class Simulador:
-    def __init__(self):
+    def __init__(self, intervalo=None, multiplicador=-1):
         self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._reanudar = threading.Event()
         self._running = False
         self._thread = None
-    
-    def iniciar(self, buses, callback):
+        self.intervalo = intervalo or SIMULATOR_CONFIG['update_interval']
+        # -1: usar el multiplicador configurado; None: lo más rápido posible
+        self.multiplicador = SIMULATOR_CONFIG['speed_multiplier'] if multiplicador == -1 else multiplicador
+        self.motor = None
+        self.reloj = None
+        # Excepción que terminó el hilo de simulación, si la hubo
+        self.error = None
+
+    def iniciar(self, buses, callback=None, cola=None):
+        """Inicia la simulación en un hilo propio.
+
+        ``callback(bus)`` se invoca desde el hilo del simulador; para la GUI se
+        debe pasar una ``ColaActualizaciones`` en ``cola`` y drenarla desde el
+        hilo de Tk.
+        """
         with self._lock:
             if self._running:
                 return False
+            self.motor, buses = MotorFlota.desde_buses(buses)
+            self.reloj = RelojSimulacion(
+                self.intervalo,
+                self.multiplicador,
+                SIMULATOR_CONFIG.get('max_catch_up', 100)
+            )
             self._running = True
+            self.error = None
+            self._detener.clear()
             self._thread = threading.Thread(
                 target=self._simular,
-                args=(buses, callback),
+                args=(buses, callback, cola),
                 daemon=True
             )
             self._thread.start()
             return True
-    
+
     def detener(self):
         with self._lock:
             self._running = False
-            if self._thread:
-                self._thread.join()
-                self._thread = None
-    
-    def _simular(self, buses, callback):
-        while True:
-            with self._lock:
-                if not self._running:
-                    break
-            for bus in buses:
-                if bus.ruta:
-                    bus.pasajeros = random.randint(0, bus.capacidad)
-                    bus.mover_siguiente_parada()
-                    callback(bus)
-            time.sleep(2)
\ No newline at end of file
+            self._detener.set()
+            self._reanudar.set()
+            thread, self._thread = self._thread, None
+        if thread:
+            thread.join()
+
+    def pausar(self):
+        # El evento se limpia antes de marcar la pausa: el hilo que vea el reloj
+        # pausado siempre encuentra el evento limpio y espera
+        with self._lock:
+            if self._running and self.reloj:
+                self._reanudar.clear()
+                self.reloj.pausar()
+
+    def reanudar(self):
+        with self._lock:
+            if self._running and self.reloj:
+                self.reloj.reanudar()
+                self._reanudar.set()
+
+    def ejecutar(self, buses, duracion, callback=None):
+        """Simula ``duracion`` segundos de servicio sin esperar, en el hilo actual.
+
+        Útil para corridas por lotes (por ejemplo, un día completo de servicio).
+        Devuelve el motor con el estado final de la flota.
+        """
+        motor, buses = MotorFlota.desde_buses(buses)
+        for _ in range(int(duracion // self.intervalo)):
+            llegaron = motor.avanzar(self.intervalo)
+            if callback is not None:
+                self._sincronizar(motor, buses, llegaron, callback)
+        return motor
+
+    def _simular(self, buses, callback, cola):
+        motor, reloj = self.motor, self.reloj
+        reloj.iniciar()
+        try:
+            while not self._detener.is_set():
+                if reloj.pausado:
+                    self._reanudar.wait()
+                    continue
+                llegaron = set()
+                for _ in range(reloj.pasos_pendientes()):
+                    llegaron.update(motor.avanzar(reloj.paso).tolist())
+                llegaron = sorted(llegaron)
+                if cola is not None:
+                    cola.publicar(self._instantanea(motor, buses, llegaron, reloj.tiempo))
+                if callback is not None:
+                    self._sincronizar(motor, buses, llegaron, callback)
+                self._detener.wait(max(reloj.espera(), ESPERA_MINIMA))
+        except Exception as e:
+            # Quien inicia la simulación lo consulta en ``error`` y la detiene
+            print(f"Error en la simulación: {e}")
+            self.error = e
+
+    @staticmethod
+    def _instantanea(motor, buses, llegaron, tiempo):
+        estados = {}
+        for i in llegaron:
+            bus = buses[i]
+            parada = int(motor.parada[i])
+            estados[bus.numero] = {
+                'numero': bus.numero,
+                'ruta': bus.ruta_actual.nombre,
+                'parada': parada,
+                'nombre_parada': str(bus.ruta_actual.paradas[parada]),
+                'posicion': getattr(bus.ruta_actual.paradas[parada], 'posicion', None),
+                'pasajeros': int(motor.pasajeros[i]),
+                'capacidad': int(motor.capacidad[i]),
+                'tiempo': tiempo
+            }
+        return estados
+
+    @staticmethod
+    def _sincronizar(motor, buses, llegaron, callback):
+        # Solo se sincronizan con sus objetos Bus los que cambiaron de parada
+        for i in llegaron:
+            bus = buses[i]
+            bus.posicion_ruta = int(motor.parada[i])
+            bus.pasajeros = int(motor.pasajeros[i])
+            parada = bus.ruta_actual.paradas[bus.posicion_ruta]
+            if hasattr(parada, 'posicion'):
+                bus.posicion = parada.posicion
+            callback(bus)
@@ -0,0 +1,242 @@
+"""Caché local de teselas del mapa en un archivo MBTiles (SQLite).
+
+El servidor local del mapa (services/mapa_vivo.py) entrega las teselas
+desde aquí; si una falta y hay conexión, se descarga de TILE_CONFIG['url'] y
+se guarda. El archivo tiene un tamaño máximo y, al superarlo, se borran las
+teselas usadas hace más tiempo. Para trabajar sin conexión se precarga la
+zona con:
+
+    python -m services.teselas --zoom 10-16
+"""
+import argparse
+import math
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from config import TILE_CONFIG
+
+USER_AGENT = "BuScanGo/3.0 (cache local de teselas)"
+# Accesos registrados en memoria antes de escribirlos en la tabla uso
+USOS_PENDIENTES_MAX = 256
+
+def tesela_de(lat, lon, zoom):
+    """Columna y fila (esquema XYZ) de la tesela que contiene (lat, lon)"""
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def teselas_bbox(bbox, zooms):
+    """Teselas (z, x, y) que cubren bbox = (lat_min, lon_min, lat_max, lon_max)"""
+    lat_min, lon_min, lat_max, lon_max = bbox
+    for z in zooms:
+        x1, y1 = tesela_de(lat_max, lon_min, z)
+        x2, y2 = tesela_de(lat_min, lon_max, z)
+        for x in range(x1, x2 + 1):
+            for y in range(y1, y2 + 1):
+                yield z, x, y
+
+def descargar(z, x, y, url=TILE_CONFIG['url'], timeout=TILE_CONFIG['timeout']):
+    """Descarga una tesela; lanza IOError si no se pudo"""
+    pedido = urllib.request.Request(url.format(z=z, x=x, y=y), headers={'User-Agent': USER_AGENT})
+    try:
+        with urllib.request.urlopen(pedido, timeout=timeout) as respuesta:
+            return respuesta.read()
+    except (urllib.error.URLError, OSError) as e:
+        raise IOError(f"No se pudo descargar la tesela {z}/{x}/{y}: {e}")
+
+class AlmacenTeselas:
+    """Teselas en formato MBTiles con expulsión de las menos usadas (segura entre hilos)"""
+
+    def __init__(self, archivo=TILE_CONFIG['archivo'], max_bytes=TILE_CONFIG['max_bytes'],
+                 url=TILE_CONFIG['url']):
+        # Ruta relativa a la raíz del proyecto, como data.json, y no al directorio de trabajo
+        if not os.path.isabs(archivo):
+            archivo = Path(__file__).parent.parent / archivo
+        self.archivo = archivo
+        self.max_bytes = max_bytes
+        self.url = url
+        self._lock = threading.Lock()
+        self._usos = {}
+        self._sin_conexion_hasta = 0
+        self._conn = sqlite3.connect(archivo, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._crear_tablas()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM uso").fetchone()[0]
+
+    def _crear_tablas(self):
+        # metadata y tiles siguen la especificación MBTiles (filas en esquema TMS);
+        # uso es propia y guarda el último acceso de cada tesela
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS tiles (
+                zoom_level INTEGER,
+                tile_column INTEGER,
+                tile_row INTEGER,
+                tile_data BLOB,
+                PRIMARY KEY (zoom_level, tile_column, tile_row)
+            );
+            CREATE TABLE IF NOT EXISTS uso (
+                zoom_level INTEGER,
+                tile_column INTEGER,
+                tile_row INTEGER,
+                ultimo_uso REAL,
+                bytes INTEGER,
+                PRIMARY KEY (zoom_level, tile_column, tile_row)
+            );
+            CREATE INDEX IF NOT EXISTS idx_uso_ultimo ON uso(ultimo_uso);
+            """)
+        self._conn.executemany("INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)",
+                               [('name', 'BuScanGo'), ('format', 'png'), ('type', 'baselayer')])
+        self._conn.commit()
+
+    @staticmethod
+    def _clave(z, x, y):
+        return (z, x, 2 ** z - 1 - y)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+
+    @property
+    def tamano(self):
+        """Bytes de teselas guardadas"""
+        return self._bytes
+
+    def tiene(self, z, x, y):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                self._clave(z, x, y)).fetchone() is not None
+
+    def obtener(self, z, x, y):
+        """Contenido de la tesela o None si no está guardada"""
+        clave = self._clave(z, x, y)
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                clave).fetchone()
+            if fila is None:
+                return None
+            self._usos[clave] = time.time()
+            if len(self._usos) >= USOS_PENDIENTES_MAX:
+                self._volcar_usos()
+                self._conn.commit()
+            return fila[0]
+
+    def guardar(self, z, x, y, datos):
+        clave = self._clave(z, x, y)
+        with self._lock:
+            anterior = self._conn.execute(
+                "SELECT bytes FROM uso WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                clave).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", (*clave, datos))
+            self._conn.execute("INSERT OR REPLACE INTO uso VALUES (?, ?, ?, ?, ?)",
+                               (*clave, time.time(), len(datos)))
+            self._usos.pop(clave, None)
+            self._bytes += len(datos) - (anterior[0] if anterior else 0)
+            if self._bytes > self.max_bytes:
+                self._expulsar()
+            self._conn.commit()
+
+    def obtener_o_descargar(self, z, x, y):
+        """Tesela guardada, o descargada y guardada; None si no hay conexión"""
+        datos = self.obtener(z, x, y)
+        if datos is not None:
+            return datos
+        with self._lock:
+            if time.time() < self._sin_conexion_hasta:
+                return None
+        try:
+            datos = descargar(z, x, y, self.url)
+        except IOError as e:
+            with self._lock:
+                # No reintentar cada tesela mientras no haya conexión, y avisar una vez por período
+                if time.time() >= self._sin_conexion_hasta:
+                    print(f"Mapa sin conexión, se reintenta en {TILE_CONFIG['reintento']} s: {e}")
+                self._sin_conexion_hasta = time.time() + TILE_CONFIG['reintento']
+            return None
+        self.guardar(z, x, y, datos)
+        return datos
+
+    def _volcar_usos(self):
+        self._conn.executemany(
+            "UPDATE uso SET ultimo_uso = ? WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            [(momento, *clave) for clave, momento in self._usos.items()])
+        self._usos.clear()
+
+    def _expulsar(self):
+        """Borra las teselas menos usadas hasta quedar en el 90% de max_bytes"""
+        self._volcar_usos()
+        objetivo = self.max_bytes * 0.9
+        filas = self._conn.execute(
+            "SELECT zoom_level, tile_column, tile_row, bytes FROM uso ORDER BY ultimo_uso")
+        borrar = []
+        for z, x, fila, tamano in filas:
+            if self._bytes <= objetivo:
+                break
+            borrar.append((z, x, fila))
+            self._bytes -= tamano
+        filas.close()
+        for tabla in ('tiles', 'uso'):
+            self._conn.executemany(
+                f"DELETE FROM {tabla} WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", borrar)
+
+    def cerrar(self):
+        with self._lock:
+            self._volcar_usos()
+            self._conn.commit()
+            self._conn.close()
+
+def precargar(almacen, bbox=TILE_CONFIG['bbox'], zooms=range(TILE_CONFIG['zoom'][0], TILE_CONFIG['zoom'][1] + 1),
+              hilos=2):
+    """Descarga las teselas de bbox que faltan; devuelve (descargadas, fallidas)"""
+    faltantes = [t for t in teselas_bbox(bbox, zooms) if not almacen.tiene(*t)]
+    descargadas = fallidas = 0
+    # Pocos hilos: los servidores públicos de teselas limitan las descargas masivas
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        futuros = {ejecutor.submit(descargar, *t, almacen.url): t for t in faltantes}
+        for futuro, tesela in futuros.items():
+            try:
+                almacen.guardar(*tesela, futuro.result())
+                descargadas += 1
+            except IOError as e:
+                print(f"Precarga incompleta, se omite una tesela: {e}")
+                fallidas += 1
+    return descargadas, fallidas
+
+def main():
+    parser = argparse.ArgumentParser(description="Precarga las teselas del mapa para usarlo sin conexión")
+    parser.add_argument("--archivo", default=TILE_CONFIG['archivo'], help="archivo MBTiles")
+    parser.add_argument("--zoom", default="%d-%d" % TILE_CONFIG['zoom'], help="niveles de zoom, p. ej. 10-16")
+    parser.add_argument("--bbox", default=",".join(str(v) for v in TILE_CONFIG['bbox']),
+                        help="lat_min,lon_min,lat_max,lon_max")
+    parser.add_argument("--hilos", type=int, default=2, help="descargas en paralelo")
+    args = parser.parse_args()
+
+    desde, _, hasta = args.zoom.partition("-")
+    zooms = range(int(desde), int(hasta or desde) + 1)
+    bbox = tuple(float(v) for v in args.bbox.split(","))
+    if len(bbox) != 4:
+        raise ValueError(f"bbox inválido: {args.bbox}")
+
+    almacen = AlmacenTeselas(args.archivo)
+    try:
+        total = sum(1 for _ in teselas_bbox(bbox, zooms))
+        print(f"{total} teselas en la zona (zoom {zooms.start}-{zooms.stop - 1})")
+        descargadas, fallidas = precargar(almacen, bbox, zooms, args.hilos)
+        print(f"{descargadas} descargadas, {fallidas} fallidas, "
+              f"{len(almacen)} en {args.archivo} ({almacen.tamano / 1e6:.1f} MB)")
+    finally:
+        almacen.cerrar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+import unittest
+
+from services.almacenamiento import AlmacenJSON
+from services.data_manager import DataManager
+
+class TestDiarioCortado(unittest.TestCase):
+    """Un corte a mitad de una línea del diario no debe hacer perder las entradas siguientes"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.archivo = os.path.join(self.dir.name, 'data.json')
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            json.dump({'rutas': {}, 'buses': {}, 'paradas': {}}, f)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _abrir(self):
+        # compactar_cada alto: todo queda en el diario
+        return DataManager(self.archivo, compactar_cada=1000, fsync_diario=False)
+
+    def _bus(self, numero):
+        return {'numero': numero, 'capacidad': 40, 'estado': 'AVAILABLE'}
+
+    def test_entradas_despues_de_un_corte(self):
+        dm = self._abrir()
+        dm.guardar_bus('A1', self._bus('A1'))
+        diario = dm.almacen.diario
+        dm.almacen._diario_f.close()
+        # El proceso murió escribiendo una entrada
+        with open(diario, 'a', encoding='utf-8') as f:
+            f.write('{"op": "set", "col": "buses", "cla')
+
+        dm = self._abrir()
+        self.assertIn('A1', dm.cargar_datos()['buses'])
+        dm.guardar_bus('A2', self._bus('A2'))
+        dm.guardar_bus('A3', self._bus('A3'))
+        dm.almacen._diario_f.close()
+
+        buses = self._abrir().cargar_datos()['buses']
+        self.assertEqual(sorted(buses), ['A1', 'A2', 'A3'])
+
+    def test_linea_sin_salto_se_descarta(self):
+        almacen = AlmacenJSON(self.archivo, compactar_cada=1000, fsync_diario=False)
+        with open(almacen.diario, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'op': 'set', 'col': 'buses', 'clave': 'B1', 'valor': self._bus('B1')}) + '\n')
+            f.write(json.dumps({'op': 'set', 'col': 'buses', 'clave': 'B2', 'valor': self._bus('B2')}))
+        datos = almacen.cargar()
+        self.assertEqual(sorted(datos['buses']), ['B1'])
+        with open(almacen.diario, 'rb') as f:
+            self.assertTrue(f.read().endswith(b'\n'))
+
+if __name__ == '__main__':
+    unittest.main()
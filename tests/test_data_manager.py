@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from services.data_manager import DataManager
+
+class TestAvisos(unittest.TestCase):
+    """Los suscriptores se llaman con el lock del modelo ya suelto"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.archivo = os.path.join(self.dir.name, 'data.json')
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            json.dump({'rutas': {}, 'buses': {}, 'paradas': {}}, f)
+        self.dm = DataManager(self.archivo, compactar_cada=1000, fsync_diario=False)
+
+    def tearDown(self):
+        self.dm.cerrar()
+        self.dir.cleanup()
+
+    def test_suscriptor_con_lock_propio(self):
+        # Un suscriptor que toma su lock, como el planificador, mientras otro hilo
+        # tiene ese lock y consulta el modelo
+        lock = threading.Lock()
+        terminados = []
+
+        def consultar():
+            with lock:
+                self.dm.cargar_datos()
+
+        def al_cambiar(entrada):
+            hilo = threading.Thread(target=consultar)
+            hilo.start()
+            # Con el lock del modelo tomado aquí, el otro hilo no podría terminar
+            hilo.join(timeout=2)
+            terminados.append(not hilo.is_alive())
+
+        self.dm.suscribir(al_cambiar)
+        self.dm.guardar_bus('A1', {'numero': 'A1', 'capacidad': 40, 'estado': 'AVAILABLE'})
+        self.assertTrue(terminados)
+        self.assertTrue(all(terminados))
+
+    def test_avisos_anidados_se_entregan_una_vez(self):
+        avisos = []
+        self.dm.suscribir(avisos.append)
+        self.dm.guardar_bus('A1', {'numero': 'A1', 'capacidad': 40, 'estado': 'AVAILABLE'})
+        self.dm.actualizar_posicion_bus('A1', -29.9, -71.2)
+        self.assertEqual([(e['op'], e['col']) for e in avisos if e is not None],
+                         [('set', 'buses'), ('campo', 'buses')])
+
+class TestPaginas(unittest.TestCase):
+    """La lista de claves por página se conserva mientras no cambien las claves"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.archivo = os.path.join(self.dir.name, 'data.json')
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            json.dump({'rutas': {}, 'buses': {}, 'paradas': {}}, f)
+        self.dm = DataManager(self.archivo, compactar_cada=1000, fsync_diario=False)
+        for numero in ('A1', 'A2'):
+            self.dm.guardar_bus(numero, {'numero': numero, 'capacidad': 40, 'estado': 'AVAILABLE'})
+
+    def tearDown(self):
+        self.dm.cerrar()
+        self.dir.cleanup()
+
+    def test_editar_conserva_claves(self):
+        self.dm.pagina('buses', 0, 10)
+        claves = self.dm._claves['buses']
+        self.dm.guardar_bus('A1', {'numero': 'A1', 'capacidad': 50, 'estado': 'AVAILABLE'})
+        self.assertIs(self.dm._claves.get('buses'), claves)
+        self.assertEqual(self.dm.pagina('buses', 0, 10)[0][1]['capacidad'], 50)
+
+    def test_agregar_y_quitar_descartan_claves(self):
+        self.dm.pagina('buses', 0, 10)
+        self.dm.guardar_bus('A3', {'numero': 'A3', 'capacidad': 40, 'estado': 'AVAILABLE'})
+        self.assertEqual([clave for clave, _ in self.dm.pagina('buses', 0, 10)], ['A1', 'A2', 'A3'])
+        self.dm.eliminar_bus('A2')
+        self.assertEqual([clave for clave, _ in self.dm.pagina('buses', 0, 10)], ['A1', 'A3'])
+
+class TestMigracion(unittest.TestCase):
+    """Las rutas con nombres de parada se migran en memoria y se guardan con el primer cambio"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.archivo = os.path.join(self.dir.name, 'data.json')
+        self.original = json.dumps({'rutas': {'R': {'nombre': 'R', 'paradas': ['Plaza', 'Puerto']}},
+                                    'buses': {}, 'paradas': {}})
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            f.write(self.original)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_leer_no_escribe(self):
+        dm = DataManager(self.archivo, compactar_cada=1000, fsync_diario=False)
+        self.assertEqual(dm.cargar_datos()['rutas']['R']['paradas'], [1, 2])
+        dm.cerrar()
+        with open(self.archivo, encoding='utf-8') as f:
+            self.assertEqual(f.read(), self.original)
+
+    def test_primer_cambio_guarda_la_migracion(self):
+        dm = DataManager(self.archivo, compactar_cada=1000, fsync_diario=False)
+        dm.guardar_ruta('S', {'nombre': 'S', 'paradas': ['Plaza']})
+        dm.cerrar()
+        datos = DataManager(self.archivo).cargar_datos()
+        self.assertEqual(datos['rutas']['R']['paradas'], [1, 2])
+        self.assertEqual(datos['rutas']['S']['paradas'], [1])
+        self.assertEqual(datos['paradas']['1']['nombre'], 'Plaza')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from database import AlmacenSQLite, DatabaseError, DatabaseManager
+from database.db_manager import ConnectionPool
+from services.data_manager import DataManager
+
+def _datos():
+    return {
+        'paradas': {'1': {'nombre': 'Plaza', 'posicion': [-29.90, -71.25]},
+                    '2': {'nombre': 'Puerto', 'posicion': [-29.95, -71.34]},
+                    '3': {'nombre': 'Faro', 'posicion': None}},
+        'buses': {'101': {'numero': '101', 'capacidad': 40, 'estado': 'AVAILABLE', 'ruta': 'Centro',
+                          'posicion': [-29.90, -71.25], 'pasajeros': 3},
+                  '102': {'numero': '102', 'capacidad': 60, 'estado': 'MAINTENANCE', 'ruta': None,
+                          'posicion': None, 'pasajeros': 0}},
+        'rutas': {'Centro': {'nombre': 'Centro', 'paradas': [1, 2]},
+                  'Costa': {'nombre': 'Costa', 'paradas': [2, 3, 1]}},
+        'flota': {'Urbano': {'cantidad': 2, 'capacidad': 40, 'ruta': 'Centro'}},
+    }
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.dir.name, 'pool.db'), max_connections=1, timeout=0.2)
+
+    def tearDown(self):
+        self.pool.cerrar()
+        self.dir.cleanup()
+
+    def test_anidadas_reutilizan_la_conexion(self):
+        conn = self.pool.adquirir()
+        self.assertIs(self.pool.adquirir(), conn)
+        self.pool.liberar(conn)
+        self.pool.liberar(conn)
+        # Liberada del todo, vuelve al pool y se entrega otra vez
+        otra = self.pool.adquirir()
+        self.assertIs(otra, conn)
+        self.pool.liberar(otra)
+
+    def test_limite_de_conexiones(self):
+        conn = self.pool.adquirir()
+        errores = []
+
+        def tomar():
+            try:
+                self.pool.liberar(self.pool.adquirir())
+            except DatabaseError as e:
+                errores.append(e)
+
+        hilo = threading.Thread(target=tomar)
+        hilo.start()
+        hilo.join()
+        self.assertEqual(len(errores), 1)
+        self.pool.liberar(conn)
+        hilo = threading.Thread(target=tomar)
+        hilo.start()
+        hilo.join()
+        self.assertEqual(len(errores), 1)
+
+    def test_descarta_lo_no_confirmado(self):
+        conn = self.pool.adquirir()
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+        self.pool.liberar(conn)
+        conn = self.pool.adquirir()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+        self.assertEqual(conn.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+        self.pool.liberar(conn)
+
+class TestDatabaseManager(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.dir.name, 'buses.db'))
+
+    def tearDown(self):
+        self.db.cerrar()
+        self.dir.cleanup()
+
+    def test_bulk_update_positions(self):
+        with self.db.get_connection() as conn:
+            conn.executemany("INSERT INTO buses (numero) VALUES (?)", [('1',), ('2',)])
+            conn.commit()
+        posiciones = [('1', -29.90 - i / 1000, -71.25, 1000.0 + i) for i in range(25)]
+        posiciones += [('2', -29.95, -71.34, 500.0), ('2', -29.96, -71.35, 400.0)]
+        self.assertEqual(self.db.bulk_update_positions(iter(posiciones), batch_size=10), 27)
+
+        historial = self.db.historial_posiciones('1')
+        self.assertEqual(len(historial), 25)
+        self.assertEqual([t for _, _, t in historial], sorted(t for _, _, t in historial))
+        self.assertEqual(len(self.db.historial_posiciones('1', desde=1010, hasta=1014)), 5)
+        with self.db.get_connection() as conn:
+            ultimas = dict(conn.execute("SELECT numero, ultima_ubicacion FROM buses"))
+        self.assertEqual(json.loads(ultimas['1']), [-29.924, -71.25])
+        # La más reciente por timestamp, no la última del lote
+        self.assertEqual(json.loads(ultimas['2']), [-29.95, -71.34])
+
+    def test_error_de_sqlite(self):
+        with self.assertRaises(DatabaseError):
+            with self.db.get_connection() as conn:
+                conn.execute("SELECT * FROM tabla_inexistente")
+
+class TestAlmacenSQLite(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.dir.name, 'buses.db'))
+        self.almacen = AlmacenSQLite(self.db)
+
+    def tearDown(self):
+        self.db.cerrar()
+        self.dir.cleanup()
+
+    def _escrituras(self, accion):
+        """Sentencias que modifican filas durante ``accion``"""
+        sentencias = []
+        with self.db.get_connection() as conn:
+            conn.set_trace_callback(sentencias.append)
+            try:
+                accion()
+            finally:
+                conn.set_trace_callback(None)
+        return [s for s in sentencias if s.lstrip().split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+
+    def test_ida_y_vuelta(self):
+        datos = _datos()
+        self.almacen.guardar(datos)
+        self.assertEqual(self.almacen.cargar(), datos)
+        self.assertEqual(self.almacen.buscar_bus('101')['posicion'], [-29.90, -71.25])
+        self.assertIsNone(self.almacen.buscar_bus('999'))
+
+    def test_guardar_solo_escribe_lo_que_cambio(self):
+        datos = _datos()
+        self.almacen.guardar(datos)
+        self.assertEqual(self._escrituras(lambda: self.almacen.guardar(datos)), [])
+
+        datos['buses']['101']['pasajeros'] = 10
+        del datos['buses']['102']
+        escrituras = self._escrituras(lambda: self.almacen.guardar(datos))
+        self.assertEqual(len(escrituras), 2)
+        self.assertEqual(self.almacen.cargar(), datos)
+
+    def test_guardar_quita_rutas_antes_que_sus_paradas(self):
+        datos = _datos()
+        self.almacen.guardar(datos)
+        del datos['rutas']['Costa']
+        del datos['paradas']['3']
+        self.almacen.guardar(datos)
+        self.assertEqual(self.almacen.cargar(), datos)
+        with self.db.get_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM ruta_paradas").fetchone()[0], 2)
+
+    def test_registrar(self):
+        self.almacen.guardar(_datos())
+        self.almacen.registrar([
+            {'op': 'campo', 'col': 'buses', 'clave': '101', 'campo': 'posicion', 'valor': [-29.91, -71.26]},
+            {'op': 'campo', 'col': 'paradas', 'clave': '3', 'campo': 'nombre', 'valor': 'Faro Monumental'},
+            {'op': 'set', 'col': 'rutas', 'clave': 'Centro', 'valor': {'nombre': 'Centro', 'paradas': [2, 1, 3]}},
+            {'op': 'del', 'col': 'rutas', 'clave': 'Costa'},
+            {'op': 'del', 'col': 'flota', 'clave': 'Urbano'},
+        ], None)
+        datos = self.almacen.cargar()
+        self.assertEqual(datos['buses']['101']['posicion'], [-29.91, -71.26])
+        self.assertEqual(datos['paradas']['3']['nombre'], 'Faro Monumental')
+        self.assertEqual(datos['rutas'], {'Centro': {'nombre': 'Centro', 'paradas': [2, 1, 3]}})
+        self.assertEqual(datos['flota'], {})
+        # ON DELETE CASCADE quitó las paradas de la ruta eliminada
+        with self.db.get_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM ruta_paradas").fetchone()[0], 3)
+        with self.assertRaises(DatabaseError):
+            self.almacen.registrar([{'op': 'set', 'col': 'otra', 'clave': 'x', 'valor': {}}], None)
+
+    def test_paradas_en_uso_no_se_borran(self):
+        self.almacen.guardar(_datos())
+        with self.assertRaises(DatabaseError):
+            self.almacen.registrar([{'op': 'del', 'col': 'paradas', 'clave': '1'}], None)
+        self.assertIn('1', self.almacen.cargar()['paradas'])
+
+    def test_data_manager_sobre_sqlite(self):
+        self.almacen.guardar(_datos())
+        dm = DataManager(almacen=self.almacen)
+        dm.guardar_bus('103', {'numero': '103', 'capacidad': 30, 'estado': 'AVAILABLE', 'ruta': 'Costa',
+                               'posicion': None, 'pasajeros': 0})
+        dm.guardar_ruta('Norte', {'nombre': 'Norte', 'paradas': ['Plaza', 'Estadio']})
+        dm.cerrar()
+        datos = AlmacenSQLite(self.db).cargar()
+        self.assertEqual(datos['buses']['103']['ruta'], 'Costa')
+        self.assertEqual([datos['paradas'][str(p)]['nombre'] for p in datos['rutas']['Norte']['paradas']],
+                         ['Plaza', 'Estadio'])
+
+    def test_importar_json(self):
+        archivo = os.path.join(self.dir.name, 'data.json')
+        with open(archivo, 'w', encoding='utf-8') as f:
+            json.dump({'rutas': {'R': {'nombre': 'R', 'paradas': ['Plaza', 'Puerto']}},
+                       'buses': {'1': {'numero': '1', 'capacidad': 40, 'estado': 'AVAILABLE'}},
+                       'paradas': {}}, f)
+        totales = self.almacen.importar_json(archivo)
+        self.assertEqual(totales, {'buses': 1, 'paradas': 2, 'rutas': 1, 'flota': 0})
+        datos = self.almacen.cargar()
+        self.assertEqual([datos['paradas'][str(p)]['nombre'] for p in datos['rutas']['R']['paradas']],
+                         ['Plaza', 'Puerto'])
+
+class TestEsquemaAnterior(unittest.TestCase):
+    """Una base de la versión inicial, con nombres repetidos, se abre y se migra"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.archivo = os.path.join(self.dir.name, 'buses.db')
+        conn = sqlite3.connect(self.archivo)
+        conn.executescript("""
+            CREATE TABLE buses (id INTEGER PRIMARY KEY AUTOINCREMENT, numero TEXT NOT NULL,
+                                estado TEXT DEFAULT 'DETENIDO', ultima_ubicacion TEXT);
+            CREATE TABLE paradas (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL,
+                                  ubicacion TEXT NOT NULL);
+            INSERT INTO buses (numero, estado) VALUES ('1', 'viejo'), ('1', 'nuevo'), ('2', 'DETENIDO');
+            INSERT INTO paradas (nombre, ubicacion) VALUES ('Plaza', ''), ('Plaza', '');
+            """)
+        conn.close()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_migrar(self):
+        db = DatabaseManager(self.archivo)
+        try:
+            datos = AlmacenSQLite(db).cargar()
+            self.assertEqual(set(datos['buses']), {'1', '2'})
+            self.assertEqual(datos['buses']['1']['estado'], 'nuevo')
+            self.assertEqual(len(datos['paradas']), 2)
+            # Abrirla otra vez no vuelve a tocar el esquema
+            DatabaseManager(self.archivo).cerrar()
+        finally:
+            db.cerrar()
+
+    def test_indice_unico_de_nombres_anterior(self):
+        conn = sqlite3.connect(self.archivo)
+        conn.execute("DELETE FROM paradas WHERE id = 2")
+        conn.execute("CREATE UNIQUE INDEX idx_paradas_nombre ON paradas(nombre)")
+        conn.commit()
+        conn.close()
+        db = DatabaseManager(self.archivo)
+        try:
+            with db.get_connection() as conn:
+                indices = {nombre: unico for _, nombre, unico, *_ in conn.execute("PRAGMA index_list(paradas)")}
+                conn.execute("INSERT INTO paradas (nombre, ubicacion) VALUES ('Plaza', '')")
+                conn.commit()
+            self.assertEqual(indices['idx_paradas_nombre'], 0)
+        finally:
+            db.cerrar()
+
+if __name__ == '__main__':
+    unittest.main()
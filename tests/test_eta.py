@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from models import Bus, Parada, Ruta
+from services.eta import EstimadorETA
+
+POSICIONES = [(-29.90, -71.25), (-29.91, -71.25), (-29.91, -71.2385), (-29.90, -71.2385)]
+# Un lunes a las 08:30 y a las 15:10, en la hora local
+MANANA = datetime(2024, 3, 4, 8, 30)
+TARDE = datetime(2024, 3, 4, 15, 10)
+
+class TestEstimadorETA(unittest.TestCase):
+
+    def setUp(self):
+        self.paradas = [Parada(i + 1, f"P{i + 1}", pos) for i, pos in enumerate(POSICIONES)]
+        self.ruta = Ruta('R', list(self.paradas))
+        self.estimador = EstimadorETA([self.ruta])
+
+    def _bus(self, numero, posicion_ruta):
+        bus = Bus(numero)
+        bus.ruta_actual = self.ruta
+        bus.posicion_ruta = posicion_ruta
+        bus.posicion = POSICIONES[posicion_ruta]
+        return bus
+
+    def test_sin_observaciones_usa_la_geometria(self):
+        segundos = np.array(self.ruta.tiempos_circuito()) * 60
+        tabla = self.estimador.tabla('R')
+        np.testing.assert_allclose(tabla[0], np.concatenate([[0], np.cumsum(segundos)]))
+        self.assertAlmostEqual(self.estimador.eta(self._bus('1', 0), self.paradas[2], MANANA),
+                               self.ruta.tiempo_hasta_parada(2))
+
+    def test_mediana_por_franja(self):
+        for segundos in (100, 300, 200):
+            self.estimador.registrar_tramo('R', 0, segundos, MANANA)
+        self.estimador.registrar_tramo('R', 0, 600, TARDE)
+        tabla = self.estimador.tabla('R')
+        self.assertEqual(tabla[self.estimador.franja(MANANA), 1], 200)
+        self.assertEqual(tabla[self.estimador.franja(TARDE), 1], 600)
+        # Las franjas sin observaciones usan la mediana de todas las del tramo
+        self.assertEqual(tabla[self.estimador.franja(datetime(2024, 3, 4, 3, 0)), 1], 250)
+
+    def test_paradas_pasadas_en_la_vuelta_siguiente(self):
+        for tramo in range(4):
+            self.estimador.registrar_tramo('R', tramo, 60 * (tramo + 1), MANANA)
+        bus = self._bus('1', 2)
+        self.assertAlmostEqual(self.estimador.eta(bus, self.paradas[3], MANANA), 3)
+        # De P3 a P2 se da la vuelta: tramos 2, 3 y 0 = 3 + 4 + 1 minutos
+        self.assertAlmostEqual(self.estimador.eta(bus, self.paradas[1], MANANA), 8)
+        self.assertAlmostEqual(self.estimador.eta(bus, self.paradas[2], MANANA), 0)
+        self.assertIsNone(self.estimador.eta(bus, Parada(99, 'Otra'), MANANA))
+
+    def test_etas_de_la_flota(self):
+        buses = [self._bus('1', 0), self._bus('2', 2)]
+        numeros, matriz = self.estimador.etas_ruta('R', buses, MANANA)
+        self.assertEqual(numeros, ['1', '2'])
+        self.assertEqual(matriz.shape, (2, 4))
+        for i, bus in enumerate(buses):
+            for j, parada in enumerate(self.paradas):
+                self.assertAlmostEqual(matriz[i, j], self.estimador.eta(bus, parada, MANANA))
+        llegadas = self.estimador.etas_parada(3, buses, MANANA)
+        self.assertEqual([numero for _, numero, _ in llegadas], ['2', '1'])
+        self.assertEqual(set(self.estimador.etas_flota(buses, MANANA)), {'R'})
+
+    def test_registrar_posiciones(self):
+        t = MANANA.timestamp()
+        posiciones = [(*POSICIONES[0], t), (*POSICIONES[0], t + 30), (-29.905, -71.25, t + 60),
+                      (*POSICIONES[1], t + 120), (*POSICIONES[2], t + 300), (*POSICIONES[0], t + 400)]
+        # 0 -> 1 desde la llegada a la parada 0 y 1 -> 2; 2 -> 0 no es consecutivo
+        self.assertEqual(self.estimador.registrar_posiciones('R', posiciones), 2)
+        tabla = self.estimador.tabla('R')[self.estimador.franja(MANANA)]
+        self.assertEqual(tabla[1], 120)
+        self.assertEqual(tabla[2] - tabla[1], 180)
+
+    def test_cambiar_paradas_remapea_las_observaciones(self):
+        self.estimador.registrar_tramo('R', 1, 111, MANANA)  # P2 -> P3
+        self.estimador.registrar_tramo('R', 3, 333, MANANA)  # P4 -> P1
+        # Se quita la primera parada: P2 -> P3 pasa a ser el tramo 0 y P4 -> P1 ya no existe
+        self.estimador.agregar_ruta(Ruta('R', self.paradas[1:]))
+        fila = self.estimador.tabla('R')[self.estimador.franja(MANANA)]
+        self.assertEqual(fila[1], 111)
+        geometrico = Ruta('R', self.paradas[1:]).tiempos_circuito()[2] * 60
+        self.assertAlmostEqual(fila[3] - fila[2], geometrico)
+
+    def test_reemplazar_ruta_sin_cambios_conserva_las_observaciones(self):
+        self.estimador.registrar_tramo('R', 0, 77, MANANA)
+        self.estimador.agregar_ruta(Ruta('R', list(self.paradas)))
+        self.assertEqual(self.estimador.tabla('R')[self.estimador.franja(MANANA), 1], 77)
+
+if __name__ == '__main__':
+    unittest.main()
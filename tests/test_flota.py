@@ -0,0 +1,72 @@
+import unittest
+
+from models import Bus, BusVista, FleetArray, Parada, Ruta
+from utils.constants import BUS_STATES
+
+class TestFleetArray(unittest.TestCase):
+
+    def setUp(self):
+        self.ruta = Ruta('Centro', [Parada(1, 'Plaza', (-29.90, -71.25)), Parada(2, 'Puerto', (-29.95, -71.34))])
+        self.datos = {
+            '101': {'numero': '101', 'capacidad': 40, 'estado': 'AVAILABLE', 'ruta': 'Centro',
+                    'posicion': (-29.90, -71.25), 'pasajeros': 12},
+            '102': {'numero': '102', 'capacidad': 60, 'estado': 'MAINTENANCE', 'ruta': None,
+                    'posicion': None, 'pasajeros': 0},
+            '103': {'numero': '103', 'capacidad': 30, 'estado': 'IN_ROUTE', 'ruta': 'Costanera',
+                    'posicion': (-29.91, -71.26), 'pasajeros': 30},
+        }
+
+    def test_ida_y_vuelta_por_diccionarios(self):
+        flota = FleetArray.from_dicts(self.datos, {'Centro': self.ruta})
+        self.assertEqual(flota.to_dicts(), self.datos)
+        # Una ruta desconocida conserva su nombre en una Ruta sin paradas
+        self.assertEqual(flota['103'].ruta_actual.paradas, [])
+        self.assertIs(flota['101'].ruta_actual, self.ruta)
+
+    def test_coincide_con_bus(self):
+        flota = FleetArray.from_dicts(self.datos, {'Centro': self.ruta})
+        for numero, data in self.datos.items():
+            bus = Bus.from_dict(data)
+            self.assertEqual(flota[numero].to_dict()['capacidad'], bus.to_dict()['capacidad'])
+            self.assertEqual(flota[numero].to_dict()['estado'], bus.to_dict()['estado'])
+            self.assertEqual(flota[numero].to_dict()['pasajeros'], bus.to_dict()['pasajeros'])
+
+    def test_las_vistas_escriben_en_los_arreglos(self):
+        flota = FleetArray.from_dicts(self.datos, {'Centro': self.ruta})
+        vista = flota['102']
+        self.assertIsInstance(vista, BusVista)
+        vista.asignar_ruta(self.ruta)
+        vista.subir_pasajeros(5)
+        vista.posicion = (-29.92, -71.27)
+        self.assertTrue(vista.mover_siguiente_parada())
+        otra = flota['102']
+        self.assertEqual(otra.estado, BUS_STATES['IN_ROUTE'])
+        self.assertEqual(otra.pasajeros, 5)
+        self.assertEqual(otra.posicion_ruta, 1)
+        self.assertEqual(otra.posicion, (-29.95, -71.34))
+        with self.assertRaises(ValueError):
+            otra.subir_pasajeros(100)
+        vista.posicion = None
+        self.assertIsNone(flota['102'].posicion)
+
+    def test_estados_y_rutas_se_comparten(self):
+        flota = FleetArray.from_dicts(self.datos, {'Centro': self.ruta})
+        self.assertEqual(sorted(flota.estados), ['AVAILABLE', 'IN_ROUTE', 'MAINTENANCE'])
+        flota['103'].ruta_actual = self.ruta
+        self.assertEqual(flota.ruta[flota.indice('103')], flota.ruta[flota.indice('101')])
+        self.assertEqual(len(flota.rutas), 2)
+
+    def test_validaciones(self):
+        flota = FleetArray()
+        flota.agregar('1')
+        with self.assertRaises(ValueError):
+            flota.agregar('1')
+        with self.assertRaises(ValueError):
+            flota.agregar(2)
+        with self.assertRaises(ValueError):
+            flota.agregar('3', capacidad=0)
+        self.assertIn('1', flota)
+        self.assertEqual([bus.numero for bus in flota], ['1'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import random
+import unittest
+
+from services.busqueda import IndiceBusqueda
+from services.nomenclator import normalizar
+from utils.geo import haversine
+from utils.indice_espacial import IndiceEspacial
+from utils.indice_secundario import IndiceSecundario
+
+class TestIndiceEspacial(unittest.TestCase):
+    """Las consultas por grilla dan lo mismo que revisar cada elemento"""
+
+    def setUp(self):
+        rng = random.Random(3)
+        self.indice = IndiceEspacial(celda_km=0.5)
+        self.puntos = {}
+        for clave in range(400):
+            lat, lon = rng.uniform(-30.0, -29.8), rng.uniform(-71.4, -71.2)
+            self.puntos[clave] = (lat, lon)
+            self.indice.mover(clave, lat, lon)
+        self.consultas = [(rng.uniform(-30.05, -29.75), rng.uniform(-71.45, -71.15)) for _ in range(50)]
+
+    def _distancias(self, lat, lon):
+        return sorted((haversine(lat, lon, *pos), clave) for clave, pos in self.puntos.items())
+
+    def test_cercanos(self):
+        for lat, lon in self.consultas:
+            esperados = [(d, clave) for d, clave in self._distancias(lat, lon) if d <= 2.0]
+            obtenidos = self.indice.cercanos(lat, lon, 2.0)
+            self.assertEqual([clave for _, clave in obtenidos], [clave for _, clave in esperados])
+
+    def test_mas_cercano(self):
+        for lat, lon in self.consultas:
+            d, clave = self._distancias(lat, lon)[0]
+            self.assertEqual(self.indice.mas_cercano(lat, lon), (d, clave))
+
+    def test_mas_cercano_lejos_de_todos(self):
+        # Fuera de la zona ocupada, sin radio: no recorre anillos vacíos uno por uno
+        d, clave = self._distancias(-33.45, -70.66)[0]
+        self.assertEqual(self.indice.mas_cercano(-33.45, -70.66), (d, clave))
+        self.assertIsNone(self.indice.mas_cercano(-33.45, -70.66, radio_km=5.0))
+
+    def test_mas_cercano_con_radio(self):
+        for lat, lon in self.consultas:
+            d, clave = self._distancias(lat, lon)[0]
+            resultado = self.indice.mas_cercano(lat, lon, radio_km=0.3)
+            self.assertEqual(resultado, (d, clave) if d <= 0.3 else None)
+
+    def test_mover_y_eliminar(self):
+        self.indice.mover(0, -29.5, -71.0)
+        self.assertEqual(self.indice.posicion(0), (-29.5, -71.0))
+        self.assertEqual(self.indice.mas_cercano(-29.5, -71.0)[1], 0)
+        self.indice.eliminar(0)
+        self.assertNotIn(0, self.indice)
+        self.assertEqual(len(self.indice), 399)
+        self.assertEqual(self.indice.cercanos(-29.5, -71.0, 1.0), [])
+
+    def test_vacio(self):
+        indice = IndiceEspacial()
+        self.assertIsNone(indice.mas_cercano(-29.9, -71.25))
+        self.assertEqual(indice.cercanos(-29.9, -71.25, 10), [])
+
+class TestIndiceSecundario(unittest.TestCase):
+
+    def setUp(self):
+        self.buses = {
+            '1': {'ruta': 'A', 'paradas': [1, 2]},
+            '2': {'ruta': 'B', 'paradas': [2, 2, 3]},
+            '3': {'ruta': 'A', 'paradas': []},
+        }
+        self.por_ruta = IndiceSecundario.desde_coleccion(lambda r: [r['ruta']], self.buses)
+        self.por_parada = IndiceSecundario.desde_coleccion(lambda r: r['paradas'], self.buses)
+
+    def test_consultas(self):
+        self.assertEqual(self.por_ruta.claves('A'), ['1', '3'])
+        self.assertEqual(self.por_ruta.cantidades(), {'A': 2, 'B': 1})
+        # Un valor repetido en el registro se indexa una vez
+        self.assertEqual(self.por_parada.claves(2), ['1', '2'])
+        self.assertEqual(self.por_parada.cantidad(3), 1)
+        self.assertEqual(self.por_parada.claves(99), [])
+
+    def test_poner_reindexa(self):
+        self.por_ruta.poner('1', {'ruta': 'B'})
+        self.assertEqual(self.por_ruta.claves('A'), ['3'])
+        self.assertEqual(self.por_ruta.claves('B'), ['2', '1'])
+        self.por_parada.poner('1', {'paradas': []})
+        self.assertEqual(self.por_parada.claves(1), [])
+        self.assertNotIn(1, self.por_parada.cantidades())
+
+    def test_quitar(self):
+        self.por_ruta.quitar('2')
+        self.por_ruta.quitar('no existe')
+        self.assertEqual(self.por_ruta.cantidades(), {'A': 2})
+
+class TestIndiceBusqueda(unittest.TestCase):
+
+    def setUp(self):
+        self.registros = [
+            ('101', ['101', 'Ruta Centro', 'AVAILABLE', 'Plaza de Armas']),
+            ('102', ['102', 'Ruta Puerto', 'IN_ROUTE', 'Muelle Fiscal']),
+            ('203', ['203', 'Ruta Centro', 'MAINTENANCE', None]),
+            ('304', ['304', 'Avenida del Mar', 'AVAILABLE', 'Faro Monumental']),
+        ]
+        self.indice = IndiceBusqueda(self.registros)
+
+    def _referencia(self, texto):
+        """Filtro lineal: cada palabra de la consulta es prefijo de alguna palabra del registro"""
+        consulta = normalizar(texto).split()
+        resultado = []
+        for clave, textos in self.registros:
+            palabras = normalizar(' '.join(t for t in textos if t is not None)).split()
+            if all(any(p.startswith(c) for p in palabras) for c in consulta):
+                resultado.append(clave)
+        return resultado
+
+    def test_coincide_con_filtro_lineal(self):
+        for texto in ['', 'ruta', 'cen', 'ruta cen', 'PLAZA armas', 'avail', '10', 'mar faro',
+                      'muelle centro', 'xyz', 'ÁVENIDA', 'in_route', '  ']:
+            self.assertEqual(self.indice.buscar(texto), self._referencia(texto), texto)
+
+    def test_orden_de_los_registros(self):
+        self.assertEqual(self.indice.buscar('available'), ['101', '304'])
+        self.assertEqual(len(self.indice), 4)
+
+if __name__ == '__main__':
+    unittest.main()
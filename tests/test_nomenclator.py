@@ -0,0 +1,97 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from services.nomenclator import Nomenclator, normalizar
+
+class TestNomenclator(unittest.TestCase):
+
+    def setUp(self):
+        self.nomenclator = Nomenclator()
+        for nombre, posicion in [('Plaza de Armas', (-29.90, -71.25)),
+                                 ('Parque Pedro de Valdivia', None),
+                                 ('Terminal de Buses Coquimbo', (-29.95, -71.33)),
+                                 ('Mall Plaza La Serena', (-29.91, -71.26)),
+                                 ('Faro Monumental', (-29.90, -71.27))]:
+            self.nomenclator.agregar(nombre, posicion)
+
+    def test_normalizar(self):
+        self.assertEqual(normalizar("  Parque  Magallanes, 1504 "), "parque magallanes 1504")
+        self.assertEqual(normalizar("Ñuñoa ÁVILA"), "nunoa avila")
+
+    def test_buscar_ignora_tildes_y_puntuacion(self):
+        self.assertEqual(self.nomenclator.buscar("faro monumental."), 'Faro Monumental')
+        self.assertEqual(self.nomenclator.buscar("PLÁZA DE ÁRMAS"), 'Plaza de Armas')
+        self.assertIsNone(self.nomenclator.buscar("Plaza"))
+        self.assertEqual(self.nomenclator.posicion("plaza de armas"), (-29.90, -71.25))
+
+    def test_agregar_conserva_la_primera_forma(self):
+        indice = self.nomenclator.agregar("parque pedro de valdivia", (-29.92, -71.24))
+        self.assertEqual(self.nomenclator.nombres[indice], 'Parque Pedro de Valdivia')
+        # Solo completa la posición que faltaba
+        self.assertEqual(self.nomenclator.posicion('Parque Pedro de Valdivia'), (-29.92, -71.24))
+        self.nomenclator.agregar('Plaza de Armas', (0, 0))
+        self.assertEqual(self.nomenclator.posicion('Plaza de Armas'), (-29.90, -71.25))
+        self.assertEqual(len(self.nomenclator), 5)
+        with self.assertRaises(ValueError):
+            self.nomenclator.agregar(" ,. ")
+
+    def test_ubicar(self):
+        self.nomenclator.ubicar('Plaza de Armas', (-29.80, -71.20))
+        self.assertEqual(self.nomenclator.posicion('Plaza de Armas'), (-29.80, -71.20))
+        self.nomenclator.ubicar('Estadio', (-29.93, -71.25))
+        self.assertEqual(self.nomenclator.buscar('estadio'), 'Estadio')
+
+    def test_sugerir_prioriza_prefijos(self):
+        sugerencias = self.nomenclator.sugerir("plaz")
+        self.assertEqual(sugerencias[0], 'Plaza de Armas')
+        self.assertIn('Mall Plaza La Serena', sugerencias)
+        self.assertEqual(self.nomenclator.sugerir("terminal coq")[0], 'Terminal de Buses Coquimbo')
+        self.assertEqual(self.nomenclator.sugerir("plaz", limite=1), ['Plaza de Armas'])
+        self.assertEqual(self.nomenclator.sugerir(""), [])
+        self.assertEqual(self.nomenclator.sugerir("qqq"), [])
+
+    def test_sugerir_con_errores_de_tipeo(self):
+        self.assertEqual(self.nomenclator.sugerir("faro monumentl")[0], 'Faro Monumental')
+
+    def test_duplicados(self):
+        parecidos = self.nomenclator.duplicados("Faro Monumental")
+        self.assertEqual(parecidos[0], (1.0, 'Faro Monumental'))
+        self.assertEqual(self.nomenclator.duplicados("Faro Monumentl")[0][1], 'Faro Monumental')
+        self.assertEqual(self.nomenclator.duplicados("Hospital San Pablo"), [])
+        similitudes = [s for s, _ in self.nomenclator.duplicados("plaza", umbral=0.1)]
+        self.assertEqual(similitudes, sorted(similitudes, reverse=True))
+
+    def test_cargar_archivo(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, 'nomenclator.csv')
+            with open(archivo, 'w', encoding='utf-8', newline='') as f:
+                f.write("nombre,lat,lon\nHospital San Pablo,-29.95,-71.34\nRecova,,\n")
+            nomenclator = Nomenclator.desde_archivo(archivo)
+        self.assertEqual(nomenclator.posicion('hospital san pablo'), (-29.95, -71.34))
+        self.assertIsNone(nomenclator.posicion('Recova'))
+        self.assertEqual(len(nomenclator), 2)
+
+    def test_agregar_mientras_se_consulta(self):
+        errores = []
+
+        def agregar():
+            try:
+                for i in range(300):
+                    self.nomenclator.agregar(f"Parada Nueva {i}")
+            except Exception as e:
+                errores.append(e)
+
+        hilo = threading.Thread(target=agregar)
+        hilo.start()
+        while hilo.is_alive():
+            self.nomenclator.sugerir("parada nue")
+            self.nomenclator.duplicados("Parada Nueva 1")
+        hilo.join()
+        self.assertEqual(errores, [])
+        self.assertEqual(len(self.nomenclator), 305)
+        self.assertEqual(self.nomenclator.duplicados("Parada Nueva 299")[0], (1.0, 'Parada Nueva 299'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import math
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from models import Parada, Ruta
+from services.data_manager import DataManager
+from services.planificador import Planificador
+
+def _paradas(inicio, *posiciones):
+    return [Parada(inicio + i, f"Parada {inicio + i}", pos) for i, pos in enumerate(posiciones)]
+
+def _proxima(minuto, frecuencia):
+    return math.ceil(minuto / frecuencia - 1e-9) * frecuencia
+
+class TestPlanificador(unittest.TestCase):
+    """Dos rutas que se cruzan en la parada 3, con paradas a más de 1 km entre sí"""
+
+    def setUp(self):
+        p1, p2, p3 = _paradas(1, (-29.90, -71.25), (-29.91, -71.25), (-29.92, -71.25))
+        p4, p5 = _paradas(4, (-29.92, -71.2385), (-29.92, -71.227))
+        self.paradas = {p.id: p for p in (p1, p2, p3, p4, p5)}
+        self.a = Ruta('A', [p1, p2, p3])
+        self.b = Ruta('B', [p3, p4, p5])
+        self.planificador = Planificador([self.a, self.b], frecuencias={'A': 10, 'B': 15})
+
+    def test_un_bus(self):
+        viaje = self.planificador.planificar(1, 3, 480)
+        self.assertEqual(viaje['trasbordos'], 0)
+        self.assertAlmostEqual(viaje['llegada'], 480 + self.a.tiempo_hasta_parada(2))
+        tramo, = viaje['tramos']
+        self.assertEqual((tramo['tipo'], tramo['ruta']), ('bus', 'A'))
+        self.assertEqual((tramo['desde'].id, tramo['hasta'].id), (1, 3))
+
+    def test_espera_el_siguiente_bus(self):
+        # El bus de las 08:00 pasa por la parada 2 antes de las 08:05: se toma el de las 08:10
+        viaje = self.planificador.planificar(2, 3, 485)
+        desfase = self.a.tiempo_hasta_parada(1)
+        salida = _proxima(485 - desfase, 10)
+        self.assertAlmostEqual(viaje['tramos'][0]['salida'], salida + desfase)
+        self.assertAlmostEqual(viaje['llegada'], salida + self.a.tiempo_hasta_parada(2))
+
+    def test_trasbordo(self):
+        viaje = self.planificador.planificar(1, 5, 480)
+        en_3 = 480 + self.a.tiempo_hasta_parada(2)
+        llegada = _proxima(en_3, 15) + self.b.tiempo_hasta_parada(2)
+        self.assertAlmostEqual(viaje['llegada'], llegada)
+        self.assertEqual(viaje['trasbordos'], 1)
+        self.assertEqual([t['ruta'] for t in viaje['tramos']], ['A', 'B'])
+        self.assertEqual(viaje['tramos'][1]['desde'].id, 3)
+
+    def test_ruta_circular_da_la_vuelta(self):
+        viaje = self.planificador.planificar(3, 1, 480)
+        desfase = self.a.tiempo_hasta_parada(2)
+        salida = _proxima(480 - desfase, 10)
+        self.assertAlmostEqual(viaje['llegada'], salida + self.a.tiempo_ciclo())
+        self.assertEqual(viaje['trasbordos'], 0)
+
+    def test_trasbordo_a_pie(self):
+        # Una parada a unos 100 m de la 5 con una ruta propia
+        p6, p7 = _paradas(6, (-29.921, -71.227), (-29.95, -71.227))
+        self.planificador.actualizar_ruta(Ruta('C', [p6, p7]))
+        viaje = self.planificador.planificar(1, 7, 480)
+        self.assertEqual([t['tipo'] for t in viaje['tramos']], ['bus', 'bus', 'caminata', 'bus'])
+        caminata = viaje['tramos'][2]
+        self.assertEqual((caminata['desde'].id, caminata['hasta'].id), (5, 6))
+        self.assertEqual(viaje['trasbordos'], 2)
+
+    def test_por_nombre_y_datetime(self):
+        viaje = self.planificador.planificar("parada 1", "PARADA 3", datetime(2024, 3, 4, 8, 0))
+        self.assertEqual(viaje['salida'], 480)
+
+    def test_sin_viaje_y_paradas_desconocidas(self):
+        self.planificador.eliminar_ruta('B')
+        with self.assertRaises(ValueError):
+            self.planificador.planificar(1, 5, 480)
+        with self.assertRaises(ValueError):
+            self.planificador.planificar("No existe", 1, 480)
+        solo = Planificador([Ruta('X', _paradas(10, (-29.0, -71.0), (-29.1, -71.0))), self.a])
+        self.assertIsNone(solo.planificar(10, 1, 480))
+
+    def test_frecuencia_segun_buses_asignados(self):
+        planificador = Planificador([self.a], buses_por_ruta={'A': 2})
+        patron = planificador._patrones['A']
+        self.assertAlmostEqual(patron.frecuencia, self.a.tiempo_ciclo() / 2)
+
+class TestPlanificadorConDatos(unittest.TestCase):
+    """El planificador de un DataManager sigue los cambios de rutas"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.archivo = os.path.join(self.dir.name, 'data.json')
+        paradas = {'1': {'nombre': 'Plaza', 'posicion': [-29.90, -71.25]},
+                   '2': {'nombre': 'Puerto', 'posicion': [-29.91, -71.25]},
+                   '3': {'nombre': 'Faro', 'posicion': [-29.92, -71.25]}}
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            json.dump({'rutas': {'A': {'nombre': 'A', 'paradas': [1, 2]}}, 'buses': {},
+                       'paradas': paradas}, f)
+        self.dm = DataManager(self.archivo, compactar_cada=1000, fsync_diario=False)
+        self.planificador = Planificador.desde_data_manager(self.dm)
+
+    def tearDown(self):
+        self.dm.cerrar()
+        self.dir.cleanup()
+
+    def test_sigue_los_cambios(self):
+        self.assertEqual(self.planificador.planificar('Plaza', 'Puerto', 480)['trasbordos'], 0)
+        with self.assertRaises(ValueError):
+            self.planificador.planificar('Plaza', 'Faro', 480)
+        self.dm.guardar_ruta('B', {'nombre': 'B', 'paradas': [2, 3]})
+        viaje = self.planificador.planificar('Plaza', 'Faro', 480)
+        self.assertEqual([t['ruta'] for t in viaje['tramos']], ['A', 'B'])
+        self.dm.eliminar_ruta('A')
+        with self.assertRaises(ValueError):
+            self.planificador.planificar('Plaza', 'Faro', 480)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+
+from models import Bus, Parada, Ruta
+from utils.constants import TIEMPO_TRAMO_DEFECTO, VELOCIDAD_PROMEDIO
+from utils.geo import distancia
+from utils.indice_espacial import IndiceEspacial
+
+# Un cuadrado de unos 1.1 km de lado
+POSICIONES = [(-29.90, -71.25), (-29.91, -71.25), (-29.91, -71.2385), (-29.90, -71.2385)]
+
+class TestGeometriaRuta(unittest.TestCase):
+
+    def setUp(self):
+        self.paradas = [Parada(i + 1, f"P{i + 1}", pos) for i, pos in enumerate(POSICIONES)]
+        self.ruta = Ruta('R', list(self.paradas))
+        self.tramos = [distancia(a, b) for a, b in zip(POSICIONES, POSICIONES[1:])]
+        self.regreso = distancia(POSICIONES[-1], POSICIONES[0])
+
+    def test_distancias_acumuladas(self):
+        self.assertAlmostEqual(self.ruta.longitud_total(), sum(self.tramos))
+        self.assertEqual(self.ruta.distancia_hasta_parada(0), 0.0)
+        self.assertAlmostEqual(self.ruta.distancia_hasta_parada(2), sum(self.tramos[:2]))
+        self.assertAlmostEqual(self.ruta.tiempo_hasta_parada(3),
+                               sum(self.tramos) / VELOCIDAD_PROMEDIO * 60)
+
+    def test_circuito_incluye_el_regreso(self):
+        minutos = [d / VELOCIDAD_PROMEDIO * 60 for d in self.tramos + [self.regreso]]
+        for obtenido, esperado in zip(self.ruta.tiempos_circuito(), minutos):
+            self.assertAlmostEqual(obtenido, esperado)
+        self.assertEqual(len(self.ruta.tiempos_circuito()), len(POSICIONES))
+        self.assertAlmostEqual(self.ruta.tiempo_ciclo(), sum(minutos))
+        self.assertAlmostEqual(self.ruta.calcular_tiempo_total(), sum(minutos[:-1]))
+
+    def test_ruta_vacia_y_de_una_parada(self):
+        self.assertEqual(Ruta('V').tiempos_circuito(), [])
+        self.assertEqual(Ruta('V').longitud_total(), 0.0)
+        una = Ruta('U', [self.paradas[0]])
+        self.assertEqual(una.tiempos_circuito(), [0.0])
+        self.assertEqual(una.tiempo_ciclo(), 0.0)
+        self.assertIsNone(una.proyectar(*POSICIONES[0]))
+
+    def test_paradas_sin_coordenadas_usan_el_tiempo_por_defecto(self):
+        ruta = Ruta('S', [Parada(1, 'A'), Parada(2, 'B')])
+        for minutos in ruta.tiempos_circuito():
+            self.assertAlmostEqual(minutos, TIEMPO_TRAMO_DEFECTO)
+
+    def test_geometria_se_calcula_una_vez(self):
+        self.ruta.longitud_total()
+        tramos = self.ruta._tramos
+        self.ruta.tiempo_ciclo()
+        self.ruta.tiempos_circuito()
+        self.assertIs(self.ruta._tramos, tramos)
+
+    def test_cambios_invalidan_la_geometria(self):
+        longitud = self.ruta.longitud_total()
+        self.ruta.eliminar_parada(3)
+        self.assertAlmostEqual(self.ruta.longitud_total(), sum(self.tramos[:2]))
+        self.ruta.agregar_parada(self.paradas[3])
+        self.assertAlmostEqual(self.ruta.longitud_total(), longitud)
+        self.ruta.mover_parada(3, 0)
+        self.assertEqual(self.ruta.indice_parada(4), 0)
+        # Mover una parada no avisa a la ruta: hay que invalidar a mano
+        self.paradas[0].posicion = (-29.89, -71.25)
+        self.ruta.invalidar_geometria()
+        self.assertAlmostEqual(self.ruta.distancia_hasta_parada(1), distancia(POSICIONES[3], (-29.89, -71.25)))
+
+    def test_posicion_en(self):
+        mitad = self.tramos[0] / 2
+        lat, lon = self.ruta.posicion_en(mitad)
+        self.assertAlmostEqual(lat, -29.905, places=4)
+        self.assertAlmostEqual(lon, -71.25, places=6)
+        self.assertEqual(self.ruta.parada_en(mitad), 0)
+        self.assertEqual(self.ruta.parada_en(self.ruta.longitud_total() + 1), 3)
+        self.assertEqual(self.ruta.posicion_en(self.ruta.longitud_total() + 1), POSICIONES[3])
+
+    def test_indice_parada(self):
+        self.assertEqual(self.ruta.indice_parada(3), 2)
+        self.assertEqual(self.ruta.indice_parada(self.paradas[1]), 1)
+        self.assertIsNone(self.ruta.indice_parada(99))
+
+class TestProyectar(unittest.TestCase):
+
+    def setUp(self):
+        self.ruta = Ruta('R', [Parada(i + 1, f"P{i + 1}", pos) for i, pos in enumerate(POSICIONES)])
+
+    def test_punto_sobre_un_tramo(self):
+        tramo, fraccion, d, punto = self.ruta.proyectar(-29.9075, -71.2501)
+        self.assertEqual(tramo, 0)
+        self.assertAlmostEqual(fraccion, 0.75, places=3)
+        self.assertLess(d, 0.02)
+        self.assertAlmostEqual(punto[0], -29.9075, places=4)
+
+    def test_tramo_de_regreso(self):
+        tramo, fraccion, _, _ = self.ruta.proyectar(-29.8999, -71.244)
+        self.assertEqual(tramo, 3)
+        self.assertTrue(0 < fraccion < 1)
+
+    def test_fuera_del_tramo_se_ajusta_al_extremo(self):
+        tramo, fraccion, d, punto = self.ruta.proyectar(-29.92, -71.26, desde=0, alcance=1)
+        self.assertEqual((tramo, fraccion), (0, 1.0))
+        self.assertEqual(punto, POSICIONES[1])
+        self.assertAlmostEqual(d, distancia((-29.92, -71.26), POSICIONES[1]))
+
+    def test_alcance_limita_los_tramos(self):
+        # Cerca del tramo 2, pero solo se revisa el 0
+        self.assertEqual(self.ruta.proyectar(-29.905, -71.2385, alcance=1)[0], 0)
+        self.assertEqual(self.ruta.proyectar(-29.905, -71.2385)[0], 2)
+        self.assertEqual(self.ruta.proyectar(-29.905, -71.2385, desde=1, alcance=2)[0], 2)
+
+class TestBusEnRuta(unittest.TestCase):
+    """actualizar_posicion ubica el bus en su ruta con el índice de paradas"""
+
+    def setUp(self):
+        self.paradas = [Parada(i + 1, f"P{i + 1}", pos) for i, pos in enumerate(POSICIONES)]
+        self.ruta = Ruta('R', self.paradas)
+        self.indice = IndiceEspacial()
+        for parada in self.paradas:
+            self.indice.mover(parada.id, *parada.posicion)
+        self.bus = Bus('1')
+        self.bus.asignar_ruta(self.ruta)
+
+    def test_en_una_parada(self):
+        self.assertEqual(self.bus.actualizar_posicion(-29.91001, -71.25001, self.indice), 2)
+        self.assertEqual(self.bus.posicion_ruta, 1)
+        self.assertEqual(self.bus.posicion, POSICIONES[1])
+
+    def test_entre_paradas(self):
+        self.bus.posicion_ruta = 1
+        self.assertIsNone(self.bus.actualizar_posicion(-29.9101, -71.245, self.indice))
+        self.assertEqual(self.bus.posicion_ruta, 1)
+        self.assertAlmostEqual(self.bus.posicion[0], -29.91, places=6)
+
+    def test_lejos_de_la_ruta(self):
+        self.assertIsNone(self.bus.actualizar_posicion(-29.95, -71.30, self.indice))
+        self.assertEqual(self.bus.posicion, (-29.95, -71.30))
+        self.assertEqual(self.bus.posicion_ruta, 0)
+
+    def test_tiempo_estimado_da_la_vuelta(self):
+        self.bus.posicion_ruta = 2
+        minutos = self.bus.calcular_tiempo_estimado(self.paradas[1])
+        esperado = self.ruta.tiempo_ciclo() - (self.ruta.tiempo_hasta_parada(2) - self.ruta.tiempo_hasta_parada(1))
+        self.assertAlmostEqual(minutos, esperado)
+
+if __name__ == '__main__':
+    unittest.main()
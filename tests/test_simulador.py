@@ -0,0 +1,191 @@
+import random
+import unittest
+
+import numpy as np
+
+from models import Bus, Parada, Ruta
+from services.simulador import (DURACION_MINIMA_TRAMO, ColaActualizaciones, MotorFlota,
+                                RelojSimulacion, Simulador)
+
+class RelojFalso:
+    """Reloj monotónico que solo avanza cuando el test lo indica"""
+
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+def _ruta(nombre, *posiciones):
+    return Ruta(nombre, [Parada(i + 1, f"{nombre}{i + 1}", pos) for i, pos in enumerate(posiciones)])
+
+class TestMotorFlota(unittest.TestCase):
+    """El paso vectorizado coincide con avanzar cada bus por separado"""
+
+    def _referencia(self, duraciones, paradas, restantes, vueltas, dt):
+        """Avanza un bus tramo a tramo; devuelve si llegó a alguna parada"""
+        llego = False
+        tiempo = dt
+        n = len(duraciones)
+        while tiempo >= restantes[0]:
+            tiempo -= restantes[0]
+            paradas[0] = (paradas[0] + 1) % n
+            if paradas[0] == 0:
+                vueltas[0] += 1
+            restantes[0] = duraciones[paradas[0]]
+            llego = True
+        restantes[0] -= tiempo
+        return llego
+
+    def test_coincide_con_referencia_escalar(self):
+        rng = random.Random(7)
+        # Potencias de dos y pasos múltiplos de 0.5: la aritmética es exacta en ambos cálculos
+        rutas = [[rng.choice([0, 1, 2, 4, 8, 16]) for _ in range(rng.randint(2, 6))] for _ in range(4)]
+        rutas_buses = [rng.randrange(len(rutas)) for _ in range(30)]
+        motor = MotorFlota(rutas, rutas_buses, [40] * len(rutas_buses), semilla=1)
+
+        efectivas = [[d or DURACION_MINIMA_TRAMO for d in ruta] for ruta in rutas]
+        estado = [([0], [efectivas[r][0]], [0]) for r in rutas_buses]
+        for _ in range(300):
+            dt = rng.choice([0.5, 1, 3, 10, 37])
+            llegaron = set(motor.avanzar(dt).tolist())
+            esperados = set()
+            for i, (paradas, restantes, vueltas) in enumerate(estado):
+                if self._referencia(efectivas[rutas_buses[i]], paradas, restantes, vueltas, dt):
+                    esperados.add(i)
+            self.assertEqual(llegaron, esperados)
+            self.assertEqual(motor.parada.tolist(), [p[0] for p, _, _ in estado])
+            self.assertEqual(motor.vueltas.tolist(), [v[0] for _, _, v in estado])
+
+    def test_solo_los_tramos_de_largo_cero_se_ajustan(self):
+        motor = MotorFlota([[0, 0.25, 90]], [0], [40])
+        self.assertEqual(motor.duracion_tramos.tolist(), [DURACION_MINIMA_TRAMO, 0.25, 90])
+
+    def test_duracion_negativa(self):
+        with self.assertRaises(ValueError):
+            MotorFlota([[10, -1]], [0], [40])
+
+    def test_ruta_de_una_parada_no_avanza(self):
+        motor = MotorFlota([[], [5, 5]], [0, 1], [40, 40])
+        self.assertEqual(motor.avanzar(7).tolist(), [1])
+        self.assertEqual(motor.parada.tolist(), [0, 1])
+
+    def test_desde_buses_sigue_las_paradas_del_bus(self):
+        ruta = _ruta('R', (-29.90, -71.25), (-29.91, -71.25), (-29.91, -71.24))
+        bus = Bus('1')
+        bus.ruta_actual = ruta
+        bus.posicion_ruta = 1
+        motor, buses = MotorFlota.desde_buses([bus, Bus('sin ruta')], semilla=3)
+        self.assertEqual(buses, [bus])
+        np.testing.assert_allclose(motor.duracion_tramos, [m * 60 for m in ruta.tiempos_circuito()])
+
+        # Cada tramo recorrido lleva a la misma parada que mover el bus por separado
+        duraciones = motor.duracion_tramos.tolist()
+        for _ in range(len(ruta.paradas) - 1 - bus.posicion_ruta):
+            motor.avanzar(duraciones[motor.parada[0]])
+            self.assertTrue(bus.mover_siguiente_parada())
+            self.assertEqual(int(motor.parada[0]), bus.posicion_ruta)
+        # Tras la última parada el motor regresa a la primera
+        motor.avanzar(duraciones[motor.parada[0]])
+        self.assertEqual(int(motor.parada[0]), 0)
+        self.assertEqual(int(motor.vueltas[0]), 1)
+
+    def test_pasajeros_dentro_de_la_capacidad(self):
+        motor = MotorFlota([[1, 1]], [0] * 50, [10] * 50, semilla=5, demanda=0.5)
+        llegaron = motor.avanzar(1)
+        self.assertEqual(len(llegaron), 50)
+        self.assertTrue(np.all((motor.pasajeros >= 0) & (motor.pasajeros <= 10)))
+
+class TestRelojSimulacion(unittest.TestCase):
+
+    def setUp(self):
+        self.reloj = RelojFalso()
+
+    def test_conserva_la_fraccion_entre_ciclos(self):
+        reloj = RelojSimulacion(1.0, multiplicador=2.0, reloj=self.reloj)
+        reloj.iniciar()
+        self.reloj.ahora = 1.25
+        self.assertEqual(reloj.pasos_pendientes(), 2)
+        self.assertAlmostEqual(reloj.espera(), 0.25)
+        self.reloj.ahora = 1.5
+        self.assertEqual(reloj.pasos_pendientes(), 1)
+        self.assertEqual(reloj.tiempo, 3.0)
+
+    def test_descarta_el_exceso_sobre_max_pasos(self):
+        reloj = RelojSimulacion(1.0, multiplicador=1.0, max_pasos=5, reloj=self.reloj)
+        reloj.iniciar()
+        self.reloj.ahora = 100.5
+        self.assertEqual(reloj.pasos_pendientes(), 5)
+        # El atraso no se recupera en los ciclos siguientes
+        self.assertEqual(reloj.pasos_pendientes(), 0)
+        self.reloj.ahora = 101.0
+        self.assertEqual(reloj.pasos_pendientes(), 1)
+
+    def test_pausa_no_cuenta_tiempo(self):
+        reloj = RelojSimulacion(1.0, multiplicador=1.0, reloj=self.reloj)
+        reloj.iniciar()
+        self.reloj.ahora = 2.0
+        reloj.pausar()
+        self.reloj.ahora = 50.0
+        self.assertEqual(reloj.pasos_pendientes(), 0)
+        reloj.reanudar()
+        self.reloj.ahora = 51.0
+        self.assertEqual(reloj.pasos_pendientes(), 3)
+
+    def test_reanudar_sin_pausa_no_pierde_tiempo(self):
+        reloj = RelojSimulacion(1.0, multiplicador=1.0, reloj=self.reloj)
+        reloj.iniciar()
+        self.reloj.ahora = 3.0
+        reloj.reanudar()
+        self.assertEqual(reloj.pasos_pendientes(), 3)
+
+    def test_sin_multiplicador(self):
+        reloj = RelojSimulacion(1.0, multiplicador=None, max_pasos=7, reloj=self.reloj)
+        reloj.iniciar()
+        self.assertEqual(reloj.pasos_pendientes(), 7)
+        self.assertEqual(reloj.espera(), 0.0)
+
+    def test_parametros_invalidos(self):
+        with self.assertRaises(ValueError):
+            RelojSimulacion(0)
+        with self.assertRaises(ValueError):
+            RelojSimulacion(1.0, multiplicador=0)
+
+class TestColaActualizaciones(unittest.TestCase):
+
+    def test_drenar_deja_el_ultimo_estado_de_cada_bus(self):
+        cola = ColaActualizaciones(max_instantaneas=2)
+        for t in range(5):
+            cola.publicar({'A': {'tiempo': t}, f'B{t}': {'tiempo': t}})
+        estados = cola.drenar()
+        self.assertEqual(estados['A'], {'tiempo': 4})
+        # Las instantáneas que no cabían se fusionaron en lugar de perderse
+        self.assertEqual(set(estados), {'A', 'B0', 'B1', 'B2', 'B3', 'B4'})
+        self.assertEqual(cola.drenar(), {})
+
+class TestSimulador(unittest.TestCase):
+
+    def test_error_del_hilo_queda_en_error(self):
+        ruta = _ruta('R', (-29.90, -71.25), (-29.91, -71.25))
+        bus = Bus('1')
+        bus.ruta_actual = ruta
+
+        def fallar(bus):
+            raise RuntimeError("fallo en el callback")
+
+        simulador = Simulador(intervalo=60, multiplicador=None)
+        self.assertTrue(simulador.iniciar([bus], callback=fallar))
+        simulador._thread.join(timeout=5)
+        self.assertIsInstance(simulador.error, RuntimeError)
+        simulador.detener()
+
+    def test_ejecutar_por_lotes(self):
+        ruta = _ruta('R', (-29.90, -71.25), (-29.91, -71.25))
+        bus = Bus('1')
+        bus.ruta_actual = ruta
+        ciclo = ruta.tiempo_ciclo() * 60
+        motor = Simulador(intervalo=1).ejecutar([bus], duracion=3 * ciclo + 10)
+        self.assertEqual(int(motor.vueltas[0]), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,6 +32,14 @@ TIEMPO_SIMULACION = 0.1  # segundos
 MAX_PASAJEROS = 40
 MIN_DISTANCIA_PARADAS = 0.1  # km
 MAX_VELOCIDAD = 60  # km/h
+VELOCIDAD_PROMEDIO = 25  # km/h, velocidad comercial en ciudad
+TIEMPO_TRAMO_DEFECTO = 5  # minutos, si faltan coordenadas de las paradas
+RADIO_PARADA = 0.05  # km, distancia a la que un bus se considera en la parada
+MAX_DESVIO_RUTA = 0.3  # km, distancia máxima a un tramo para ubicar el bus en él
+FRECUENCIA_DEFECTO = 10  # minutos entre buses de una ruta sin buses asignados
+VELOCIDAD_CAMINATA = 4.5  # km/h
+RADIO_TRASBORDO = 0.3  # km, distancia máxima a pie entre paradas para un trasbordo
+RADIO_BUSQUEDA_PARADA = 5.0  # km, alcance por defecto al buscar la parada más cercana
 
 # Colores de la interfaz
 COLORS = {
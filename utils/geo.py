@@ -0,0 +1,56 @@
+import math
+
+RADIO_TIERRA_KM = 6371.0088
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distancia en km entre dos puntos (grados) sobre la superficie terrestre"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def distancia(origen, destino):
+    """Distancia en km entre dos posiciones (lat, lon)"""
+    return haversine(origen[0], origen[1], destino[0], destino[1])
+
+def interpolar(origen, destino, fraccion):
+    """Punto a una fracción (0 a 1) del camino entre dos posiciones (lat, lon)"""
+    return (origen[0] + (destino[0] - origen[0]) * fraccion,
+            origen[1] + (destino[1] - origen[1]) * fraccion)
+
+def simplificar(puntos, tolerancia):
+    """Simplifica una línea de puntos (lat, lon) con Douglas-Peucker.
+
+    Conserva los puntos que se alejan más de ``tolerancia`` grados de la
+    línea simplificada. La longitud se escala por el coseno de la latitud
+    para que la tolerancia valga lo mismo en ambos ejes.
+    """
+    n = len(puntos)
+    if n < 3 or tolerancia <= 0:
+        return list(puntos)
+    escala = math.cos(math.radians(puntos[0][0]))
+    conservar = [False] * n
+    conservar[0] = conservar[-1] = True
+    pendientes = [(0, n - 1)]
+    while pendientes:
+        inicio, fin = pendientes.pop()
+        y1, x1 = puntos[inicio][0], puntos[inicio][1] * escala
+        y2, x2 = puntos[fin][0], puntos[fin][1] * escala
+        dx, dy = x2 - x1, y2 - y1
+        largo = math.hypot(dx, dy)
+        maxima, indice = 0.0, None
+        for k in range(inicio + 1, fin):
+            y, x = puntos[k][0], puntos[k][1] * escala
+            if largo:
+                d = abs(dy * (x - x1) - dx * (y - y1)) / largo
+            else:
+                d = math.hypot(x - x1, y - y1)
+            if d > maxima:
+                maxima, indice = d, k
+        if indice is not None and maxima > tolerancia:
+            conservar[indice] = True
+            pendientes.append((inicio, indice))
+            pendientes.append((indice, fin))
+    return [punto for punto, conservado in zip(puntos, conservar) if conservado]
@@ -0,0 +1,155 @@
+import math
+
+from .geo import RADIO_TIERRA_KM, haversine
+
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+
+class IndiceEspacial:
+    """Grilla uniforme sobre lat/lon para consultas de cercanía.
+
+    Cada elemento (una clave cualquiera, p. ej. el ID de una parada o el
+    número de un bus) se guarda en la celda que contiene su posición. Una
+    consulta solo revisa las celdas que tocan el radio buscado y luego
+    filtra con la distancia haversine exacta. ``mover`` es O(1), así que
+    el índice se puede actualizar con cada posición recibida.
+    """
+
+    def __init__(self, celda_km=0.25, latitud_referencia=None):
+        self.celda_km = celda_km
+        self._alto = celda_km / KM_POR_GRADO
+        self._ancho = None
+        self._celdas = {}
+        self._elementos = {}
+        # Filas y columnas extremas ocupadas alguna vez (cota para mas_cercano)
+        self._limites = None
+        if latitud_referencia is not None:
+            self._fijar_referencia(latitud_referencia)
+
+    def _fijar_referencia(self, latitud):
+        # Las celdas se ensanchan en longitud para medir lo mismo en km a esta latitud
+        self._ancho = self._alto / max(math.cos(math.radians(latitud)), 0.01)
+
+    def _celda(self, lat, lon):
+        if self._ancho is None:
+            self._fijar_referencia(lat)
+        return (math.floor(lat / self._alto), math.floor(lon / self._ancho))
+
+    def __len__(self):
+        return len(self._elementos)
+
+    def __contains__(self, clave):
+        return clave in self._elementos
+
+    def posicion(self, clave):
+        lat, lon, _ = self._elementos[clave]
+        return (lat, lon)
+
+    def mover(self, clave, lat, lon):
+        """Inserta un elemento o actualiza su posición"""
+        celda = self._celda(lat, lon)
+        anterior = self._elementos.get(clave)
+        if anterior is not None and anterior[2] != celda:
+            self._quitar_de_celda(clave, anterior[2])
+        if anterior is None or anterior[2] != celda:
+            self._celdas.setdefault(celda, set()).add(clave)
+            if self._limites is None:
+                self._limites = [celda[0], celda[0], celda[1], celda[1]]
+            else:
+                limites = self._limites
+                limites[0] = min(limites[0], celda[0])
+                limites[1] = max(limites[1], celda[0])
+                limites[2] = min(limites[2], celda[1])
+                limites[3] = max(limites[3], celda[1])
+        self._elementos[clave] = (lat, lon, celda)
+
+    insertar = mover
+
+    def eliminar(self, clave):
+        anterior = self._elementos.pop(clave, None)
+        if anterior is not None:
+            self._quitar_de_celda(clave, anterior[2])
+
+    def _quitar_de_celda(self, clave, celda):
+        claves = self._celdas[celda]
+        claves.discard(clave)
+        if not claves:
+            del self._celdas[celda]
+
+    def _lados_km(self, lat):
+        """Alto y ancho en km de una celda a la latitud indicada"""
+        return self.celda_km, self._ancho * KM_POR_GRADO * max(math.cos(math.radians(lat)), 0.01)
+
+    def cercanos(self, lat, lon, radio_km):
+        """Elementos a menos de radio_km de (lat, lon): lista de (distancia_km, clave) ordenada"""
+        if not self._elementos:
+            return []
+        fila, columna = self._celda(lat, lon)
+        alto, ancho = self._lados_km(lat)
+        alcance_fila = math.ceil(radio_km / alto)
+        alcance_columna = math.ceil(radio_km / ancho)
+        if (2 * alcance_fila + 1) * (2 * alcance_columna + 1) > len(self._celdas):
+            # Radio mayor que la zona ocupada: más barato revisar las celdas existentes
+            candidatas = self._celdas.values()
+        else:
+            candidatas = (self._celdas.get((f, c), ())
+                          for f in range(fila - alcance_fila, fila + alcance_fila + 1)
+                          for c in range(columna - alcance_columna, columna + alcance_columna + 1))
+        resultado = []
+        for claves in candidatas:
+            for clave in claves:
+                lat_e, lon_e, _ = self._elementos[clave]
+                d = haversine(lat, lon, lat_e, lon_e)
+                if d <= radio_km:
+                    resultado.append((d, clave))
+        resultado.sort(key=lambda par: par[0])
+        return resultado
+
+    def mas_cercano(self, lat, lon, radio_km=None):
+        """Elemento más cercano a (lat, lon) como (distancia_km, clave), o None.
+
+        Busca en anillos de celdas crecientes hasta que el anillo siguiente ya
+        no puede contener algo más cerca; con radio_km limita la búsqueda. Los
+        anillos empiezan en la zona ocupada y, si recorrerlos costaría más que
+        revisar cada elemento (p. ej. lejos de todos), se revisan todos.
+        """
+        if not self._elementos:
+            return None
+        fila, columna = self._celda(lat, lon)
+        lado = min(self._lados_km(lat))
+        fila_min, fila_max, columna_min, columna_max = self._limites
+        # Anillos necesarios para cubrir todas las celdas ocupadas
+        max_anillo = max(abs(fila_min - fila), abs(fila_max - fila),
+                         abs(columna_min - columna), abs(columna_max - columna))
+        if radio_km is not None:
+            max_anillo = min(max_anillo, math.ceil(radio_km / lado))
+        # Los anillos anteriores a la zona ocupada están vacíos
+        primer_anillo = max(fila_min - fila, fila - fila_max, columna_min - columna, columna - columna_max, 0)
+
+        mejor = None
+        revisadas = 0
+        for anillo in range(primer_anillo, max_anillo + 1):
+            # Lo más cerca que puede estar algo de este anillo
+            if mejor is not None and (anillo - 1) * lado > mejor[0]:
+                break
+            revisadas += max(8 * anillo, 1)
+            if revisadas > len(self._elementos):
+                mejor = self._mas_cercano_todos(lat, lon)
+                break
+            for f in range(fila - anillo, fila + anillo + 1):
+                # En las filas interiores del anillo solo cuentan los dos extremos
+                paso = 1 if abs(f - fila) == anillo else 2 * anillo
+                for c in range(columna - anillo, columna + anillo + 1, paso):
+                    for clave in self._celdas.get((f, c), ()):
+                        lat_e, lon_e, _ = self._elementos[clave]
+                        d = haversine(lat, lon, lat_e, lon_e)
+                        if mejor is None or d < mejor[0]:
+                            mejor = (d, clave)
+        if mejor is None or (radio_km is not None and mejor[0] > radio_km):
+            return None
+        return mejor
+
+    def _mas_cercano_todos(self, lat, lon):
+        """(distancia_km, clave) del elemento más cercano revisándolos todos"""
+        return min(((haversine(lat, lon, lat_e, lon_e), clave)
+                    for clave, (lat_e, lon_e, _) in self._elementos.items()),
+                   key=lambda par: par[0])
@@ -0,0 +1,60 @@
+class IndiceSecundario:
+    """Índice invertido valor -> claves sobre una colección del modelo.
+
+    ``valores(registro)`` devuelve los valores por los que se indexa cada
+    registro (p. ej. la ruta de un bus o los IDs de paradas de una ruta).
+    Se recuerdan los valores indexados de cada clave, así ``poner`` y
+    ``quitar`` solo tocan las entradas de ese registro y una consulta
+    cuesta lo que mide su resultado.
+    """
+
+    def __init__(self, valores):
+        self._valores = valores
+        # valor -> {clave: None}, un conjunto que conserva el orden de inserción
+        self._claves = {}
+        # clave -> valores con que está indexada
+        self._por_clave = {}
+
+    @classmethod
+    def desde_coleccion(cls, valores, coleccion):
+        indice = cls(valores)
+        for clave, registro in coleccion.items():
+            indice.poner(clave, registro)
+        return indice
+
+    def poner(self, clave, registro):
+        """Indexa (o reindexa) el registro guardado bajo ``clave``"""
+        nuevos = tuple(dict.fromkeys(self._valores(registro)))
+        anteriores = self._por_clave.get(clave, ())
+        if nuevos == anteriores:
+            return
+        for valor in anteriores:
+            if valor not in nuevos:
+                self._sacar(valor, clave)
+        for valor in nuevos:
+            self._claves.setdefault(valor, {})[clave] = None
+        if nuevos:
+            self._por_clave[clave] = nuevos
+        else:
+            self._por_clave.pop(clave, None)
+
+    def quitar(self, clave):
+        for valor in self._por_clave.pop(clave, ()):
+            self._sacar(valor, clave)
+
+    def _sacar(self, valor, clave):
+        claves = self._claves[valor]
+        del claves[clave]
+        if not claves:
+            del self._claves[valor]
+
+    def claves(self, valor):
+        """Claves de los registros indexados con ``valor``"""
+        return list(self._claves.get(valor, ()))
+
+    def cantidad(self, valor):
+        return len(self._claves.get(valor, ()))
+
+    def cantidades(self):
+        """{valor: cantidad de registros} para todos los valores indexados"""
+        return {valor: len(claves) for valor, claves in self._claves.items()}